@@ -3,18 +3,51 @@ Credit Limit Assignment System - Streamlit Dashboard
 Main application for credit limit recommendations and analysis
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
-# Import custom modules
-from data_generator import generate_credit_dataset
-from model_training import CreditRiskModel
+# Import custom modules (plotly, sklearn and xgboost are imported on first use)
+from model_training import SCORING_MODELS, CreditRiskModel
+from startup import ModelWarmup
 from credit_limit_engine import CreditLimitEngine
 from scenario_analysis import ScenarioAnalyzer
+from portfolio_index import CustomerIndex, RecommendationIndex, paginate
+from chart_aggregation import should_bin, histogram_counts, density_grid
+from portfolio_cube import PortfolioCube
+from explanations import LocalExplanations, explain_portfolio
+from export import excel_bytes, csv_gz_bytes
+from storage import PortfolioStore
+from memory_report import get_memory_profiler, profile_frame
+from thread_budget import plan_workers, apply_thread_limit
+
+DATA_PATH = 'data/credit_data.csv'
+MODEL_DIR = 'models/'
+
+# Dashboard processes sharing this host (e.g. replicas behind a load
+# balancer); each one limits itself to its share of the thread budget
+DASHBOARD_PROCESSES_ENV = 'CREDIT_DASHBOARD_PROCESSES'
+
+# Pages the SQLite store answers without loading the dataset
+STORE_PAGES = ("🎯 Credit Recommendations", "🔍 Customer Details")
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Recommendation export formats: (builder of the file bytes from row chunks, file name, MIME type)
+RECOMMENDATION_EXPORTS = {
+    "Excel": (lambda chunks: excel_bytes({'Recommendations': chunks}), 'credit_recommendations.xlsx',
+              XLSX_MIME),
+    "CSV (gzip)": (csv_gz_bytes, 'credit_recommendations.csv.gz', 'application/gzip')
+}
+
+# Display color for each risk category
+RISK_COLORS = {
+    "Low Risk": "green",
+    "Medium Risk": "orange",
+    "High Risk": "red",
+    "Very High Risk": "darkred"
+}
 
 # Page configuration
 st.set_page_config(
@@ -47,7 +80,7 @@ st.markdown("""
 def load_data():
     """Load and prepare the credit data"""
     try:
-        df = pd.read_csv('data/credit_data.csv')
+        df = pd.read_csv(DATA_PATH)
     except FileNotFoundError:
         st.error("Data file not found. Please run 'python data_generator.py' first.")
         return None
@@ -55,14 +88,51 @@ def load_data():
     return df
 
 @st.cache_resource
-def load_models():
-    """Load trained ML models"""
-    model = CreditRiskModel()
+def configure_threads():
+    """Limit this process to its share of the thread budget (once per process)"""
+    value = os.environ.get(DASHBOARD_PROCESSES_ENV, '1')
     try:
-        model.load_models()
-        return model
+        processes = int(value)
+    except ValueError:
+        processes = 0
+    if processes <= 0:
+        raise ValueError(f"{DASHBOARD_PROCESSES_ENV} must be a positive integer, got {value!r}")
+    _, n_threads = plan_workers(processes)
+    return apply_thread_limit(n_threads)
+
+@st.cache_resource
+def load_customer_index():
+    """Build the customer_id index once per dataset"""
+    df = load_data()
+    return CustomerIndex(df['customer_id']) if df is not None else None
+
+@st.cache_resource
+def start_model_warmup(scoring_model='ensemble'):
+    """Start loading and warming up the models in the background (once per scoring model)"""
+    store = load_store()
+    if store is not None:
+        # Read a few stored customers instead of the whole dataset
+        sample = store.search_customers(limit=256).drop(columns='position')
+    else:
+        df = load_data()
+        sample = df.head(256) if df is not None else None
+    # Dashboard processes attach to the published model host file when it is
+    # current, so the trees are mapped once instead of unpickled per process
+    from model_host import HOST_FILE, is_published
+    host_path = os.path.join(MODEL_DIR, HOST_FILE) if is_published(MODEL_DIR) else None
+    return ModelWarmup(scoring_model, model_dir=MODEL_DIR, sample=sample, host_path=host_path).start()
+
+@st.cache_resource
+def load_scoring_model(scoring_model='ensemble'):
+    """Model used for scoring (a HostedModel when the host file is published)"""
+    try:
+        return start_model_warmup(scoring_model).result()
     except FileNotFoundError:
+        if scoring_model == 'student':
+            st.error("Student model not found. Please run 'python model_training.py --distill' first.")
+            return None
         st.warning("Models not found. Training models...")
+        model = CreditRiskModel(scoring_model=scoring_model)
         df = load_data()
         if df is not None:
             model.train_models(df)
@@ -70,15 +140,105 @@ def load_models():
             return model
         return None
 
+@st.cache_resource
+def load_models(scoring_model='ensemble'):
+    """Full trained CreditRiskModel (explanations and feature importance need the estimators)"""
+    model = load_scoring_model(scoring_model)
+    if model is None or isinstance(model, CreditRiskModel):
+        return model
+    full = CreditRiskModel(scoring_model=scoring_model)
+    full.load_models(MODEL_DIR)
+    return full
+
+@st.cache_resource
+def load_store():
+    """SQLite portfolio store, if it was built from the current dataset, models and policy"""
+    store = PortfolioStore()
+    if not store.is_current(DATA_PATH, MODEL_DIR, CreditLimitEngine().policy):
+        return None
+    return store
+
+def stored_models():
+    """Scoring models whose recommendations are in the SQLite store"""
+    store = load_store()
+    return store.scoring_models() if store is not None else []
+
+@st.cache_resource
+def load_predictions(scoring_model='ensemble'):
+    """Score the portfolio once per scoring model (read from the store when available)"""
+    if scoring_model in stored_models():
+        return load_store().predictions(scoring_model)
+    df = load_data()
+    model = load_scoring_model(scoring_model)
+    if df is None or model is None:
+        return None
+    return model.predict_default_probability(df)
+
+@st.cache_resource
+def load_recommendation_index(scoring_model='ensemble'):
+    """Precompute recommendation filter indexes and aggregates once per scoring model"""
+    df = load_data()
+    df['predicted_default_prob'] = load_predictions(scoring_model)
+    engine = CreditLimitEngine()
+    df = df.assign(**engine.policy.evaluate(df))
+    
+    return RecommendationIndex(df[['customer_id', 'current_credit_limit', 'recommended_limit',
+                                   'change_amount', 'change_percentage', 'risk_category',
+                                   'credit_score', 'predicted_default_prob']])
+
+@st.cache_resource
+def load_portfolio_cube(scoring_model='ensemble'):
+    """Aggregate cube of the scored portfolio, built in one pass per scoring model"""
+    df = load_data()
+    df['predicted_default_prob'] = load_predictions(scoring_model)
+    return PortfolioCube.build(df)
+
+@st.cache_resource
+def load_explanations(scoring_model='ensemble'):
+    """Top-k model contributions per customer, computed once per scoring model"""
+    predictions = load_predictions(scoring_model)
+    if predictions is None:
+        return None
+    
+    # Reuse the pipeline's saved explanations when they explain these predictions
+    try:
+        saved = LocalExplanations.load('data/explanations.npz')
+        if len(saved) == len(predictions) and np.allclose(saved.predictions, predictions, atol=1e-5):
+            return saved
+    except FileNotFoundError:
+        pass
+    
+    return explain_portfolio(load_models(scoring_model), load_data())
+
+def histogram_figure(values, nbins, label, color):
+    """Histogram built from server-side bin counts (payload independent of row count)"""
+    import plotly.graph_objects as go
+    
+    counts = histogram_counts(values, nbins=nbins)
+    fig = go.Figure(go.Bar(x=counts['bin_center'], y=counts['count'],
+                           width=counts['bin_width'], marker_color=color,
+                           customdata=counts[['bin_left', 'bin_right']],
+                           hovertemplate='%{customdata[0]:.3g} - %{customdata[1]:.3g}'
+                                         '<br>count=%{y}<extra></extra>'))
+    fig.update_layout(xaxis_title=label, yaxis_title='Number of Customers', bargap=0)
+    return fig
+
+def show_memory_report():
+    """Memory report in the sidebar when started with CREDIT_MEMORY_PROFILE=1"""
+    profiler = get_memory_profiler()
+    if profiler is not None:
+        with st.sidebar.expander("🧠 Memory Report"):
+            st.dataframe(profiler.stage_report().round(1), hide_index=True)
+            st.dataframe(profiler.frame_report().round(1), hide_index=True)
+            st.dataframe(profiler.column_report().head(10).round(2), hide_index=True)
+
 def main():
+    # Before any model loads, so estimators and BLAS pools pick up the share
+    configure_threads()
+    
     st.markdown('<h1 class="main-header">💳 Dynamic Credit Limit Assignment System - India</h1>', 
                 unsafe_allow_html=True)
     
-    # Load data
-    df = load_data()
-    if df is None:
-        return
-    
     # Sidebar
     st.sidebar.header("⚙️ Settings")
     
@@ -89,30 +249,57 @@ def main():
          "🌍 Scenario Analysis", "🔍 Customer Details"]
     )
     
-    # Apply model predictions
-    model = load_models()
-    if model is None:
+    # Scoring model (the distilled student is available after 'model_training.py --distill')
+    scoring_model = st.sidebar.selectbox("Scoring Model", SCORING_MODELS,
+                                         help="'student' uses the compact distilled model")
+    
+    # Models load and warm up in the background while the first page renders
+    start_model_warmup(scoring_model)
+    
+    if page == "💻 Personal Credit Calculator":
+        show_personal_calculator()
+        return
+    
+    # Pages the up-to-date SQLite store answers never load the dataset
+    if page in STORE_PAGES and scoring_model in stored_models():
+        store = load_store()
+        show_memory_report()
+        if page == "🎯 Credit Recommendations":
+            show_recommendations(store.recommendations(scoring_model))
+        else:
+            show_customer_details(None, load_explanations(scoring_model), store, scoring_model)
+        return
+    
+    # Load data
+    df = load_data()
+    if df is None:
         return
     
+    # Apply model predictions (scored once per scoring model and cached)
     with st.spinner("Generating predictions..."):
-        df['predicted_default_prob'] = model.predict_default_probability(df)
+        predictions = load_predictions(scoring_model)
+    if predictions is None:
+        return
+    df['predicted_default_prob'] = predictions
+    profile_frame('dashboard_df', df)
+    show_memory_report()
     
     # Main content based on selected page
-    if page == "💻 Personal Credit Calculator":
-        show_personal_calculator()
-    elif page == "📊 Overview":
-        show_overview(df)
+    if page == "📊 Overview":
+        show_overview(df, load_portfolio_cube(scoring_model))
     elif page == "🎯 Credit Recommendations":
-        show_recommendations(df)
+        show_recommendations(load_recommendation_index(scoring_model))
     elif page == "📈 Risk Analysis":
-        show_risk_analysis(df)
+        show_risk_analysis(load_portfolio_cube(scoring_model))
     elif page == "🌍 Scenario Analysis":
-        show_scenario_analysis(df)
+        show_scenario_analysis(load_portfolio_cube(scoring_model))
     elif page == "🔍 Customer Details":
-        show_customer_details(df)
+        show_customer_details(df, load_explanations(scoring_model))
 
 def show_personal_calculator():
     """Interactive form for users to input their details and get credit limit recommendation"""
+    import plotly.graph_objects as go
+    
     st.header("💻 Personal Credit Limit Calculator")
     
     st.markdown("### Calculate your ideal credit card limit based on your financial profile")
@@ -185,56 +372,24 @@ def show_personal_calculator():
         )
         default_prob = max(0, min(1, default_prob))
         
-        # Calculate recommended limit
+        # Calculate recommended limit with the portfolio policy
+        # (the engine expects monthly income in ₹ thousands)
         engine = CreditLimitEngine()
-        
-        # Calculate base limit
-        if cibil_score >= 750:
-            score_multiplier = 1.5
-        elif cibil_score >= 700:
-            score_multiplier = 1.3
-        elif cibil_score >= 650:
-            score_multiplier = 1.1
-        elif cibil_score >= 550:
-            score_multiplier = 1.0
-        elif cibil_score >= 450:
-            score_multiplier = 0.8
-        else:
-            score_multiplier = 0.5
-        
-        base_limit = monthly_income * 2.5 * score_multiplier
-        
-        # Apply risk adjustment
-        risk_multiplier = 1 - (default_prob * 0.6)
-        
-        if utilization > 0.8:
-            risk_multiplier *= 0.9
-        elif utilization < 0.3:
-            risk_multiplier *= 1.1
-        
-        risk_multiplier += on_time_rate * 0.1
-        risk_multiplier += behavior_score * 0.1
-        risk_multiplier = max(0.2, min(2.0, risk_multiplier))
-        
-        recommended_limit = base_limit * risk_multiplier
-        recommended_limit = max(10000, min(recommended_limit, 500000))
+        recommended_limit = engine.calculate_recommended_limit({
+            'monthly_income': monthly_income / 1000,
+            'credit_score': cibil_score,
+            'predicted_default_prob': default_prob,
+            'credit_utilization': utilization,
+            'on_time_payment_rate': on_time_rate,
+            'behavior_score': behavior_score
+        })
         
         change_amount = recommended_limit - current_limit
         change_pct = (change_amount / current_limit) * 100
         
         # Determine risk category
-        if default_prob < 0.1:
-            risk_category = "Low Risk"
-            risk_color = "green"
-        elif default_prob < 0.25:
-            risk_category = "Medium Risk"
-            risk_color = "orange"
-        elif default_prob < 0.4:
-            risk_category = "High Risk"
-            risk_color = "red"
-        else:
-            risk_category = "Very High Risk"
-            risk_color = "darkred"
+        risk_category = engine.assign_risk_category(default_prob)
+        risk_color = RISK_COLORS.get(risk_category, "gray")
         
         # Display results
         st.divider()
@@ -315,17 +470,21 @@ def show_personal_calculator():
         fig.update_layout(yaxis_title="Credit Limit (₹)", height=300)
         st.plotly_chart(fig, use_container_width=True)
 
-def show_overview(df):
+def show_overview(df, cube):
     """Display overview dashboard"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     st.header("📊 Portfolio Overview")
     
-    # Key Metrics
+    # Key Metrics (read from the aggregate cube)
     col1, col2, col3, col4 = st.columns(4)
     
-    total_customers = len(df)
-    avg_credit_score = df['credit_score'].mean()
-    avg_utilization = df['credit_utilization'].mean() * 100
-    avg_default_prob = df['predicted_default_prob'].mean() * 100
+    totals = cube.totals()
+    total_customers = int(totals['count'])
+    avg_credit_score = totals['sum_credit_score'] / total_customers
+    avg_utilization = totals['sum_utilization'] / total_customers * 100
+    avg_default_prob = totals['sum_prob'] / total_customers * 100
     
     col1.metric("Total Customers", f"{total_customers:,}")
     col2.metric("Avg Credit Score", f"{avg_credit_score:.0f}")
@@ -339,17 +498,13 @@ def show_overview(df):
     
     with col1:
         st.subheader("Credit Score Distribution")
-        fig = px.histogram(df, x='credit_score', nbins=30,
-                          labels={'credit_score': 'Credit Score', 'count': 'Number of Customers'},
-                          color_discrete_sequence=['#1f77b4'])
+        fig = histogram_figure(df['credit_score'], 30, 'Credit Score', '#1f77b4')
         fig.update_layout(height=300)
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Credit Utilization Distribution")
-        fig = px.histogram(df, x='credit_utilization', nbins=30,
-                          labels={'credit_utilization': 'Credit Utilization', 'count': 'Number of Customers'},
-                          color_discrete_sequence=['#2ca02c'])
+        fig = histogram_figure(df['credit_utilization'], 30, 'Credit Utilization', '#2ca02c')
         fig.update_layout(height=300)
         st.plotly_chart(fig, use_container_width=True)
     
@@ -357,103 +512,104 @@ def show_overview(df):
     
     with col1:
         st.subheader("Default Risk Categories")
-        df['risk_category'] = pd.cut(df['predicted_default_prob'], 
-                                     bins=[0, 0.15, 0.3, 0.5, 1.0],
-                                     labels=['Low', 'Medium', 'High', 'Very High'])
-        risk_counts = df['risk_category'].value_counts().sort_index()
+        risk_counts = cube.group('default_risk_band')
         
-        fig = px.bar(x=risk_counts.index, y=risk_counts.values,
+        fig = px.bar(x=risk_counts['default_risk_band'], y=risk_counts['count'],
                     labels={'x': 'Risk Category', 'y': 'Number of Customers'},
-                    color=risk_counts.values,
+                    color=risk_counts['count'],
                     color_continuous_scale='RdYlGn_r')
         fig.update_layout(height=300, showlegend=False)
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Economic Scenario Breakdown")
-        scenario_map = {0: 'Normal (Moderate Growth)', 1: 'Slowdown', 2: 'High Growth'}
-        df['scenario_label'] = df['economic_scenario'].map(scenario_map)
-        scenario_counts = df['scenario_label'].value_counts()
+        scenario_counts = cube.group('economic_scenario')
         
-        fig = px.pie(values=scenario_counts.values, names=scenario_counts.index,
+        fig = px.pie(values=scenario_counts['count'], names=scenario_counts['economic_scenario'],
                     hole=0.4)
         fig.update_layout(height=300)
         st.plotly_chart(fig, use_container_width=True)
     
     # Risk-return scatter plot
     st.subheader("Risk vs Current Credit Limit")
-    fig = px.scatter(df, x='credit_utilization', y='current_credit_limit',
-                    size='predicted_default_prob', color='credit_score',
-                    hover_data=['customer_id', 'predicted_default_prob'],
-                    labels={'credit_utilization': 'Credit Utilization',
-                           'current_credit_limit': 'Current Credit Limit (₹)',
-                           'predicted_default_prob': 'Default Probability',
-                           'credit_score': 'CIBIL Score'},
-                    color_continuous_scale='RdYlGn')
+    if should_bin(len(df)):
+        # Large portfolios: 2-D density grid aggregated server-side
+        grid = density_grid(df['credit_utilization'], df['current_credit_limit'],
+                            values={'predicted_default_prob': df['predicted_default_prob']})
+        fig = go.Figure(go.Heatmap(
+            x=grid['x_centers'], y=grid['y_centers'], z=grid['count'],
+            customdata=grid['predicted_default_prob'],
+            colorscale='Blues', colorbar=dict(title='Customers'),
+            hovertemplate='Utilization %{x:.2f}<br>Limit ₹%{y:,.0f}<br>Customers %{z}'
+                          '<br>Avg Default Probability %{customdata:.2%}<extra></extra>'
+        ))
+        fig.update_layout(xaxis_title='Credit Utilization', yaxis_title='Current Credit Limit (₹)')
+        st.caption(f"{len(df):,} customers shown as a density grid")
+    else:
+        fig = px.scatter(df, x='credit_utilization', y='current_credit_limit',
+                        size='predicted_default_prob', color='credit_score',
+                        hover_data=['customer_id', 'predicted_default_prob'],
+                        labels={'credit_utilization': 'Credit Utilization',
+                               'current_credit_limit': 'Current Credit Limit (₹)',
+                               'predicted_default_prob': 'Default Probability',
+                               'credit_score': 'CIBIL Score'},
+                        color_continuous_scale='RdYlGn')
     st.plotly_chart(fig, use_container_width=True, height=500)
 
-def show_recommendations(df):
+def show_recommendations(index):
     """Display credit limit recommendations"""
+    import plotly.express as px
+    
     st.header("🎯 Credit Limit Recommendations")
     
-    # Calculate recommendations
+    # Recommendations are precomputed in the index (or the SQLite store); filtering
+    # and paging happen there so only the visible page is styled and sent to the browser
     engine = CreditLimitEngine()
-    df['recommended_limit'] = df.apply(
-        lambda row: engine.calculate_recommended_limit({
-            'monthly_income': row['monthly_income'],
-            'credit_score': row['credit_score'],
-            'predicted_default_prob': row['predicted_default_prob'],
-            'credit_utilization': row['credit_utilization'],
-            'on_time_payment_rate': row['on_time_payment_rate'],
-            'behavior_score': row['behavior_score']
-        }),
-        axis=1
-    )
-    
-    df['change_amount'] = df['recommended_limit'] - df['current_credit_limit']
-    df['change_percentage'] = (df['change_amount'] / df['current_credit_limit']) * 100
-    df['risk_category'] = df['predicted_default_prob'].apply(engine.assign_risk_category)
+    categories = [c for c in engine.policy.risk_labels if c in index.categories]
     
     # Filters
     col1, col2, col3 = st.columns(3)
     with col1:
         risk_filter = st.multiselect("Filter by Risk Category", 
-                                     df['risk_category'].unique(),
-                                     default=df['risk_category'].unique())
+                                     categories,
+                                     default=categories)
     with col2:
         change_filter = st.selectbox("Credit Change Filter",
                                     ["All", "Increase Only", "Decrease Only", "No Change"])
     with col3:
-        score_threshold = st.slider("Min Credit Score", 
-                                    int(df['credit_score'].min()),
-                                    int(df['credit_score'].max()),
-                                    int(df['credit_score'].min()))
+        min_score, max_score = index.score_range()
+        score_threshold = st.slider("Min Credit Score", min_score, max_score, min_score)
     
     # Apply filters
-    filtered_df = df[df['risk_category'].isin(risk_filter)]
-    filtered_df = filtered_df[filtered_df['credit_score'] >= score_threshold]
-    
-    if change_filter == "Increase Only":
-        filtered_df = filtered_df[filtered_df['change_amount'] > 0]
-    elif change_filter == "Decrease Only":
-        filtered_df = filtered_df[filtered_df['change_amount'] < 0]
+    change = {"All": None, "Increase Only": 'increase',
+              "Decrease Only": 'decrease', "No Change": 'no_change'}[change_filter]
+    filters = (risk_filter, change, score_threshold)
+    summary = index.summary(*filters)
     
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Recommended", len(filtered_df))
-    col2.metric("Avg Current Limit", f"₹{filtered_df['current_credit_limit'].mean():,.0f}")
-    col3.metric("Avg Recommended", f"₹{filtered_df['recommended_limit'].mean():,.0f}")
+    col1.metric("Total Recommended", summary['count'])
+    col2.metric("Avg Current Limit", f"₹{summary['avg_current_limit']:,.0f}")
+    col3.metric("Avg Recommended", f"₹{summary['avg_recommended_limit']:,.0f}")
     col4.metric("Total Exposure Change", 
-                f"₹{filtered_df['change_amount'].sum():,.0f}")
+                f"₹{summary['total_change']:,.0f}")
     
-    # Recommendation table
+    # Recommendation table (highest credit score first)
     display_cols = ['customer_id', 'current_credit_limit', 'recommended_limit',
                    'change_amount', 'change_percentage', 'risk_category',
                    'credit_score', 'predicted_default_prob']
     
     st.subheader("Recommendation Details")
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Rows per page", [50, 100, 250], index=0)
+    n_pages = max(1, -(-summary['count'] // page_size))
+    with col2:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    page_df, n_pages = index.page(*filters, page=page, page_size=page_size)
+    
     st.dataframe(
-        filtered_df[display_cols].style.format({
+        page_df[display_cols].style.format({
             'current_credit_limit': '₹{:,.0f}',
             'recommended_limit': '₹{:,.0f}',
             'change_amount': '₹{:,.0f}',
@@ -464,21 +620,37 @@ def show_recommendations(df):
         height=400
     )
     
+    # Exports are built only on request, streaming the filtered rows in chunks
+    col1, col2 = st.columns(2)
+    with col1:
+        export_format = st.selectbox("Export format", list(RECOMMENDATION_EXPORTS))
+    export_key = (id(index), repr(filters), export_format)
+    with col2:
+        st.write("")
+        if st.button("📦 Prepare export", help="Build the file of all filtered rows"):
+            build, _, _ = RECOMMENDATION_EXPORTS[export_format]
+            with st.spinner("Preparing export..."):
+                st.session_state['recommendation_export'] = (
+                    export_key, build(index.chunks(*filters, columns=display_cols)))
+    prepared = st.session_state.get('recommendation_export')
+    if prepared is not None and prepared[0] == export_key:
+        _, file_name, mime = RECOMMENDATION_EXPORTS[export_format]
+        st.download_button(f"⬇️ Download {file_name}", data=prepared[1], file_name=file_name, mime=mime)
+    
     # Charts
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Credit Limit Changes Distribution")
-        fig = px.histogram(filtered_df, x='change_percentage', nbins=40,
-                          labels={'change_percentage': 'Change Percentage (%)'},
-                          color_discrete_sequence=['#ff7f0e'])
+        fig = histogram_figure(index.values('change_percentage', *filters), 40,
+                               'Change Percentage (%)', '#ff7f0e')
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Current vs Recommended Limits")
-        sample_df = filtered_df.nlargest(30, 'change_amount')[['customer_id', 
-                                                              'current_credit_limit',
-                                                              'recommended_limit']]
+        sample_df = index.largest(30, 'change_amount', *filters)[['customer_id',
+                                                                  'current_credit_limit',
+                                                                  'recommended_limit']]
         sample_df = sample_df.melt(id_vars='customer_id', 
                                    value_vars=['current_credit_limit', 'recommended_limit'],
                                    var_name='Type', value_name='Limit')
@@ -489,35 +661,20 @@ def show_recommendations(df):
         fig.update_xaxes(tickangle=45)
         st.plotly_chart(fig, use_container_width=True)
 
-def show_risk_analysis(df):
+def show_risk_analysis(cube):
     """Display risk analysis"""
-    st.header("📈 Risk Analysis")
-    
-    # Apply recommendations for risk calculation
-    engine = CreditLimitEngine()
-    df['recommended_limit'] = df.apply(
-        lambda row: engine.calculate_recommended_limit({
-            'monthly_income': row['monthly_income'],
-            'credit_score': row['credit_score'],
-            'predicted_default_prob': row['predicted_default_prob'],
-            'credit_utilization': row['credit_utilization'],
-            'on_time_payment_rate': row['on_time_payment_rate'],
-            'behavior_score': row['behavior_score']
-        }),
-        axis=1
-    )
+    import plotly.express as px
     
-    # Calculate risk metrics
-    df['expected_loss'] = df['predicted_default_prob'] * df['recommended_limit']
-    df['risk_category'] = df['predicted_default_prob'].apply(engine.assign_risk_category)
+    st.header("📈 Risk Analysis")
     
-    # Risk metrics
+    # Risk metrics (read from the aggregate cube)
     col1, col2, col3, col4 = st.columns(4)
     
-    total_exposure = df['recommended_limit'].sum()
-    total_expected_loss = df['expected_loss'].sum()
-    avg_risk = df['predicted_default_prob'].mean() * 100
-    high_risk_count = len(df[df['predicted_default_prob'] > 0.35])
+    totals = cube.totals()
+    total_exposure = totals['exposure']
+    total_expected_loss = totals['expected_loss']
+    avg_risk = totals['sum_prob'] / totals['count'] * 100
+    high_risk_count = int(totals['high_risk_count'])
     
     col1.metric("Total Exposure", f"₹{total_exposure:,.0f}")
     col2.metric("Expected Loss", f"₹{total_expected_loss:,.0f}")
@@ -526,16 +683,13 @@ def show_risk_analysis(df):
     
     st.divider()
     
-    # Risk heatmap
+    # Risk heatmap over the cube's recommended-limit and probability bands
     st.subheader("Risk Heatmap: Default Probability vs Credit Limit")
-    df['limit_bin'] = pd.cut(df['recommended_limit'], bins=5, labels=['Low', 'Med-Low', 
-                                                                       'Medium', 'Med-High', 'High'])
-    df['prob_bin'] = pd.cut(df['predicted_default_prob'], bins=5)
+    heatmap_data = cube.group(['limit_band', 'prob_band'])
+    heatmap_data = heatmap_data.pivot(index='limit_band', columns='prob_band', values='count')
+    heatmap_data = heatmap_data.loc[cube.dimensions['limit_band'], cube.dimensions['prob_band']]
     
-    heatmap_data = df.groupby(['limit_bin', 'prob_bin']).size().reset_index(name='count')
-    heatmap_data = heatmap_data.pivot(index='limit_bin', columns='prob_bin', values='count')
-    
-    fig = px.imshow(heatmap_data.fillna(0), 
+    fig = px.imshow(heatmap_data, 
                    labels=dict(x="Default Probability", y="Credit Limit", color="Count"),
                    color_continuous_scale='RdYlGn_r')
     st.plotly_chart(fig, use_container_width=True)
@@ -555,29 +709,17 @@ def show_risk_analysis(df):
             fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
 
-def show_scenario_analysis(df):
+def show_scenario_analysis(cube):
     """Display scenario analysis"""
+    import plotly.express as px
+    
     st.header("🌍 Scenario Analysis")
     
     st.markdown("### Analyze credit limit recommendations under different economic conditions")
     
-    # Calculate base recommendations
-    engine = CreditLimitEngine()
-    df['recommended_limit'] = df.apply(
-        lambda row: engine.calculate_recommended_limit({
-            'monthly_income': row['monthly_income'],
-            'credit_score': row['credit_score'],
-            'predicted_default_prob': row['predicted_default_prob'],
-            'credit_utilization': row['credit_utilization'],
-            'on_time_payment_rate': row['on_time_payment_rate'],
-            'behavior_score': row['behavior_score']
-        }),
-        axis=1
-    )
-    
-    # Run scenario analysis
+    # Run scenario analysis on the aggregate cube of recommended limits
     analyzer = ScenarioAnalyzer()
-    scenario_results = analyzer.analyze_scenarios(df)
+    scenario_results = analyzer.analyze_cube(cube)
     
     # Display results
     st.subheader("Scenario Comparison")
@@ -587,6 +729,10 @@ def show_scenario_analysis(df):
         'avg_limit_change_pct': '{:.2f}%',
         'weighted_avg_risk': '{:.2%}'
     }))
+    # A few rows, so the workbook is cheap to build on every run
+    st.download_button("⬇️ Export Scenario Table to Excel",
+                       data=excel_bytes({'Scenarios': scenario_results}),
+                       file_name='scenario_analysis.xlsx', mime=XLSX_MIME)
     
     # Scenario charts
     col1, col2 = st.columns(2)
@@ -622,7 +768,7 @@ def show_scenario_analysis(df):
     st.plotly_chart(fig, use_container_width=True)
     
     # Get recommendations
-    recommendations = analyzer.get_scenario_recommendation(df)
+    recommendations = analyzer.get_scenario_recommendation(cube)
     
     st.subheader("Scenario Recommendations")
     for _, row in recommendations.iterrows():
@@ -632,42 +778,47 @@ def show_scenario_analysis(df):
             st.metric("Total Exposure", f"₹{row['total_exposure']:,.0f}")
             st.metric("Weighted Risk", f"{row['weighted_avg_risk']:.2%}")
 
-def show_customer_details(df):
+def show_customer_details(df, explanations, store=None, scoring_model='ensemble'):
     """Display detailed customer information"""
     st.header("🔍 Customer Details")
     
-    # Search customer
-    customer_id = st.selectbox("Select Customer", 
-                              ['All'] + sorted(df['customer_id'].unique().tolist()))
-    
-    if customer_id == 'All':
-        search_df = df
+    # Search customers by id prefix using the SQLite store or the prebuilt index
+    query = st.text_input("Search Customer ID", placeholder="e.g. CUST_001",
+                          help="Matches every customer whose id starts with this text").strip()
+    if store is not None:
+        n_matches = store.count_customers(query)
     else:
-        search_df = df[df['customer_id'] == customer_id]
+        matches = load_customer_index().prefix_search(query)
+        n_matches = len(matches)
     
-    # Calculate recommendations for displayed customers
-    engine = CreditLimitEngine()
+    if n_matches == 0:
+        st.info(f"No customers match '{query}'.")
+        return
     
-    def process_row(row):
-        rec = engine.calculate_recommended_limit({
-            'monthly_income': row['monthly_income'],
-            'credit_score': row['credit_score'],
-            'predicted_default_prob': row['predicted_default_prob'],
-            'credit_utilization': row['credit_utilization'],
-            'on_time_payment_rate': row['on_time_payment_rate'],
-            'behavior_score': row['behavior_score']
-        })
-        return rec
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Customers per page", [10, 25, 50], index=0)
+    n_pages = max(1, -(-n_matches // page_size))
+    with col2:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
     
-    search_df = search_df.copy()
-    search_df['recommended_limit'] = search_df.apply(process_row, axis=1)
-    search_df['change_amount'] = search_df['recommended_limit'] - search_df['current_credit_limit']
-    search_df['change_percentage'] = (search_df['change_amount'] / search_df['current_credit_limit']) * 100
-    search_df['risk_category'] = search_df['predicted_default_prob'].apply(engine.assign_risk_category)
+    if store is not None:
+        search_df = store.search_customers(query, limit=page_size, offset=(page - 1) * page_size,
+                                           scoring_model=scoring_model)
+        page_rows = search_df.pop('position').to_numpy()
+    else:
+        page_rows, n_pages = paginate(matches, page, page_size)
+        search_df = df.iloc[page_rows]
+    st.caption(f"Showing {len(page_rows)} of {n_matches:,} matching customers")
+    
+    # Calculate recommendations only for the customers on this page
+    engine = CreditLimitEngine()
+    search_df = search_df.assign(**engine.policy.evaluate(search_df))
+    expand = n_matches == 1
     
     # Display details
-    for idx, row in search_df.iterrows():
-        with st.expander(f"{row['customer_id']} - {row['risk_category']}"):
+    for position, (idx, row) in zip(page_rows, search_df.iterrows()):
+        with st.expander(f"{row['customer_id']} - {row['risk_category']}", expanded=expand):
             col1, col2 = st.columns(2)
             
             with col1:
@@ -689,6 +840,13 @@ def show_customer_details(df):
             col1.metric("On-Time Payment Rate", f"{row['on_time_payment_rate']:.1%}")
             col2.metric("Behavior Score", f"{row['behavior_score']:.3f}")
             col3.metric("Payment History Score", f"{row['payment_history_score']:.3f}")
+            
+            st.markdown("**Model Drivers**")
+            reasons = explanations.reasons(position)
+            if reasons:
+                st.markdown("\n".join(f"- {reason}" for reason in reasons))
+            else:
+                st.write("No single feature moves this customer's risk noticeably.")
 
 if __name__ == '__main__':
     main()
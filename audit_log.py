@@ -0,0 +1,230 @@
+"""
+Limit Decision Audit Log
+Append-only, compressed Parquet log of every limit decision (inputs,
+predicted probability, recommended limit, reason, model and policy version),
+buffered in memory and flushed in large batches into date/run partitions,
+with time-range queries by customer_id
+Run: python audit_log.py --customer CUST_000001 [--start 2026-01-01] [--end 2026-12-31]
+"""
+
+import os
+import glob
+import uuid
+import hashlib
+from datetime import datetime, timezone
+
+import pandas as pd
+
+AUDIT_DIR = 'data/audit/'
+
+# Saved artifacts that define a model version
+MODEL_VERSION_FILES = ['rf_model.pkl', 'xgb_model.pkl', 'feature_columns.pkl', 'quantizer.pkl',
+                       'student_model.pkl']
+
+def model_version(model_dir='models/'):
+    """Short content hash of the saved models, recorded with each decision"""
+    digest = hashlib.sha256()
+    for name in MODEL_VERSION_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            digest.update(name.encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()[:12]
+
+def new_run_id():
+    """Sortable, unique id of one scoring run"""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+def _utc(timestamp):
+    """Timestamp in UTC (naive values are taken as UTC), None stays None"""
+    if timestamp is None:
+        return None
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+class AuditLogWriter:
+    """Buffers decisions and appends them to the log in large compressed batches"""
+
+    def __init__(self, root=AUDIT_DIR, run_id=None, model_version=None, buffer_rows=100000,
+                 part_prefix=None, compression='zstd', row_group_rows=65536):
+        """
+        Parameters:
+        - root: log directory (partitions date=YYYY-MM-DD/run=<run_id>/)
+        - run_id: id of this scoring run (generated if None)
+        - model_version: version string of the models (see model_version())
+        - buffer_rows: decisions held in memory before a flush
+        - part_prefix: file name prefix, unique per writer of the same run
+          (defaults to a random one, so parallel writers never collide)
+        - compression: Parquet codec
+        - row_group_rows: rows per row group; files are sorted by customer_id,
+          so row-group statistics let customer queries skip most of each file
+        """
+        if buffer_rows <= 0:
+            raise ValueError("buffer_rows must be positive")
+        self.root = root
+        self.run_id = run_id or new_run_id()
+        self.model_version = model_version
+        self.buffer_rows = buffer_rows
+        self.part_prefix = part_prefix or uuid.uuid4().hex[:8]
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self._buffer = []
+        self._buffered_rows = 0
+        self._parts = 0
+        self.rows_written = 0
+        self.files_written = []
+
+    def record(self, decisions, policy_version=None, decided_at=None):
+        """
+        Add decisions to the buffer, flushing once buffer_rows is reached
+
+        Parameters:
+        - decisions: DataFrame with customer_id and the decision and input columns
+        - policy_version: version of the policy that made the decisions
+        - decided_at: decision timestamp (default: now, UTC)
+        """
+        if 'customer_id' not in decisions.columns:
+            raise ValueError("Audit records need a customer_id column")
+        decided_at = _utc(decided_at or datetime.now(timezone.utc))
+
+        batch = decisions.reset_index(drop=True)
+        batch = batch.assign(
+            decided_at=decided_at,
+            run_id=self.run_id,
+            model_version=self.model_version,
+            policy_version=None if policy_version is None else str(policy_version)
+        )
+        self._buffer.append(batch)
+        self._buffered_rows += len(batch)
+        if self._buffered_rows >= self.buffer_rows:
+            self.flush()
+        return self
+
+    def flush(self):
+        """Write buffered decisions as new files (one per decision date)"""
+        if not self._buffer:
+            return []
+        buffered = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        self._buffered_rows = 0
+
+        written = []
+        days = buffered['decided_at'].dt.floor('D')
+        for day, part in buffered.groupby(days, sort=True):
+            part = part.sort_values('customer_id', kind='stable')
+            written.append(self._write_part(f'{day:%Y-%m-%d}', part))
+        self.rows_written += len(buffered)
+        return written
+
+    def _write_part(self, date, df):
+        """Write one new file of a partition; existing files are never replaced"""
+        partition = os.path.join(self.root, f'date={date}', f'run={self.run_id}')
+        os.makedirs(partition, exist_ok=True)
+        while True:
+            path = os.path.join(partition, f'part-{self.part_prefix}-{self._parts:05d}.parquet')
+            self._parts += 1
+            if not os.path.exists(path):
+                break
+
+        # Partition values live in the directory names, not in the file
+        columns = [col for col in df.columns if col != 'run_id']
+        # Dot-prefixed temporary names are ignored by dataset discovery
+        tmp_path = os.path.join(partition, f'.{os.path.basename(path)}.tmp')
+        df[columns].to_parquet(tmp_path, index=False, compression=self.compression,
+                               row_group_size=self.row_group_rows)
+        os.replace(tmp_path, path)
+        self.files_written.append(path)
+        return path
+
+    def has_parts(self):
+        """True if this run already has files with this writer's part_prefix (any date)"""
+        pattern = os.path.join(self.root, 'date=*', f'run={self.run_id}',
+                               f'part-{self.part_prefix}-*.parquet')
+        return bool(glob.glob(pattern))
+
+    def close(self):
+        """Flush any remaining decisions"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def query_audit_log(root=AUDIT_DIR, customer_ids=None, start=None, end=None, run_id=None,
+                    columns=None):
+    """
+    Decisions from the log, oldest first
+
+    Date partitions outside [start, end] are never opened, and customer_id
+    filters are checked against row-group statistics before any data is read.
+
+    Parameters:
+    - root: log directory
+    - customer_ids: customer id or list of ids (None: all customers)
+    - start, end: inclusive decision time range (anything pd.Timestamp accepts)
+    - run_id: restrict to one run
+    - columns: columns to return (default: all)
+    """
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(root):
+        raise ValueError(f"No audit log at {root}")
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+
+    start, end = _utc(start), _utc(end)
+    # A date-only end bound covers that whole day
+    if end is not None and end == end.normalize():
+        end = end + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field('date') >= start.strftime('%Y-%m-%d'))
+        conditions.append(ds.field('decided_at') >= start.to_pydatetime())
+    if end is not None:
+        conditions.append(ds.field('date') <= end.strftime('%Y-%m-%d'))
+        conditions.append(ds.field('decided_at') <= end.to_pydatetime())
+    if run_id is not None:
+        conditions.append(ds.field('run') == run_id)
+    if customer_ids is not None:
+        ids = [customer_ids] if isinstance(customer_ids, str) else list(customer_ids)
+        conditions.append(ds.field('customer_id').isin(ids))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    table = dataset.to_table(filter=expression, columns=columns)
+    df = table.to_pandas()
+    if 'run' in df.columns:
+        df = df.rename(columns={'run': 'run_id'})
+    if 'decided_at' in df.columns:
+        df = df.sort_values('decided_at', kind='stable')
+    return df.reset_index(drop=True)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the limit decision audit log")
+    parser.add_argument('--root', default=AUDIT_DIR)
+    parser.add_argument('--customer', nargs='+', default=None, help="customer id(s)")
+    parser.add_argument('--start', default=None, help="earliest decision time (e.g. 2026-01-01)")
+    parser.add_argument('--end', default=None, help="latest decision time (inclusive)")
+    parser.add_argument('--run', default=None, help="run id")
+    args = parser.parse_args()
+
+    try:
+        decisions = query_audit_log(args.root, args.customer, args.start, args.end, args.run)
+    except ValueError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+
+    print(f"{len(decisions):,} decisions")
+    if len(decisions):
+        shown = [col for col in ['decided_at', 'run_id', 'customer_id', 'predicted_default_prob',
+                                 'recommended_limit', 'adjustment_reason', 'model_version',
+                                 'policy_version'] if col in decisions.columns]
+        print(decisions[shown].tail(20).to_string(index=False))
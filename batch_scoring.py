@@ -0,0 +1,371 @@
+"""
+Resumable Batch Scoring
+Scores a customer dataset outside the dashboard in fixed-size chunks across
+worker processes, writing each chunk as an atomic output shard and tracking
+completed shards in a checkpoint manifest so interrupted runs resume
+Run: python batch_scoring.py --input data/credit_data.csv --output data/scored/
+"""
+
+import os
+import sys
+import json
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from credit_policy import CreditPolicy
+from drift_monitor import DriftMonitor
+from summary_sketches import FrameSketch, merge_sketches
+from audit_log import AuditLogWriter, model_version, new_run_id
+from thread_budget import plan_workers, apply_thread_limit
+
+MANIFEST_NAME = 'manifest.json'
+
+# Per-process scoring state, set up once by _init_worker
+_worker_model = None
+_worker_policy = None
+_worker_audit = None
+
+def _init_worker(model_dir, scoring_model, policy_config, n_threads, host_path=None, audit=None):
+    """Load the models once per worker process (or attach to the shared host file)"""
+    global _worker_model, _worker_policy, _worker_audit
+    _worker_audit = audit
+    # Each worker gets its share of the thread budget (models, BLAS and OpenMP)
+    apply_thread_limit(n_threads)
+    if host_path is not None:
+        from model_host import HostedModel
+        _worker_model = HostedModel.attach(path=host_path, scoring_model=scoring_model)
+        monitor_path = os.path.join(model_dir, 'drift_monitor.pkl')
+        if os.path.exists(monitor_path):
+            _worker_model.drift_monitor = DriftMonitor.load(monitor_path).for_model(scoring_model)
+        _worker_policy = CreditPolicy(policy_config)
+        return
+
+    from model_training import CreditRiskModel
+    model = CreditRiskModel(scoring_model=scoring_model)
+    model.load_models(model_dir)
+
+    _worker_model = model
+    _worker_policy = CreditPolicy(policy_config)
+
+def score_chunk(df, model, policy):
+    """
+    Score one chunk of customers
+
+    Parameters:
+    - df: DataFrame with customer data
+    - model: CreditRiskModel with loaded models
+    - policy: CreditPolicy used for recommended limits
+
+    Returns the chunk with predicted_default_prob and the policy outputs appended.
+    """
+    scored = df.copy()
+    scored['predicted_default_prob'] = model.predict_default_probability(df)
+    evaluated = policy.evaluate(scored)
+    for col in evaluated.columns:
+        scored[col] = evaluated[col].to_numpy()
+    return scored
+
+def _write_atomic(df, path):
+    """Write a Parquet file via a temporary name so readers never see partial shards"""
+    tmp_path = f'{path}.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _score_shard(shard, df, out_dir):
+    """
+    Worker task: score a chunk, write its shard plus summary sketch and
+    return its drift histogram
+    """
+    start = time.perf_counter()
+    scored = score_chunk(df, _worker_model, _worker_policy)
+    name = f'shard={shard:05d}.parquet'
+    # The sketch and audit records land before the shard so every recorded shard has them
+    FrameSketch.from_frame(scored).save(os.path.join(out_dir, f'shard={shard:05d}.summary.json'))
+    if _worker_audit is not None:
+        _audit_shard(shard, df, scored)
+    _write_atomic(scored, os.path.join(out_dir, name))
+
+    monitor = _worker_model.drift_monitor
+    counts = monitor.histogram(df, scored['predicted_default_prob']) if monitor is not None else None
+    return shard, name, len(scored), time.perf_counter() - start, counts
+
+def _audit_shard(shard, df, scored):
+    """
+    Record a scored shard's decisions in the audit log as one file
+
+    The file name is keyed by run and shard, so a resumed run skips shards
+    whose decisions were logged before it stopped (the file is written
+    atomically: if it exists, it is complete). Records go through
+    process_customers, so they match the engine's audit records exactly.
+    """
+    from credit_limit_engine import CreditLimitEngine
+    writer = AuditLogWriter(_worker_audit['root'], run_id=_worker_audit['run_id'],
+                            model_version=_worker_audit['model_version'],
+                            buffer_rows=len(df) + 1, part_prefix=f'shard{shard:05d}')
+    if writer.has_parts():
+        return
+    engine = CreditLimitEngine(_worker_policy)
+    engine.process_customers(df.assign(predicted_default_prob=scored['predicted_default_prob'].to_numpy()),
+                             audit_log=writer)
+    writer.close()
+
+def _read_chunks(path, chunk_size):
+    """Yield consecutive chunks of a CSV or Parquet dataset"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+def _count_rows(path):
+    """Number of data rows in the input (used for progress and ETA)"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, 'rb') as f:
+        lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+    return max(lines - 1, 0)
+
+class BatchScoringJob:
+    """Chunked, checkpointed scoring of a dataset into Parquet shards"""
+
+    def __init__(self, input_path, out_dir='data/scored/', chunk_size=50000, workers=None,
+                 scoring_model='ensemble', policy=None, model_dir='models/', shared_models=False,
+                 audit_dir=None):
+        """
+        Parameters:
+        - input_path: CSV or Parquet dataset to score
+        - out_dir: directory for shards and the checkpoint manifest
+        - chunk_size: rows per shard
+        - workers: worker processes (defaults to one per budgeted thread, see thread_budget.py)
+        - scoring_model: 'ensemble' or 'student'
+        - policy: CreditPolicy, config or version key for recommended limits
+        - model_dir: directory of the saved models
+        - shared_models: workers attach to one memory-mapped copy of the trees
+          (model_host.py) instead of each unpickling the models
+        - audit_dir: if set, every decision is appended to this audit log
+          (audit_log.py), one file per shard under the run's partition
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.input_path = input_path
+        self.out_dir = out_dir
+        self.chunk_size = chunk_size
+        self.workers, self.threads_per_worker = plan_workers(workers)
+        self.scoring_model = scoring_model
+        self.policy = policy if isinstance(policy, CreditPolicy) else CreditPolicy(policy)
+        self.model_dir = model_dir
+        self.shared_models = shared_models
+        self.audit_dir = audit_dir
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self.drift_report_path = os.path.join(out_dir, 'drift_report.csv')
+        self.summary_path = os.path.join(out_dir, 'summary.json')
+
+    def _job_signature(self):
+        """Settings a resumed run must share with the original run"""
+        stat = os.stat(self.input_path)
+        return {
+            'input_path': os.path.abspath(self.input_path),
+            'input_size': stat.st_size,
+            'input_mtime': stat.st_mtime,
+            'chunk_size': self.chunk_size,
+            'scoring_model': self.scoring_model,
+            # Retrained models must not resume into shards scored by the old ones
+            'model_version': model_version(self.model_dir),
+            'policy': self.policy.config
+        }
+
+    def load_manifest(self, restart=False):
+        """
+        Manifest of the run in out_dir, or a fresh one
+
+        Raises ValueError if a manifest exists for different input or settings
+        (pass restart=True to discard it).
+        """
+        signature = self._job_signature()
+        if os.path.exists(self.manifest_path) and not restart:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest['job'] != signature:
+                raise ValueError(f"{self.manifest_path} belongs to a different scoring job; "
+                                 "use --restart to start over")
+            return manifest
+        return {'job': signature, 'completed': {}, 'drift_counts': None, 'finished': False,
+                'run_id': new_run_id()}
+
+    def save_manifest(self, manifest):
+        """Atomically rewrite the checkpoint manifest"""
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def run(self, restart=False, progress_every=1.0):
+        """
+        Score the dataset, skipping shards recorded as completed
+
+        Shards are written atomically and added to the manifest as they finish,
+        so a killed run resumes from the completed shards. Progress, rows/sec
+        and ETA are printed at most every progress_every seconds. Drift
+        histograms of completed shards are accumulated in the manifest and a
+        PSI/KS report against the training data is written at the end, along
+        with portfolio statistics merged from the per-shard summary sketches.
+
+        Returns the manifest.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest = self.load_manifest(restart)
+        completed = manifest['completed']
+        self.save_manifest(manifest)
+
+        # Drift counts of completed shards, carried over on resume
+        monitor_path = os.path.join(self.model_dir, 'drift_monitor.pkl')
+        monitor = (DriftMonitor.load(monitor_path).for_model(self.scoring_model)
+                   if os.path.exists(monitor_path) else None)
+        if monitor is not None and manifest.get('drift_counts'):
+            monitor.merge(manifest['drift_counts'])
+
+        total_rows = _count_rows(self.input_path)
+        done_rows = sum(entry['rows'] for entry in completed.values())
+        resumed_rows = done_rows
+        if completed:
+            print(f"Resuming: {len(completed)} shards ({done_rows:,} rows) already scored")
+
+        host_path = None
+        if self.shared_models:
+            from model_host import ensure_published
+            host_path = ensure_published(self.model_dir)
+        audit = None
+        if self.audit_dir is not None:
+            # A resumed run keeps its run id; re-scored shards are logged again
+            audit = {'root': self.audit_dir, 'run_id': manifest.setdefault('run_id', new_run_id()),
+                     'model_version': model_version(self.model_dir)}
+        start = time.perf_counter()
+        last_report = 0.0
+        pending = set()
+
+        def collect(futures):
+            nonlocal done_rows
+            for future in futures:
+                shard, name, rows, seconds, counts = future.result()
+                completed[str(shard)] = {'file': name, 'rows': rows, 'seconds': round(seconds, 3)}
+                done_rows += rows
+                if monitor is not None and counts is not None:
+                    monitor.merge(counts)
+            if monitor is not None:
+                manifest['drift_counts'] = monitor.current_counts()
+            self.save_manifest(manifest)
+
+        def report(force=False):
+            nonlocal last_report
+            elapsed = time.perf_counter() - start
+            if not force and elapsed - last_report < progress_every:
+                return
+            last_report = elapsed
+            rate = (done_rows - resumed_rows) / elapsed if elapsed > 0 else 0.0
+            remaining = max(total_rows - done_rows, 0)
+            eta = f"{remaining / rate:,.0f}s" if rate > 0 else "--"
+            pct = 100 * done_rows / total_rows if total_rows else 100.0
+            print(f"  {done_rows:,}/{total_rows:,} rows ({pct:5.1f}%) | "
+                  f"{rate:,.0f} rows/s | ETA {eta}", flush=True)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.model_dir, self.scoring_model,
+                                           self.policy.config, self.threads_per_worker, host_path,
+                                           audit)) as pool:
+            for shard, chunk in enumerate(_read_chunks(self.input_path, self.chunk_size)):
+                if str(shard) in completed:
+                    continue
+                # Bound the chunks held in memory
+                if len(pending) >= 2 * self.workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                    report()
+                pending.add(pool.submit(_score_shard, shard, chunk, self.out_dir))
+
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+                report()
+
+        manifest['finished'] = True
+        self.save_manifest(manifest)
+        report(force=True)
+
+        elapsed = time.perf_counter() - start
+        print(f"Scored {done_rows - resumed_rows:,} rows in {elapsed:.1f}s "
+              f"({len(completed)} shards in {self.out_dir})")
+
+        self.summary().save(self.summary_path)
+        print(f"Portfolio summary saved to {self.summary_path}")
+
+        if monitor is not None:
+            drift = monitor.report()
+            drift.to_csv(self.drift_report_path, index=False)
+            drifted = drift[drift['status'] != 'stable']
+            print(f"Drift vs training data: {len(drifted)} of {len(drift)} features moved "
+                  f"(report: {self.drift_report_path})")
+            if len(drifted):
+                print(drifted[['feature', 'psi', 'ks', 'status']].to_string(index=False))
+        return manifest
+
+    def shard_paths(self):
+        """Completed shard files in input order"""
+        with open(self.manifest_path) as f:
+            completed = json.load(f)['completed']
+        return [os.path.join(self.out_dir, completed[key]['file'])
+                for key in sorted(completed, key=int)]
+
+    def summary(self):
+        """Portfolio-level FrameSketch merged from the completed shards' sketches"""
+        return merge_sketches(FrameSketch.load(path.replace('.parquet', '.summary.json'))
+                              for path in self.shard_paths())
+
+    def combine(self, data_dir='data/'):
+        """
+        Concatenate the shards into scored_portfolio.csv plus its aggregate cube
+
+        Parameters:
+        - data_dir: output directory for save_scored_portfolio()
+        """
+        from portfolio_cube import save_scored_portfolio
+        df = pd.concat([pd.read_parquet(path) for path in self.shard_paths()], ignore_index=True)
+        return save_scored_portfolio(df, data_dir=data_dir, policy=self.policy)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score a customer dataset in resumable batches")
+    parser.add_argument('--input', default='data/credit_data.csv', help="CSV or Parquet dataset")
+    parser.add_argument('--output', default='data/scored/', help="shard and manifest directory")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="rows per shard")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: thread budget)")
+    parser.add_argument('--scoring-model', choices=['ensemble', 'student'], default='ensemble')
+    parser.add_argument('--policy', default=None, help="policy version key or JSON policy file")
+    parser.add_argument('--model-dir', default='models/')
+    parser.add_argument('--restart', action='store_true', help="ignore an existing manifest")
+    parser.add_argument('--shared-models', action='store_true',
+                        help="workers attach to one shared copy of the models (model_host.py)")
+    parser.add_argument('--audit-log', default=None, metavar='DIR',
+                        help="append every decision to this audit log (e.g. data/audit/)")
+    parser.add_argument('--combine', action='store_true',
+                        help="also write data/scored_portfolio.csv and its cube")
+    args = parser.parse_args()
+
+    policy = args.policy
+    if policy is not None and policy.endswith('.json'):
+        policy = CreditPolicy.from_json(policy)
+
+    job = BatchScoringJob(args.input, out_dir=args.output, chunk_size=args.chunk_size,
+                          workers=args.workers, scoring_model=args.scoring_model,
+                          policy=policy, model_dir=args.model_dir, shared_models=args.shared_models, audit_dir=args.audit_log)
+    try:
+        job.run(restart=args.restart)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.combine:
+        job.combine()
@@ -0,0 +1,209 @@
+"""
+Performance Benchmarks
+Times hot paths of the credit limit pipeline on synthetic portfolios
+Run: python benchmark.py [--only NAME] [--samples N]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy as np
+
+from data_generator import generate_credit_dataset
+from model_training import CreditRiskModel
+from thread_budget import available_cpus, plan_workers, apply_thread_limit
+
+def best_time(fn, repeats=3):
+    """Best-of-n wall-clock seconds of fn()"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def print_report(title, rows):
+    """Print benchmark results as an aligned two-column table"""
+    print(f"\n{title}")
+    print("-" * len(title))
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"{name:<{width}}  {value}")
+
+def train_benchmark_model(quantize=False, n_train=2000):
+    """Small in-memory model (never written to models/)"""
+    model = CreditRiskModel(quantize=quantize)
+    model.train_models(generate_credit_dataset(n_samples=n_train))
+    return model
+
+def bench_feature_matrix(n_samples=200000, repeats=3):
+    """
+    Feature conversion cost: per-model DataFrame conversion vs one shared float32 matrix
+
+    The legacy path handed a column-subset DataFrame to each model, which
+    converted it to its own array; the feature-matrix layer builds one
+    C-contiguous float32 array per batch that both models use as-is.
+    """
+    model = train_benchmark_model(quantize=False)
+    df = generate_credit_dataset(n_samples=n_samples, random_seed=7)
+    columns = model.feature_columns
+
+    def legacy_conversion():
+        X = df[columns]
+        # Each model converts the frame to its own float32 array
+        for _ in range(2):
+            np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
+    def shared_conversion():
+        model.matrix_builder.build(df)
+
+    def legacy_scoring():
+        X = df[columns]
+        rf_proba = model.rf_model.predict_proba(X.to_numpy(dtype=np.float64))[:, 1]
+        xgb_proba = model.xgb_model.predict_proba(X)[:, 1]
+        return (rf_proba + xgb_proba) / 2
+
+    def shared_scoring():
+        model.predict_default_probability(df)
+
+    legacy_conv = best_time(legacy_conversion, repeats)
+    shared_conv = best_time(shared_conversion, repeats)
+    legacy_total = best_time(legacy_scoring, repeats)
+    shared_total = best_time(shared_scoring, repeats)
+
+    print_report(f"Feature matrix ({n_samples:,} customers, {len(columns)} features)", [
+        ("conversion, per-model frames", f"{legacy_conv * 1000:9.1f} ms"),
+        ("conversion, shared float32", f"{shared_conv * 1000:9.1f} ms"),
+        ("conversion time eliminated", f"{(legacy_conv - shared_conv) * 1000:9.1f} ms"),
+        ("ensemble scoring, legacy", f"{legacy_total * 1000:9.1f} ms"),
+        ("ensemble scoring, shared", f"{shared_total * 1000:9.1f} ms")
+    ])
+
+def cold_process_time(code, repeats=3):
+    """Best-of-n wall-clock seconds of running code in a fresh interpreter"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return best_time(lambda: subprocess.run([sys.executable, '-c', code], cwd=cwd,
+                                            check=True, capture_output=True), repeats)
+
+def bench_cold_start(n_samples=200000, repeats=3):
+    """
+    Cold-start cost of a fresh process: imports, model loading and first prediction
+
+    The eager row imports sklearn and xgboost up front as model_training used
+    to; the lazy row is the current import. Model loading is measured on a
+    small model saved to a temporary directory.
+    """
+    model = train_benchmark_model()
+    with tempfile.TemporaryDirectory() as model_dir:
+        model.save_models(os.path.join(model_dir, ''))
+        load_code = (
+            "from model_training import CreditRiskModel; "
+            "from data_generator import generate_credit_dataset; "
+            "model = CreditRiskModel(); "
+            f"model.load_models({os.path.join(model_dir, '')!r}); "
+            "model.predict_default_probability(generate_credit_dataset(n_samples=64))"
+        )
+        load_time = cold_process_time(load_code, repeats)
+    
+    interpreter = cold_process_time("pass", repeats)
+    eager = cold_process_time("import sklearn.ensemble, xgboost, model_training", repeats)
+    lazy = cold_process_time("import model_training", repeats)
+    dashboard = cold_process_time("import streamlit, app", repeats)
+    
+    print_report("Cold start (fresh interpreter, best of runs)", [
+        ("interpreter only", f"{interpreter * 1000:9.1f} ms"),
+        ("import model_training, eager", f"{eager * 1000:9.1f} ms"),
+        ("import model_training, lazy", f"{lazy * 1000:9.1f} ms"),
+        ("import dashboard (app)", f"{dashboard * 1000:9.1f} ms"),
+        ("load models + first prediction", f"{load_time * 1000:9.1f} ms")
+    ])
+
+def _contention_worker(model_dir, n_threads, n_samples, rounds, queue, barrier):
+    """
+    Benchmark process: load the models, then score n_samples customers `rounds` times
+
+    n_threads=None reproduces the unbudgeted setup (Random Forest n_jobs=-1,
+    XGBoost and BLAS at their all-core defaults).
+    """
+    if n_threads is not None:
+        apply_thread_limit(n_threads)
+    model = CreditRiskModel()
+    model.load_models(model_dir)
+    if n_threads is None:
+        model.rf_model.set_params(n_jobs=-1)
+        model.xgb_model.set_params(n_jobs=None)
+    df = generate_credit_dataset(n_samples=n_samples, random_seed=os.getpid() % 1000)
+    model.predict_default_probability(df.head(256))
+    
+    # Start together so every process competes for the CPUs
+    barrier.wait()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        model.predict_default_probability(df)
+    queue.put(time.perf_counter() - start)
+
+def bench_thread_contention(n_samples=200000, processes=None, rounds=3):
+    """
+    Scoring throughput of several concurrent processes with and without the thread budget
+
+    Unbudgeted, every process starts one thread per CPU, so P processes run
+    P x CPUs threads on CPUs cores. Budgeted, the processes split the budget
+    (thread_budget.plan_workers) and the machine runs one thread per core.
+    
+    Parameters:
+    - n_samples: customers scored per round, split across the processes
+    - processes: concurrent scoring processes (default: CPUs, at least 2)
+    - rounds: scoring rounds per process
+    """
+    import multiprocessing as mp
+    
+    cpus = available_cpus()
+    processes = processes or max(2, cpus)
+    per_process = max(1000, n_samples // processes)
+    model = train_benchmark_model(quantize=True)
+    ctx = mp.get_context('spawn')
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as model_dir:
+        model.save_models(os.path.join(model_dir, ''))
+        for mode, n_threads in (('unbudgeted', None), ('budgeted', plan_workers(processes)[1])):
+            queue, barrier = ctx.Queue(), ctx.Barrier(processes)
+            workers = [ctx.Process(target=_contention_worker,
+                                   args=(os.path.join(model_dir, ''), n_threads, per_process,
+                                         rounds, queue, barrier))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            elapsed = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            # Throughput of the whole box: all rows over the slowest process
+            results[mode] = (n_threads or cpus, processes * rounds * per_process / max(elapsed))
+    
+    unbudgeted, budgeted = results['unbudgeted'][1], results['budgeted'][1]
+    print_report(f"Thread contention ({processes} scoring processes on {cpus} CPUs, "
+                 f"{per_process:,} customers x {rounds} rounds each)", [
+        (f"unbudgeted ({results['unbudgeted'][0]} threads/process)", f"{unbudgeted:12,.0f} rows/s"),
+        (f"budgeted ({results['budgeted'][0]} threads/process)", f"{budgeted:12,.0f} rows/s"),
+        ("throughput gain", f"{budgeted / unbudgeted:12.2f}x")
+    ])
+
+BENCHMARKS = {
+    'feature_matrix': bench_feature_matrix,
+    'cold_start': bench_cold_start,
+    'thread_contention': bench_thread_contention
+}
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run performance benchmarks")
+    parser.add_argument('--only', choices=sorted(BENCHMARKS), help="run a single benchmark")
+    parser.add_argument('--samples', type=int, default=200000, help="portfolio size")
+    args = parser.parse_args()
+
+    for name, bench in BENCHMARKS.items():
+        if args.only in (None, name):
+            bench(n_samples=args.samples)
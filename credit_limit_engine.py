@@ -6,12 +6,23 @@ All text in English
 
 import pandas as pd
 import numpy as np
+from credit_policy import CreditPolicy
+from limit_allocation import LimitAllocator
+from memory_report import profile_stage, profile_frame
+
+def _as_scalar(value):
+    """Unwrap 0-d kernel results so scalar calls return plain floats"""
+    return value.item() if np.ndim(value) == 0 and hasattr(value, 'item') else value
 
 class CreditLimitEngine:
     """Engine for calculating adaptive credit limits based on risk"""
     
-    def __init__(self):
-        self.base_multiplier = 2.5  # Base credit limit = income * multiplier
+    def __init__(self, policy=None):
+        """
+        Parameters:
+        - policy: CreditPolicy, policy config dict or version key (default policy if None)
+        """
+        self.policy = policy if isinstance(policy, CreditPolicy) else CreditPolicy(policy)
         
     def calculate_base_limit(self, monthly_income, credit_score):
         """
@@ -20,24 +31,10 @@ class CreditLimitEngine:
         Formula:
         - Base limit = Monthly Income × Base Multiplier
         - Adjust based on CIBIL score band (300-900 scale)
-        """
-        # CIBIL score adjustments (Indian credit scoring)
-        if credit_score >= 750:
-            score_multiplier = 1.5  # Excellent
-        elif credit_score >= 700:
-            score_multiplier = 1.3  # Very Good
-        elif credit_score >= 650:
-            score_multiplier = 1.1  # Good
-        elif credit_score >= 550:
-            score_multiplier = 1.0  # Fair
-        elif credit_score >= 450:
-            score_multiplier = 0.8  # Poor
-        else:
-            score_multiplier = 0.5  # Very Poor
         
-        base_limit = monthly_income * 1000 * self.base_multiplier * score_multiplier
-        
-        return base_limit
+        Accepts scalars or arrays; bands and multipliers come from the policy.
+        """
+        return _as_scalar(self.policy.base_limit(monthly_income, credit_score))
     
     def apply_risk_adjustment(self, base_limit, default_prob, utilization, 
                              on_time_payment_rate, behavior_score):
@@ -50,27 +47,10 @@ class CreditLimitEngine:
         - Payment history
         - Behavior score
         """
-        # Start with risk adjustment based on default probability
-        risk_multiplier = 1 - (default_prob * 0.6)  # Reduce by up to 60% based on risk
-        
-        # Adjust for high utilization (risk of overextension)
-        if utilization > 0.8:
-            risk_multiplier *= 0.9
-        elif utilization < 0.3:
-            risk_multiplier *= 1.1  # Reward low utilization
-        
-        # Payment history adjustment
-        payment_adjustment = on_time_payment_rate * 0.1
-        risk_multiplier += payment_adjustment
-        
-        # Behavior score adjustment
-        behavior_adjustment = behavior_score * 0.1
-        risk_multiplier += behavior_adjustment
-        
-        # Ensure multiplier is within reasonable bounds
-        risk_multiplier = np.clip(risk_multiplier, 0.2, 2.0)
-        
-        return base_limit * risk_multiplier
+        risk_multiplier = self.policy.risk_multiplier(
+            default_prob, utilization, on_time_payment_rate, behavior_score
+        )
+        return _as_scalar(base_limit * risk_multiplier)
     
     def calculate_recommended_limit(self, row):
         """
@@ -79,27 +59,23 @@ class CreditLimitEngine:
         Parameters:
         - row: DataFrame row with customer data
         """
-        # Get base limit
-        base_limit = self.calculate_base_limit(
-            row['monthly_income'], 
-            row['credit_score']
-        )
-        
-        # Apply risk adjustments
-        recommended_limit = self.apply_risk_adjustment(
-            base_limit,
+        return _as_scalar(self.policy.recommended_limit(
+            row['monthly_income'],
+            row['credit_score'],
             row['predicted_default_prob'],
             row['credit_utilization'],
             row['on_time_payment_rate'],
             row['behavior_score']
-        )
-        
-        # Apply constraints (Indian market)
-        # Minimum limit: ₹10,000
-        # Maximum limit: ₹500,000
-        recommended_limit = max(10000, min(recommended_limit, 500000))
+        ))
+    
+    def calculate_recommended_limits(self, df):
+        """
+        Calculate recommended credit limits for a whole portfolio in one pass
         
-        return recommended_limit
+        Parameters:
+        - df: DataFrame with customer data and predicted_default_prob column
+        """
+        return self.policy.evaluate(df)['recommended_limit'].to_numpy()
     
     def calculate_credit_change(self, current_limit, recommended_limit):
         """Calculate credit limit change amount and percentage"""
@@ -109,15 +85,8 @@ class CreditLimitEngine:
         return change_amount, change_percentage
     
     def assign_risk_category(self, default_prob):
-        """Assign risk category based on default probability"""
-        if default_prob < 0.1:
-            return "Low Risk"
-        elif default_prob < 0.25:
-            return "Medium Risk"
-        elif default_prob < 0.4:
-            return "High Risk"
-        else:
-            return "Very High Risk"
+        """Assign risk category (or categories) based on default probability"""
+        return _as_scalar(self.policy.risk_category(default_prob))
     
     def calculate_adjustment_reason(self, row):
         """Generate reason for credit limit adjustment"""
@@ -143,37 +112,109 @@ class CreditLimitEngine:
         
         return " | ".join(reasons) if reasons else "Balanced profile"
     
-    def process_customers(self, df):
+    def calculate_adjustment_reasons(self, df):
+        """
+        Adjustment reasons for a whole portfolio (same rules as calculate_adjustment_reason)
+        
+        Each rule picks one of a few phrases, so every customer gets a
+        combination code and the 54 possible texts are built once.
+        
+        Parameters:
+        - df: DataFrame with customer data and predicted_default_prob column
+        """
+        rules = [
+            (df['predicted_default_prob'].to_numpy(),
+             [(np.less, 0.15, "Excellent risk profile"), (np.greater, 0.35, "Elevated default risk")]),
+            (df['on_time_payment_rate'].to_numpy(),
+             [(np.greater, 0.95, "Strong payment history"), (np.less, 0.7, "Poor payment history")]),
+            (df['credit_utilization'].to_numpy(),
+             [(np.greater, 0.8, "High current utilization"), (np.less, 0.3, "Low utilization pattern")]),
+            (df['behavior_score'].to_numpy(),
+             [(np.greater, 0.8, "Good customer behavior")])
+        ]
+        
+        codes = np.zeros(len(df), dtype=np.int64)
+        options = []
+        for values, branches in rules:
+            # 0: no phrase, k: the k-th branch (first matching branch wins)
+            choice = np.select([compare(values, threshold) for compare, threshold, _ in branches],
+                               np.arange(1, len(branches) + 1), default=0)
+            codes = codes * (len(branches) + 1) + choice
+            options.append([None] + [text for _, _, text in branches])
+        
+        texts = []
+        for combination in np.ndindex(*[len(choices) for choices in options]):
+            phrases = [choices[k] for choices, k in zip(options, combination) if k]
+            texts.append(" | ".join(phrases) if phrases else "Balanced profile")
+        return np.array(texts, dtype=object)[codes]
+    
+    def process_customers(self, df, audit_log=None):
         """
         Process all customers and calculate recommended limits
         
         Parameters:
         - df: DataFrame with customer data and predicted_default_prob column
+        - audit_log: optional AuditLogWriter; every decision is recorded with
+          the customer's inputs and this engine's policy version
         """
-        results = []
-        
-        for idx, row in df.iterrows():
-            recommended_limit = self.calculate_recommended_limit(row)
-            change_amount, change_pct = self.calculate_credit_change(
-                row['current_credit_limit'], recommended_limit
-            )
-            
-            risk_category = self.assign_risk_category(row['predicted_default_prob'])
-            reason = self.calculate_adjustment_reason(row)
-            
-            results.append({
-                'customer_id': row.get('customer_id', f'CUST_{idx}'),
-                'current_limit': row['current_credit_limit'],
-                'recommended_limit': round(recommended_limit, 2),
-                'change_amount': round(change_amount, 2),
-                'change_percentage': round(change_pct, 2),
-                'risk_category': risk_category,
-                'default_probability': row['predicted_default_prob'],
-                'adjustment_reason': reason,
-                'credit_score': row['credit_score'],
-                'utilization': row['credit_utilization'],
-                'on_time_payment_rate': row['on_time_payment_rate']
+        with profile_stage('process_customers'):
+            evaluated = self.policy.evaluate(df)
+        
+            if 'customer_id' in df.columns:
+                customer_ids = df['customer_id'].to_numpy()
+            else:
+                customer_ids = [f'CUST_{idx}' for idx in df.index]
+        
+            result = pd.DataFrame({
+                'customer_id': customer_ids,
+                'current_limit': df['current_credit_limit'].to_numpy(),
+                'recommended_limit': evaluated['recommended_limit'].round(2).to_numpy(),
+                'change_amount': evaluated['change_amount'].round(2).to_numpy(),
+                'change_percentage': evaluated['change_percentage'].round(2).to_numpy(),
+                'risk_category': evaluated['risk_category'].to_numpy(),
+                'default_probability': df['predicted_default_prob'].to_numpy(),
+                'adjustment_reason': self.calculate_adjustment_reasons(df),
+                'credit_score': df['credit_score'].to_numpy(),
+                'utilization': df['credit_utilization'].to_numpy(),
+                'on_time_payment_rate': df['on_time_payment_rate'].to_numpy()
             })
         
-        return pd.DataFrame(results)
-
+        profile_frame('recommendations', result)
+        
+        if audit_log is not None:
+            inputs = df.drop(columns=[col for col in df.columns if col in result.columns])
+            audit_log.record(pd.concat([result, inputs.reset_index(drop=True)], axis=1),
+                             policy_version=self.policy.version)
+        
+        return result
+    
+    def allocate_limits(self, df, exposure_cap=None, expected_loss_cap=None, **kwargs):
+        """
+        Recommended limits scaled back to fit portfolio-level budgets
+        
+        Parameters:
+        - df: DataFrame with customer data and predicted_default_prob column
+        - exposure_cap: maximum total limit (INR), None for no cap
+        - expected_loss_cap: maximum total expected loss (INR), None for no cap
+        - kwargs: further LimitAllocator options (margin, lgd, tol, max_iter)
+        
+        Returns (DataFrame with recommended and allocated limits, allocation report).
+        """
+        recommended = self.calculate_recommended_limits(df)
+        scored = df.assign(recommended_limit=recommended)
+        
+        allocator = LimitAllocator(exposure_cap, expected_loss_cap, policy=self.policy, **kwargs)
+        allocated, report = allocator.allocate(scored)
+        
+        if 'customer_id' in df.columns:
+            customer_ids = df['customer_id'].to_numpy()
+        else:
+            customer_ids = [f'CUST_{idx}' for idx in df.index]
+        
+        result = pd.DataFrame({
+            'customer_id': customer_ids,
+            'recommended_limit': np.round(recommended, 2),
+            'allocated_limit': np.round(allocated, 2),
+            'default_probability': df['predicted_default_prob'].to_numpy()
+        })
+        return result, report
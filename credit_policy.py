@@ -0,0 +1,180 @@
+"""
+Credit Limit Policy - Indian Market
+Declarative, versioned credit policy (CIBIL bands, multipliers, bounds) compiled
+into vectorized kernels shared by scalar and portfolio-wide calculations
+"""
+
+import json
+import pandas as pd
+import numpy as np
+
+# Policy versions: bands are lower bounds, each band's multiplier applies from
+# its edge upwards (e.g. CIBIL 750+ gets 1.5x)
+CREDIT_POLICIES = {
+    '1.0': {
+        'version': '1.0',
+        'income_unit': 1000,           # monthly_income is stored in ₹ thousands
+        'base_multiplier': 2.5,        # Base credit limit = income * multiplier
+        'score_bands': {
+            'edges': [450, 550, 650, 700, 750],
+            'multipliers': [0.5, 0.8, 1.0, 1.1, 1.3, 1.5]  # Very Poor ... Excellent
+        },
+        'default_prob_weight': 0.6,    # Reduce by up to 60% based on risk
+        'utilization_rules': [
+            {'above': 0.8, 'multiplier': 0.9},   # Risk of overextension
+            {'below': 0.3, 'multiplier': 1.1}    # Reward low utilization
+        ],
+        'payment_weight': 0.1,
+        'behavior_weight': 0.1,
+        'risk_multiplier_bounds': [0.2, 2.0],
+        'limit_bounds': [10000, 500000],         # ₹10,000 - ₹500,000
+        'risk_categories': {
+            'edges': [0.1, 0.25, 0.4],
+            'labels': ['Low Risk', 'Medium Risk', 'High Risk', 'Very High Risk']
+        }
+    }
+}
+
+DEFAULT_POLICY_VERSION = '1.0'
+
+class CreditPolicy:
+    """Credit policy compiled into vectorized NumPy kernels"""
+
+    def __init__(self, config=None):
+        """
+        Compile a policy config
+
+        Parameters:
+        - config: policy dict, a version key of CREDIT_POLICIES or None for the default
+        """
+        if config is None:
+            config = DEFAULT_POLICY_VERSION
+        if isinstance(config, str):
+            if config not in CREDIT_POLICIES:
+                raise ValueError(f"Unknown policy version '{config}'. "
+                                 f"Available: {sorted(CREDIT_POLICIES)}")
+            config = CREDIT_POLICIES[config]
+
+        self.config = config
+        self.version = str(config['version'])
+        self.income_unit = config['income_unit']
+        self.base_multiplier = config['base_multiplier']
+
+        self.score_edges = np.asarray(config['score_bands']['edges'], dtype=np.float64)
+        self.score_multipliers = np.asarray(config['score_bands']['multipliers'], dtype=np.float64)
+        if len(self.score_multipliers) != len(self.score_edges) + 1:
+            raise ValueError("score_bands needs one more multiplier than edges")
+        if np.any(np.diff(self.score_edges) <= 0):
+            raise ValueError("score_bands edges must be strictly increasing")
+
+        self.default_prob_weight = config['default_prob_weight']
+        self.utilization_rules = config['utilization_rules']
+        self.payment_weight = config['payment_weight']
+        self.behavior_weight = config['behavior_weight']
+        self.min_risk_multiplier, self.max_risk_multiplier = config['risk_multiplier_bounds']
+        self.min_limit, self.max_limit = config['limit_bounds']
+
+        self.risk_edges = np.asarray(config['risk_categories']['edges'], dtype=np.float64)
+        self.risk_labels = np.asarray(config['risk_categories']['labels'], dtype=object)
+        if len(self.risk_labels) != len(self.risk_edges) + 1:
+            raise ValueError("risk_categories needs one more label than edges")
+
+    @classmethod
+    def from_json(cls, path):
+        """Load a policy config from a JSON file"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def score_multiplier(self, credit_score):
+        """CIBIL band multiplier for one or many scores"""
+        bands = np.searchsorted(self.score_edges, credit_score, side='right')
+        return self.score_multipliers[bands]
+
+    def base_limit(self, monthly_income, credit_score):
+        """Base limit (INR) = income × base multiplier × CIBIL band multiplier"""
+        return (np.asarray(monthly_income, dtype=np.float64) * self.income_unit *
+                self.base_multiplier * self.score_multiplier(credit_score))
+
+    def utilization_multiplier(self, utilization):
+        """Multiplier from the first matching utilization rule (1.0 if none match)"""
+        utilization = np.asarray(utilization, dtype=np.float64)
+        conditions = []
+        for rule in self.utilization_rules:
+            if 'above' in rule:
+                conditions.append(utilization > rule['above'])
+            else:
+                conditions.append(utilization < rule['below'])
+        choices = [rule['multiplier'] for rule in self.utilization_rules]
+        return np.select(conditions, choices, default=1.0)
+
+    def risk_multiplier(self, default_prob, utilization, on_time_payment_rate, behavior_score):
+        """Risk multiplier from default probability, utilization, payments and behavior"""
+        multiplier = 1 - np.asarray(default_prob, dtype=np.float64) * self.default_prob_weight
+        multiplier = multiplier * self.utilization_multiplier(utilization)
+        multiplier = multiplier + np.asarray(on_time_payment_rate) * self.payment_weight
+        multiplier = multiplier + np.asarray(behavior_score) * self.behavior_weight
+
+        return np.clip(multiplier, self.min_risk_multiplier, self.max_risk_multiplier)
+
+    def recommended_limit(self, monthly_income, credit_score, default_prob, utilization,
+                          on_time_payment_rate, behavior_score):
+        """Recommended limit clamped to the policy's limit bounds"""
+        limit = (self.base_limit(monthly_income, credit_score) *
+                 self.risk_multiplier(default_prob, utilization,
+                                      on_time_payment_rate, behavior_score))
+        return np.clip(limit, self.min_limit, self.max_limit)
+
+    def risk_category(self, default_prob):
+        """Risk category label(s) for one or many default probabilities"""
+        return self.risk_labels[np.searchsorted(self.risk_edges, default_prob, side='right')]
+
+    def evaluate(self, df, prob_col='predicted_default_prob'):
+        """
+        Evaluate the policy over a whole portfolio in a single vectorized pass
+
+        Parameters:
+        - df: DataFrame with customer data and default probabilities
+        - prob_col: column holding the default probability
+        """
+        recommended = self.recommended_limit(
+            df['monthly_income'].to_numpy(),
+            df['credit_score'].to_numpy(),
+            df[prob_col].to_numpy(),
+            df['credit_utilization'].to_numpy(),
+            df['on_time_payment_rate'].to_numpy(),
+            df['behavior_score'].to_numpy()
+        )
+        current = df['current_credit_limit'].to_numpy(dtype=np.float64)
+        change = recommended - current
+
+        return pd.DataFrame({
+            'recommended_limit': recommended,
+            'change_amount': change,
+            'change_percentage': change / current * 100,
+            'risk_category': self.risk_category(df[prob_col].to_numpy())
+        }, index=df.index)
+
+def compare_policies(df, policies, prob_col='predicted_default_prob'):
+    """
+    Summarize several policy versions against the same portfolio
+
+    Parameters:
+    - df: DataFrame with customer data and default probabilities
+    - policies: iterable of CreditPolicy objects, configs or version keys
+    """
+    summary = []
+    for policy in policies:
+        if not isinstance(policy, CreditPolicy):
+            policy = CreditPolicy(policy)
+        result = policy.evaluate(df, prob_col=prob_col)
+
+        summary.append({
+            'policy_version': policy.version,
+            'total_exposure': round(result['recommended_limit'].sum(), 2),
+            'avg_recommended_limit': round(result['recommended_limit'].mean(), 2),
+            'expected_loss': round((result['recommended_limit'] * df[prob_col]).sum(), 2),
+            'increases': int((result['change_amount'] > 0).sum()),
+            'decreases': int((result['change_amount'] < 0).sum())
+        })
+
+    return pd.DataFrame(summary)
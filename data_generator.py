@@ -4,6 +4,7 @@ Creates realistic customer data for Indian credit market (CIBIL, INR)
 All text in English, adapted for Indian economic context
 """
 
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -134,24 +135,216 @@ def generate_credit_dataset(n_samples=1000, random_seed=42):
     
     return df
 
-def save_dataset():
-    """Generate and save the dataset"""
+# Monthly economic regime transitions (rows: from, columns: to)
+# 0: Normal (Moderate Growth), 1: Slowdown, 2: High Growth
+REGIME_TRANSITIONS = np.array([
+    [0.94, 0.04, 0.02],
+    [0.10, 0.88, 0.02],
+    [0.08, 0.02, 0.90]
+])
+
+# Per-regime monthly income drift, utilization shock and default hazard multiplier
+REGIME_INCOME_DRIFT = np.array([0.003, -0.002, 0.006])
+REGIME_UTILIZATION_SHOCK = np.array([0.0, 0.02, -0.01])
+REGIME_HAZARD_MULTIPLIER = np.array([1.0, 1.6, 0.8])
+
+def generate_credit_panel(n_customers=1000, n_months=36, random_seed=42):
+    """
+    Lazily generate monthly behavioral snapshots for a synthetic portfolio
+    
+    Starts from generate_credit_dataset() and evolves every customer month by
+    month with vectorized Markov-style updates: a portfolio-wide economic
+    regime switches between Normal/Slowdown/High Growth, income drifts with
+    the regime, utilization mean-reverts around each customer's own level,
+    late payments roll through a 12-month window and drive the CIBIL score,
+    and defaults are absorbing. Only the current state is kept, so memory
+    scales with the number of customers, not customers × months.
+    
+    Parameters:
+    - n_customers: portfolio size
+    - n_months: number of monthly snapshots (e.g. 24-60)
+    - random_seed: seed for the initial snapshot and the monthly updates
+    
+    Yields one DataFrame per month with the snapshot columns plus 'month',
+    'defaulted_this_month' ('defaulted' is the cumulative default status).
+    """
+    rng = np.random.default_rng(random_seed)
+    base = generate_credit_dataset(n_samples=n_customers, random_seed=random_seed)
+    
+    customer_ids = base['customer_id'].to_numpy()
+    static = {col: base[col].to_numpy() for col in
+              ['age', 'current_credit_limit', 'avg_transaction_amount',
+               'has_bankruptcy', 'has_delinquency']}
+    
+    credit_score = base['credit_score'].to_numpy().astype(np.float64)
+    months_open = base['months_account_open'].to_numpy().copy()
+    income = base['monthly_income'].to_numpy().copy()
+    debt_to_income = base['debt_to_income_ratio'].to_numpy().copy()
+    utilization_level = base['credit_utilization'].to_numpy().copy()
+    utilization = utilization_level.copy()
+    payment_history = base['payment_history_score'].to_numpy().copy()
+    transactions = base['avg_monthly_transactions'].to_numpy().copy()
+    
+    # Rolling 12-month late payment window seeded from the snapshot counts
+    late_window = np.zeros((n_customers, 12), dtype=np.uint8)
+    late_counts = base['late_payments_12m'].to_numpy()
+    for k in range(12):
+        late_window[:, k] = k < late_counts
+    
+    defaulted = np.zeros(n_customers, dtype=bool)
+    regime = 0
+    
+    for month in range(1, n_months + 1):
+        regime = rng.choice(3, p=REGIME_TRANSITIONS[regime])
+        active = ~defaulted
+        
+        # Income and debt evolve with the regime
+        income = income * np.exp(REGIME_INCOME_DRIFT[regime] + rng.normal(0, 0.01, n_customers))
+        income = np.clip(income, 15, 200)
+        debt_to_income = np.clip(debt_to_income + rng.normal(0, 0.01, n_customers), 0, 0.9)
+        
+        # Utilization mean-reverts to each customer's level, shocked by the regime
+        utilization = (0.8 * utilization + 0.2 * utilization_level +
+                       REGIME_UTILIZATION_SHOCK[regime] + rng.normal(0, 0.04, n_customers))
+        utilization = np.clip(utilization, 0, 1)
+        
+        # Late payment this month depends on stretch and regime
+        late_prob = np.clip(0.02 + 0.15 * utilization ** 2 + 0.1 * debt_to_income, 0, 1)
+        late_prob = np.clip(late_prob * REGIME_HAZARD_MULTIPLIER[regime], 0, 1)
+        late_now = (rng.random(n_customers) < late_prob) & active
+        late_window[:, month % 12] = late_now
+        late_payments_12m = late_window.sum(axis=1)
+        
+        on_time_payment_rate = np.clip(1 - late_payments_12m / 12 +
+                                       rng.normal(0, 0.02, n_customers), 0, 1)
+        payment_history = np.clip(0.95 * payment_history + 0.05 * (1 - late_now), 0, 1)
+        credit_score = np.clip(credit_score + np.where(late_now, -25, 2) +
+                               rng.normal(0, 3, n_customers), 300, 900)
+        transactions = np.clip(transactions * np.exp(rng.normal(0, 0.05, n_customers)), 5, 200)
+        months_open = months_open + 1
+        
+        behavior_score = np.clip(payment_history * 0.4 + 
+                                 on_time_payment_rate * 0.3 + 
+                                 (1 - utilization) * 0.2 + 
+                                 (credit_score / 900) * 0.1, 0, 1)
+        
+        # Annual default probability (as in the snapshot) turned into a monthly hazard
+        default_prob = np.clip(
+            0.3 * (1 - behavior_score) +
+            0.25 * (1 - credit_score / 900) +
+            0.2 * utilization +
+            0.15 * debt_to_income / 0.5 +
+            0.05 * static['has_bankruptcy'] +
+            0.05 * static['has_delinquency'], 0, 1
+        )
+        monthly_hazard = np.clip((1 - (1 - default_prob) ** (1 / 12)) *
+                                 REGIME_HAZARD_MULTIPLIER[regime], 0, 1)
+        defaulted_now = (rng.random(n_customers) < monthly_hazard) & active
+        defaulted = defaulted | defaulted_now
+        
+        yield pd.DataFrame({
+            'month': month,
+            'customer_id': customer_ids,
+            'age': static['age'] + month // 12,
+            'credit_score': credit_score.astype(int),
+            'months_account_open': np.minimum(months_open, 120),
+            'monthly_income': income.round(2),
+            'debt_to_income_ratio': debt_to_income.round(3),
+            'current_credit_limit': static['current_credit_limit'],
+            'credit_utilization': utilization.round(3),
+            'payment_history_score': payment_history.round(3),
+            'late_payments_12m': late_payments_12m,
+            'on_time_payment_rate': on_time_payment_rate.round(3),
+            'avg_monthly_transactions': transactions.round(1),
+            'avg_transaction_amount': static['avg_transaction_amount'],
+            'behavior_score': behavior_score.round(3),
+            'has_bankruptcy': static['has_bankruptcy'],
+            'has_delinquency': static['has_delinquency'],
+            'high_utilization': (utilization > 0.8).astype(int),
+            'economic_scenario': regime,
+            'default_probability': default_prob.round(3),
+            'defaulted': defaulted.astype(int),
+            'defaulted_this_month': defaulted_now.astype(int)
+        })
+
+def save_panel(panel, out_dir='data/panel/'):
+    """
+    Write monthly panel chunks straight to columnar storage
+    
+    Each month is written as its own Parquet file (month=NNN.parquet) as it
+    is produced, so the full panel is never held in memory. Month files of a
+    previous panel in out_dir are removed first, so a shorter panel never
+    leaves stale months behind for read_panel().
+    
+    Parameters:
+    - panel: iterable of monthly DataFrames, e.g. generate_credit_panel()
+    - out_dir: output directory
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        if name.startswith('month=') and name.endswith('.parquet'):
+            os.remove(os.path.join(out_dir, name))
+    n_months = 0
+    for chunk in panel:
+        month = int(chunk['month'].iloc[0])
+        chunk.to_parquet(os.path.join(out_dir, f'month={month:03d}.parquet'), index=False)
+        n_months += 1
+    print(f"Panel saved to {out_dir} ({n_months} monthly files)")
+    return n_months
+
+def read_panel(panel_dir='data/panel/', columns=None):
+    """
+    Stream monthly panel snapshots back in month order
+    
+    Parameters:
+    - panel_dir: directory written by save_panel()
+    - columns: optional subset of columns to read
+    """
+    for name in sorted(os.listdir(panel_dir)):
+        if name.startswith('month=') and name.endswith('.parquet'):
+            yield pd.read_parquet(os.path.join(panel_dir, name), columns=columns)
+
+def save_dataset(n_samples=2000, random_seed=42, data_dir='data/'):
+    """
+    Generate and save the dataset with its summary sketch
+    
+    Parameters:
+    - n_samples: number of customers
+    - random_seed: random seed for reproducibility
+    - data_dir: output directory (credit_data.csv and credit_data_summary.json)
+    """
     print("Generating synthetic credit dataset...")
-    df = generate_credit_dataset(n_samples=2000)
+    df = generate_credit_dataset(n_samples=n_samples, random_seed=random_seed)
     
     # Save to CSV
-    df.to_csv('data/credit_data.csv', index=False)
-    print(f"Dataset saved to data/credit_data.csv with {len(df)} records")
+    data_path = os.path.join(data_dir, 'credit_data.csv')
+    df.to_csv(data_path, index=False)
+    print(f"Dataset saved to {data_path} with {len(df)} records")
     
-    # Print basic statistics
+    # Print basic statistics from a mergeable sketch (also saved for sharded runs)
+    from summary_sketches import FrameSketch
+    summary = FrameSketch.from_frame(df)
+    summary.save(os.path.join(data_dir, 'credit_data_summary.json'))
     print("\nDataset Statistics:")
-    print(df.describe())
+    print(summary.describe())
     
     return df
 
 if __name__ == '__main__':
-    import os
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate the synthetic credit dataset")
+    parser.add_argument('--panel-months', type=int, default=0,
+                        help="also write a monthly behavioral panel with this many months")
+    parser.add_argument('--panel-customers', type=int, default=2000,
+                        help="number of customers in the monthly panel")
+    args = parser.parse_args()
+    
     os.makedirs('data', exist_ok=True)
     save_dataset()
+    
+    if args.panel_months:
+        save_panel(generate_credit_panel(n_customers=args.panel_customers,
+                                         n_months=args.panel_months))
 
 
@@ -0,0 +1,221 @@
+"""
+Feature and Score Drift Monitoring
+Fixed-bin reference histograms captured at training time, updated in
+constant memory as scoring chunks stream through, with PSI and KS per
+feature and for the predicted default probability (with a separate score
+reference per scoring model)
+"""
+
+import copy
+import pickle
+import pandas as pd
+import numpy as np
+
+SCORE_NAME = 'predicted_default_prob'
+
+# Population Stability Index bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+class DriftMonitor:
+    """Reference vs current fixed-bin histograms of features and scores"""
+
+    def __init__(self, n_bins=20, eps=1e-4):
+        """
+        Parameters:
+        - n_bins: maximum bins per feature
+        - eps: floor on bin shares in the PSI (avoids log of zero)
+        """
+        self.n_bins = n_bins
+        self.eps = eps
+        self.feature_columns = []
+        self.edges = {}
+        self.reference = {}
+        self.current = {}
+        # Held-out score histogram per scoring model: name -> (edges, counts)
+        self.score_references = {}
+        self.scoring_model = None
+
+    def _coarsen(self, edges):
+        """Keep at most n_bins - 1 of the given (quantile) edges, evenly spaced"""
+        edges = np.asarray(edges, dtype=np.float64)
+        if len(edges) < self.n_bins:
+            return edges
+        keep = np.linspace(0, len(edges) - 1, self.n_bins - 1).round().astype(int)
+        return np.unique(edges[keep])
+
+    def _quantile_edges(self, values):
+        values = values[~np.isnan(values)]
+        unique_values = np.unique(values)
+        if len(unique_values) <= self.n_bins:
+            return (unique_values[:-1] + unique_values[1:]) / 2
+        return np.unique(np.quantile(values, np.linspace(0, 1, self.n_bins + 1)[1:-1]))
+
+    def fit(self, X, feature_columns, bin_edges=None):
+        """
+        Capture reference histograms of the training features
+
+        Parameters:
+        - X: training features (DataFrame or array in feature_columns order)
+        - feature_columns: feature names
+        - bin_edges: optional per-feature edges to reuse (e.g. the
+          FeatureQuantizer's); coarsened to at most n_bins bins
+        """
+        self.feature_columns = list(feature_columns)
+        for j, name in enumerate(self.feature_columns):
+            values = self._column(X, j, name)
+            if bin_edges is not None:
+                self.edges[name] = self._coarsen(bin_edges[j])
+            else:
+                self.edges[name] = self._quantile_edges(values)
+            self.reference[name] = self._counts(name, values)
+        self.reset()
+        return self
+
+    def fit_scores(self, scores, scoring_model='ensemble'):
+        """
+        Capture the reference histogram of one scoring model's predicted
+        default probabilities
+
+        The reference should be out-of-sample (held-out) scores, the way new
+        customers are scored. Customers the models were trained on get
+        sharper, in-sample scores, so scoring the training data itself shows
+        score drift against this reference even when nothing has changed.
+
+        Parameters:
+        - scores: held-out predicted probabilities of the trained model
+        - scoring_model: model the scores come from ('ensemble' or 'student')
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        edges = self._quantile_edges(scores)
+        counts = np.bincount(np.searchsorted(edges, scores, side='right'),
+                             minlength=len(edges) + 1).astype(np.int64)
+        self.score_references[scoring_model] = (edges, counts)
+        if scoring_model == self.scoring_model:
+            self._activate_scores()
+        return self
+
+    def for_model(self, scoring_model):
+        """
+        Copy of the monitor that compares scores against scoring_model's own
+        reference (scores are left out of the report if it has none)
+
+        Parameters:
+        - scoring_model: model whose predictions will be monitored
+        """
+        monitor = copy.copy(self)
+        monitor.edges = dict(self.edges)
+        monitor.reference = dict(self.reference)
+        monitor.score_references = dict(self._score_references())
+        monitor.scoring_model = scoring_model
+        monitor._activate_scores()
+        return monitor.reset()
+
+    def _score_references(self):
+        """Score references (monitors saved before they were per model hold only the ensemble's)"""
+        references = getattr(self, 'score_references', None)
+        if references is None:
+            references = {}
+            if SCORE_NAME in self.edges:
+                references['ensemble'] = (self.edges[SCORE_NAME], self.reference[SCORE_NAME])
+        return references
+
+    def _activate_scores(self):
+        """Point the score entry at the selected model's reference"""
+        self.edges.pop(SCORE_NAME, None)
+        self.reference.pop(SCORE_NAME, None)
+        self.current.pop(SCORE_NAME, None)
+        if self.scoring_model in self.score_references:
+            edges, counts = self.score_references[self.scoring_model]
+            self.edges[SCORE_NAME] = edges
+            self.reference[SCORE_NAME] = counts
+            self.current[SCORE_NAME] = np.zeros_like(counts)
+
+    def _column(self, X, j, name):
+        if isinstance(X, pd.DataFrame):
+            return X[name].to_numpy(dtype=np.float64)
+        return np.asarray(X[:, j], dtype=np.float64)
+
+    def _counts(self, name, values):
+        edges = self.edges[name]
+        bins = np.searchsorted(edges, values, side='right')
+        return np.bincount(bins, minlength=len(edges) + 1).astype(np.int64)
+
+    def histogram(self, X, scores=None):
+        """
+        Bin counts of a chunk without changing the monitor
+
+        Parameters:
+        - X: chunk features (DataFrame with the feature columns, or array)
+        - scores: optional predicted probabilities of the chunk
+
+        Returns a dict of name -> counts, to be passed to merge().
+        """
+        counts = {name: self._counts(name, self._column(X, j, name))
+                  for j, name in enumerate(self.feature_columns)}
+        if scores is not None and SCORE_NAME in self.edges:
+            counts[SCORE_NAME] = self._counts(SCORE_NAME, np.asarray(scores, dtype=np.float64))
+        return counts
+
+    def merge(self, counts):
+        """Add chunk counts (from histogram(), possibly another process) to the current window"""
+        for name, chunk_counts in counts.items():
+            self.current[name] = self.current[name] + np.asarray(chunk_counts, dtype=np.int64)
+        return self
+
+    def update(self, X, scores=None):
+        """Add a scored chunk to the current window"""
+        return self.merge(self.histogram(X, scores))
+
+    def reset(self):
+        """Start a new current window"""
+        self.current = {name: np.zeros_like(counts) for name, counts in self.reference.items()}
+        return self
+
+    def current_counts(self):
+        """Current window as plain lists (JSON-serializable, for checkpoints)"""
+        return {name: counts.tolist() for name, counts in self.current.items()}
+
+    def psi(self, name):
+        """Population Stability Index of one feature (current vs reference)"""
+        expected = np.maximum(self.reference[name] / max(self.reference[name].sum(), 1), self.eps)
+        actual = np.maximum(self.current[name] / max(self.current[name].sum(), 1), self.eps)
+        return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    def ks(self, name):
+        """Kolmogorov-Smirnov distance between the binned distributions"""
+        reference_cdf = np.cumsum(self.reference[name]) / max(self.reference[name].sum(), 1)
+        current_cdf = np.cumsum(self.current[name]) / max(self.current[name].sum(), 1)
+        return float(np.max(np.abs(reference_cdf - current_cdf)))
+
+    def report(self):
+        """
+        PSI and KS per feature and score for the current window
+
+        Returns a DataFrame sorted by PSI, with status 'stable' (PSI < 0.1),
+        'moderate' (< 0.25) or 'significant'.
+        """
+        rows = []
+        for name in self.reference:
+            psi = self.psi(name)
+            rows.append({
+                'feature': name,
+                'psi': psi,
+                'ks': self.ks(name),
+                'reference_rows': int(self.reference[name].sum()),
+                'current_rows': int(self.current[name].sum()),
+                'status': ('stable' if psi < PSI_MODERATE else
+                           'moderate' if psi < PSI_SIGNIFICANT else 'significant')
+            })
+        return pd.DataFrame(rows).sort_values('psi', ascending=False).reset_index(drop=True)
+
+    def save(self, path):
+        """Persist the monitor (reference histograms and edges)"""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        """Load a monitor saved with save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,191 @@
+"""
+Local Model Explanations
+Batched per-customer feature contributions to the predicted default
+probability: path-based (Saabas) decompositions of the Random Forest and of
+the XGBoost models (via pred_contribs), kept as compact top-k arrays
+"""
+
+import pandas as pd
+import numpy as np
+
+class LocalExplanations:
+    """Top-k feature contributions per customer on the probability scale"""
+
+    def __init__(self, feature_names, indices, values, base_value, predictions):
+        """
+        Parameters:
+        - feature_names: model feature names
+        - indices: (n_customers, k) feature indices, largest |contribution| first
+        - values: (n_customers, k) contributions to the default probability
+        - base_value: expected probability before any feature is considered
+        - predictions: explained default probability of each customer
+        """
+        self.feature_names = list(feature_names)
+        self.indices = np.asarray(indices, dtype=np.uint8)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.base_value = float(base_value)
+        self.predictions = np.asarray(predictions, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def top_k(self):
+        return self.indices.shape[1]
+
+    def for_customer(self, position):
+        """
+        Contributions of one customer as a DataFrame (feature, contribution)
+
+        Parameters:
+        - position: row position of the customer in the explained frame
+        """
+        return pd.DataFrame({
+            'feature': [self.feature_names[j] for j in self.indices[position]],
+            'contribution': self.values[position]
+        })
+
+    def reasons(self, position, min_abs=0.005):
+        """
+        Model-driven reasons for one customer, strongest first
+
+        Parameters:
+        - position: row position of the customer in the explained frame
+        - min_abs: contributions smaller than this (probability points) are omitted
+        """
+        reasons = []
+        for j, value in zip(self.indices[position], self.values[position]):
+            if abs(value) < min_abs:
+                continue
+            direction = "raises" if value > 0 else "lowers"
+            name = self.feature_names[j].replace('_', ' ')
+            reasons.append(f"{name} {direction} default risk by {abs(value) * 100:.1f} pts")
+        return reasons
+
+    def save(self, path):
+        """Persist as .npz"""
+        np.savez_compressed(path, feature_names=np.array(self.feature_names), indices=self.indices,
+                            values=self.values, base_value=self.base_value,
+                            predictions=self.predictions)
+
+    @classmethod
+    def load(cls, path):
+        """Load explanations saved with save()"""
+        with np.load(path) as saved:
+            return cls([str(name) for name in saved['feature_names']], saved['indices'],
+                       saved['values'], float(saved['base_value']), saved['predictions'])
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def boosted_contributions(booster_model, X, exact=False):
+    """
+    XGBoost contributions rescaled from log-odds to probability
+
+    pred_contribs gives additive contributions to the margin: path-based
+    (Saabas, the same decomposition as the forest) by default, or TreeSHAP
+    values with exact=True, which is far slower. Each row's contributions are
+    scaled so they sum to its probability minus the base probability.
+
+    Returns (contributions (n, n_features), base probability per row).
+    """
+    import xgboost as xgb
+    contribs = booster_model.get_booster().predict(xgb.DMatrix(X), pred_contribs=True,
+                                                   approx_contribs=not exact)
+    margin_contribs, bias = contribs[:, :-1], contribs[:, -1]
+    margin = bias + margin_contribs.sum(axis=1)
+
+    base = _sigmoid(bias)
+    delta_margin = margin - bias
+    delta_prob = _sigmoid(margin) - base
+    # Slope of the sigmoid between base and prediction (its derivative when they coincide)
+    scale = np.divide(delta_prob, delta_margin, out=base * (1 - base),
+                      where=np.abs(delta_margin) > 1e-12)
+    return margin_contribs * scale[:, None], base
+
+def _forest_edge_table(forest, n_features):
+    """
+    Per-node contribution rows for every tree of a forest
+
+    Moving from a parent to a child changes the tree's default probability
+    by p(child) - p(parent), credited to the parent's split feature. Row i of
+    the table holds that change for node i (the root row holds nothing), so
+    summing the rows on a decision path gives the path's contributions.
+    """
+    tables, roots = [], []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        prob = value[:, 1] / value.sum(axis=1)
+
+        table = np.zeros((tree.node_count, n_features))
+        for children in (tree.children_left, tree.children_right):
+            parents = np.flatnonzero(children >= 0)
+            kids = children[parents]
+            table[kids, tree.feature[parents]] = prob[kids] - prob[parents]
+
+        tables.append(table)
+        roots.append(prob[0])
+
+    n_trees = len(forest.estimators_)
+    return np.vstack(tables) / n_trees, float(np.mean(roots))
+
+def forest_contributions(forest, X, chunk_size=5000):
+    """
+    Path-based (Saabas) contributions of a Random Forest classifier
+
+    Uses decision_path for every tree at once and one sparse product per
+    chunk of customers; contributions plus the base value reproduce
+    predict_proba exactly.
+
+    Returns (contributions (n, n_features), base probability).
+    """
+    table, base = _forest_edge_table(forest, X.shape[1])
+    contribs = np.empty((len(X), X.shape[1]))
+    for start in range(0, len(X), chunk_size):
+        indicator, _ = forest.decision_path(X[start:start + chunk_size])
+        contribs[start:start + chunk_size] = indicator @ table
+    return contribs, base
+
+def top_k_contributions(contribs, k):
+    """Indices and values of the k largest |contributions| per row, largest first"""
+    k = min(k, contribs.shape[1])
+    part = np.argpartition(-np.abs(contribs), k - 1, axis=1)[:, :k]
+    part_values = np.take_along_axis(contribs, part, axis=1)
+    order = np.argsort(-np.abs(part_values), axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_values, order, axis=1)
+
+def explain_portfolio(model, df, top_k=5, chunk_size=5000, exact=False):
+    """
+    Batched local explanations of a model's default probabilities
+
+    The ensemble's contributions average the forest and XGBoost
+    decompositions, matching how its probability averages the two models.
+
+    Parameters:
+    - model: trained CreditRiskModel (uses its current scoring model)
+    - df: DataFrame with customer data
+    - top_k: contributions kept per customer
+    - chunk_size: customers per decision_path batch for the forest
+    - exact: use TreeSHAP for the boosted models instead of path-based contributions
+    """
+    if not model.models_trained:
+        raise ValueError("Models not trained yet. Call train_models() first.")
+
+    X, _ = model.prepare_features(df)
+    X = model.encode_features(X)
+
+    if model.scoring_model == 'student':
+        if model.student_model is None:
+            raise ValueError("Student model not available. Call distill_student() first.")
+        contribs, base = boosted_contributions(model.student_model, X, exact)
+    else:
+        rf_contribs, rf_base = forest_contributions(model.rf_model, X, chunk_size)
+        xgb_contribs, xgb_base = boosted_contributions(model.xgb_model, X, exact)
+        contribs = (rf_contribs + xgb_contribs) / 2
+        base = (rf_base + xgb_base) / 2
+
+    base_value = float(np.mean(base))
+    predictions = np.asarray(base) + contribs.sum(axis=1)
+    indices, values = top_k_contributions(contribs, top_k)
+    return LocalExplanations(model.feature_columns, indices, values, base_value, predictions)
@@ -0,0 +1,274 @@
+"""
+Streaming Exports
+Writes recommendation and scenario tables to Excel (openpyxl write-only
+mode) or chunked CSV / CSV.gz, consuming DataFrame chunks one at a time so
+memory stays flat; large exports are split across sheets or files
+automatically
+Run: python export.py --output exports/recommendations.xlsx
+"""
+
+import os
+import io
+import gzip
+
+import pandas as pd
+import numpy as np
+
+# Excel sheet limit, minus the header row
+EXCEL_MAX_ROWS = 1048576 - 1
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Display formats of known columns in Excel exports
+EXCEL_NUMBER_FORMATS = {
+    'current_limit': '#,##0.00',
+    'current_credit_limit': '#,##0.00',
+    'recommended_limit': '#,##0.00',
+    'allocated_limit': '#,##0.00',
+    'change_amount': '#,##0.00',
+    'change_percentage': '0.00',
+    'avg_credit_limit': '#,##0',
+    'total_exposure': '#,##0',
+    'avg_limit_change_pct': '0.00',
+    'default_probability': '0.00%',
+    'predicted_default_prob': '0.00%',
+    'weighted_avg_risk': '0.00%'
+}
+
+def frame_chunks(df, chunk_size=DEFAULT_CHUNK_SIZE, positions=None, columns=None):
+    """
+    Yield chunks of an in-memory DataFrame
+
+    Parameters:
+    - df: DataFrame
+    - chunk_size: rows per chunk
+    - positions: optional row positions to export (e.g. a filter result)
+    - columns: optional columns to keep
+    """
+    n_rows = len(df) if positions is None else len(positions)
+    for start in range(0, n_rows, chunk_size):
+        rows = slice(start, start + chunk_size) if positions is None else positions[start:start + chunk_size]
+        chunk = df.iloc[rows]
+        yield chunk if columns is None else chunk[columns]
+
+def recommendation_chunks(source, engine=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield process_customers() output chunk by chunk
+
+    Parameters:
+    - source: DataFrame or CSV path of a scored portfolio (with predicted_default_prob)
+    - engine: CreditLimitEngine (default policy if None)
+    - chunk_size: customers per chunk
+    """
+    from credit_limit_engine import CreditLimitEngine
+    engine = engine or CreditLimitEngine()
+    chunks = pd.read_csv(source, chunksize=chunk_size) if isinstance(source, str) \
+        else frame_chunks(source, chunk_size)
+    for chunk in chunks:
+        yield engine.process_customers(chunk)
+
+def _excel_value(value):
+    """Cell value openpyxl accepts (missing values become empty cells)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def export_excel(tables, target, max_rows_per_sheet=EXCEL_MAX_ROWS, number_formats=None):
+    """
+    Stream tables into an .xlsx workbook in openpyxl write-only mode
+
+    Rows are written as they are generated and never held as cell objects,
+    so memory stays flat however large the export is. A table that exceeds
+    max_rows_per_sheet continues on 'Name (2)', 'Name (3)', ... sheets.
+
+    Parameters:
+    - tables: dict of sheet name -> DataFrame or iterable of DataFrame chunks
+    - target: output path or binary file-like object
+    - max_rows_per_sheet: data rows per sheet (Excel allows 1,048,575)
+    - number_formats: column -> Excel number format (default EXCEL_NUMBER_FORMATS)
+
+    Returns a dict of sheet name -> rows written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    if not 0 < max_rows_per_sheet <= EXCEL_MAX_ROWS:
+        raise ValueError(f"max_rows_per_sheet must be between 1 and {EXCEL_MAX_ROWS:,}")
+    number_formats = EXCEL_NUMBER_FORMATS if number_formats is None else number_formats
+
+    workbook = Workbook(write_only=True)
+    written = {}
+
+    for name, chunks in tables.items():
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        sheet, sheet_rows, part = None, 0, 0
+
+        for chunk in chunks:
+            columns = list(chunk.columns)
+            formats = [number_formats.get(col) for col in columns]
+            styled = [None] * len(columns)
+            for row in chunk.itertuples(index=False, name=None):
+                if sheet is None or sheet_rows >= max_rows_per_sheet:
+                    part += 1
+                    # Excel sheet titles are limited to 31 characters
+                    title = (name if part == 1 else f'{name} ({part})')[:31]
+                    sheet = workbook.create_sheet(title)
+                    sheet.append(columns)
+                    written[title] = 0
+                    sheet_rows = 0
+                    # Write-only rows are serialized on append, so one styled
+                    # cell per formatted column is reused for every row
+                    styled = [None] * len(columns)
+                cells = []
+                for j, (value, number_format) in enumerate(zip(row, formats)):
+                    value = _excel_value(value)
+                    if number_format is not None and value is not None:
+                        if styled[j] is None:
+                            styled[j] = WriteOnlyCell(sheet)
+                            styled[j].number_format = number_format
+                        styled[j].value = value
+                        value = styled[j]
+                    cells.append(value)
+                sheet.append(cells)
+                sheet_rows += 1
+                written[title] += 1
+
+        if sheet is None:
+            # Empty table: keep a sheet so the export's layout is predictable
+            workbook.create_sheet(name[:31])
+            written[name[:31]] = 0
+
+    workbook.save(target)
+    return written
+
+def _part_path(path, part):
+    """path for part 1, then name_part002.ext, name_part003.ext, ..."""
+    if part == 1:
+        return path
+    base, ext = (path[:-7], '.csv.gz') if path.endswith('.csv.gz') else os.path.splitext(path)
+    return f'{base}_part{part:03d}{ext}'
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', newline='', compresslevel=6)
+    return open(path, 'w', newline='')
+
+def export_csv(chunks, path, max_rows_per_file=None):
+    """
+    Stream DataFrame chunks into CSV files (gzip-compressed for .gz paths)
+
+    Each chunk is appended to the open file as it arrives. Once a file holds
+    max_rows_per_file rows the export continues in name_part002.csv(.gz), ...
+
+    Parameters:
+    - chunks: DataFrame or iterable of DataFrame chunks
+    - path: output path ending in .csv or .csv.gz
+    - max_rows_per_file: rows per file (None: a single file)
+
+    Returns the list of files written.
+    """
+    if max_rows_per_file is not None and max_rows_per_file <= 0:
+        raise ValueError("max_rows_per_file must be positive")
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    paths, handle, file_rows = [], None, 0
+
+    def next_file(columns):
+        nonlocal handle, file_rows
+        if handle is not None:
+            handle.close()
+        paths.append(_part_path(path, len(paths) + 1))
+        handle = _open_text(paths[-1])
+        columns.to_csv(handle, index=False)
+        file_rows = 0
+
+    try:
+        for chunk in chunks:
+            if handle is None:
+                next_file(chunk.iloc[:0])
+            start = 0
+            while start < len(chunk):
+                if max_rows_per_file and file_rows >= max_rows_per_file:
+                    next_file(chunk.iloc[:0])
+                room = max_rows_per_file - file_rows if max_rows_per_file else len(chunk)
+                piece = chunk.iloc[start:start + room]
+                piece.to_csv(handle, index=False, header=False)
+                file_rows += len(piece)
+                start += len(piece)
+    finally:
+        if handle is not None:
+            handle.close()
+    return paths
+
+def excel_bytes(tables, **kwargs):
+    """Workbook of export_excel() as bytes (e.g. for a download button)"""
+    buffer = io.BytesIO()
+    export_excel(tables, buffer, **kwargs)
+    return buffer.getvalue()
+
+def csv_gz_bytes(chunks):
+    """Gzip-compressed CSV of the chunks as bytes (e.g. for a download button)"""
+    buffer = io.BytesIO()
+    with gzip.open(buffer, 'wt', newline='', compresslevel=6) as handle:
+        header = True
+        for chunk in ([chunks] if isinstance(chunks, pd.DataFrame) else chunks):
+            chunk.to_csv(handle, index=False, header=header)
+            header = False
+    return buffer.getvalue()
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export credit limit recommendations and scenario tables")
+    parser.add_argument('--input', default='data/scored_portfolio.csv',
+                        help="scored portfolio CSV (from pipeline.py or batch_scoring.py --combine)")
+    parser.add_argument('--cube', default='data/portfolio_cube.npz', help="aggregate cube for the scenario table")
+    parser.add_argument('--output', default='exports/recommendations.xlsx',
+                        help="output path ending in .xlsx, .csv or .csv.gz")
+    parser.add_argument('--policy', default=None, help="policy version key")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help="rows per sheet (xlsx) or per file (csv) before splitting")
+    args = parser.parse_args()
+
+    from credit_limit_engine import CreditLimitEngine
+    from scenario_analysis import ScenarioAnalyzer
+    from portfolio_cube import PortfolioCube
+
+    if not os.path.exists(args.input):
+        print(f"Error: {args.input} not found. Run 'python pipeline.py' first.")
+        raise SystemExit(1)
+
+    engine = CreditLimitEngine(args.policy)
+    recommendations = recommendation_chunks(args.input, engine, args.chunk_size)
+    scenarios = ScenarioAnalyzer().analyze_cube(PortfolioCube.load(args.cube)) \
+        if os.path.exists(args.cube) else None
+
+    start = time.perf_counter()
+    if args.output.endswith('.xlsx'):
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        tables = {'Recommendations': recommendations}
+        if scenarios is not None:
+            tables['Scenarios'] = scenarios
+        kwargs = {'max_rows_per_sheet': args.max_rows} if args.max_rows else {}
+        sheets = export_excel(tables, args.output, **kwargs)
+        for title, rows in sheets.items():
+            print(f"  {title}: {rows:,} rows")
+        print(f"Workbook saved to {args.output} in {time.perf_counter() - start:.1f}s")
+    elif args.output.endswith(('.csv', '.csv.gz')):
+        paths = export_csv(recommendations, args.output, args.max_rows)
+        if scenarios is not None:
+            base = args.output[:-7] if args.output.endswith('.csv.gz') else args.output[:-4]
+            paths += export_csv(scenarios, base + '_scenarios' + args.output[len(base):])
+        print(f"Saved {', '.join(paths)} in {time.perf_counter() - start:.1f}s")
+    else:
+        print("Error: --output must end in .xlsx, .csv or .csv.gz")
+        raise SystemExit(1)
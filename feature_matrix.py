@@ -0,0 +1,82 @@
+"""
+Feature Matrix Builder for Credit Risk Models
+Validates and orders feature columns once against the saved feature list and
+produces one C-contiguous float32 matrix per batch for every model to share
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+
+class FeatureMatrixBuilder:
+    """Builds C-contiguous float32 feature matrices in saved column order"""
+
+    def __init__(self, feature_columns, cache_size=0):
+        """
+        Parameters:
+        - feature_columns: feature names in the order the models were trained on
+        - cache_size: number of matrices to keep, keyed by data fingerprint (0 disables)
+        """
+        self.feature_columns = list(feature_columns)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._validated_layouts = set()
+
+    def validate(self, df):
+        """Check once per column layout that every feature column is present"""
+        layout = tuple(df.columns)
+        if layout in self._validated_layouts:
+            return
+
+        missing = [col for col in self.feature_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+
+        non_numeric = [col for col in self.feature_columns
+                       if not pd.api.types.is_numeric_dtype(df[col])]
+        if non_numeric:
+            raise ValueError(f"Feature columns must be numeric: {non_numeric}")
+
+        self._validated_layouts.add(layout)
+
+    def build(self, df):
+        """
+        Feature matrix for a batch of customers
+
+        Columns are copied straight into a preallocated float32 array, so no
+        intermediate column-subset frame is created.
+
+        Parameters:
+        - df: DataFrame containing (at least) the feature columns
+        """
+        self.validate(df)
+
+        key = self.fingerprint(df) if self.cache_size else None
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        X = np.empty((len(df), len(self.feature_columns)), dtype=np.float32)
+        for j, col in enumerate(self.feature_columns):
+            X[:, j] = df[col].to_numpy()
+
+        if key is not None:
+            self._cache[key] = X
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return X
+
+    def fingerprint(self, df):
+        """Content hash of the feature columns of a batch"""
+        digest = hashlib.sha1()
+        digest.update(pd.util.hash_pandas_object(df[self.feature_columns], index=False).to_numpy())
+        return digest.hexdigest()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        state['_validated_layouts'] = set()
+        return state
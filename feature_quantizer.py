@@ -0,0 +1,142 @@
+"""
+Feature Quantization for Credit Risk Models
+Learns per-feature bin edges at training time and encodes customers into a
+compact uint8 matrix shared by model training and inference
+"""
+
+import os
+import hashlib
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+
+class FeatureQuantizer:
+    """Quantile binning of numeric features into contiguous uint8 codes"""
+
+    def __init__(self, max_bins=256, cache_size=8):
+        if not 2 <= max_bins <= 256:
+            raise ValueError("max_bins must be between 2 and 256 to fit in uint8 codes")
+        self.max_bins = max_bins
+        self.cache_size = cache_size
+        self.feature_columns = None
+        self.bin_edges = None
+        self._cache = OrderedDict()
+
+    def fit(self, X, feature_columns=None):
+        """
+        Learn bin edges for every feature column
+
+        Features with at most max_bins distinct values get one bin per value
+        (so flags and counts are encoded losslessly); continuous features are
+        split at their quantiles.
+
+        Parameters:
+        - X: DataFrame or 2-D array of training features
+        - feature_columns: column names when X is an array
+        """
+        if isinstance(X, pd.DataFrame):
+            feature_columns = list(X.columns)
+        elif feature_columns is None:
+            feature_columns = [f'feature_{j}' for j in range(X.shape[1])]
+        self.feature_columns = list(feature_columns)
+        self.bin_edges = []
+
+        for j in range(len(self.feature_columns)):
+            values = self._column(X, j)
+            values = values[~np.isnan(values)]
+            unique_values = np.unique(values)
+
+            if len(unique_values) <= self.max_bins:
+                # Cut half-way between neighbouring distinct values
+                edges = (unique_values[:-1] + unique_values[1:]) / 2
+            else:
+                quantiles = np.linspace(0, 1, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.quantile(values, quantiles))
+
+            self.bin_edges.append(edges)
+
+        self._cache.clear()
+        return self
+
+    def transform(self, X):
+        """
+        Encode features into a C-contiguous uint8 matrix of bin codes
+
+        Parameters:
+        - X: DataFrame containing the fitted feature columns, or a 2-D array
+          with the columns in fitted order
+        """
+        if self.bin_edges is None:
+            raise ValueError("Quantizer not fitted yet. Call fit() first.")
+
+        codes = np.empty((len(X), len(self.feature_columns)), dtype=np.uint8)
+        for j, edges in enumerate(self.bin_edges):
+            codes[:, j] = np.searchsorted(edges, self._column(X, j), side='right')
+
+        return codes
+
+    def _column(self, X, j):
+        """Feature j of a DataFrame or array as float64"""
+        if isinstance(X, pd.DataFrame):
+            return X[self.feature_columns[j]].to_numpy(dtype=np.float64)
+        return np.asarray(X[:, j], dtype=np.float64)
+
+    def fit_transform(self, X, feature_columns=None):
+        """Learn bin edges and encode the training features"""
+        return self.fit(X, feature_columns).transform(X)
+
+    def encode(self, X, cache_dir=None):
+        """
+        Encode features, reusing cached encodings of identical data
+
+        Encodings are kept in a small in-memory cache keyed by a fingerprint
+        of the input. With cache_dir they are also written as .npy files and
+        memory-mapped on later scoring runs.
+
+        Parameters:
+        - X: DataFrame or 2-D array of features (as for transform())
+        - cache_dir: optional directory for encodings shared across runs
+        """
+        key = self.fingerprint(X)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        cache_path = os.path.join(cache_dir, f'{key}.npy') if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            codes = np.load(cache_path, mmap_mode='r')
+        else:
+            codes = self.transform(X)
+            if cache_path:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, codes)
+                os.replace(tmp_path, cache_path)
+
+        self._cache[key] = codes
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return codes
+
+    def fingerprint(self, X):
+        """Content hash of the feature values and the fitted bin edges"""
+        digest = hashlib.sha1()
+        if isinstance(X, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(X[self.feature_columns], index=False).to_numpy())
+        else:
+            X = np.ascontiguousarray(X)
+            digest.update(f'{X.dtype}{X.shape}'.encode())
+            digest.update(X.view(np.uint8))
+        for edges in self.bin_edges:
+            digest.update(edges.tobytes())
+        return digest.hexdigest()
+
+    def __getstate__(self):
+        # Cached encodings are not part of the saved artifact
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
@@ -0,0 +1,272 @@
+"""
+Memory Profiler
+Opt-in per-stage memory accounting for the pipeline, training, scoring and
+dashboard: tracemalloc peak and retained bytes plus sampled process RSS for
+each named stage, per-column DataFrame memory_usage(deep=True), and a report
+ranking the stages and columns that use the most memory
+Run: python memory_report.py [--samples 100000] [--output data/memory_report/]
+"""
+
+import os
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# Setting this environment variable (e.g. CREDIT_MEMORY_PROFILE=1) enables
+# profiling at import, including in worker processes and Streamlit sessions
+MEMORY_PROFILE_ENV = 'CREDIT_MEMORY_PROFILE'
+
+MB = 1024 * 1024
+
+def current_rss():
+    """Resident set size of this process in bytes (None where unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss (KB on Linux) is the closest portable figure: the peak, not the current RSS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+class MemoryProfiler:
+    """Records memory per named stage and per DataFrame column"""
+
+    def __init__(self, sample_interval=0.01, trace_frames=1):
+        """
+        Parameters:
+        - sample_interval: seconds between RSS samples while a stage is open
+        - trace_frames: traceback depth kept by tracemalloc (more is slower)
+        """
+        self.sample_interval = sample_interval
+        self.trace_frames = trace_frames
+        self.stages = []
+        self.frames = {}
+        self._open = []
+        self._rss_peak = 0
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracemalloc (unless already tracing)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        """Forget recorded stages and frames"""
+        self.stages = []
+        self.frames = {}
+
+    def _sample(self):
+        """Background thread: track the highest RSS seen while stages are open"""
+        while True:
+            with self._lock:
+                if not self._open:
+                    self._sampler = None
+                    return
+                rss = current_rss() or 0
+                self._rss_peak = max(self._rss_peak, rss)
+            time.sleep(self.sample_interval)
+
+    def _fold_peaks(self):
+        """
+        Credit the peaks since the last fold to every open stage, then reset them
+
+        tracemalloc keeps a single process-wide peak, so nested stages fold
+        it into all enclosing stages before resetting it for themselves.
+        """
+        _, traced_peak = tracemalloc.get_traced_memory()
+        rss_peak = max(self._rss_peak, current_rss() or 0)
+        for record in self._open:
+            record['traced_peak'] = max(record['traced_peak'], traced_peak)
+            record['rss_peak'] = max(record['rss_peak'], rss_peak)
+        tracemalloc.reset_peak()
+        self._rss_peak = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager measuring one stage
+
+        Parameters:
+        - name: stage name (repeated stages are aggregated in the report)
+        """
+        self.start()
+        with self._lock:
+            self._fold_peaks()
+            traced, _ = tracemalloc.get_traced_memory()
+            rss = current_rss() or 0
+            record = {'stage': name, 'depth': len(self._open), 'traced_start': traced,
+                      'traced_peak': traced, 'rss_start': rss, 'rss_peak': rss}
+            self._open.append(record)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._fold_peaks()
+                self._open.remove(record)
+                traced, _ = tracemalloc.get_traced_memory()
+                rss = current_rss() or 0
+            self.stages.append({
+                'stage': name,
+                'depth': record['depth'],
+                'seconds': seconds,
+                'peak_mb': (record['traced_peak'] - record['traced_start']) / MB,
+                'retained_mb': (traced - record['traced_start']) / MB,
+                'rss_start_mb': record['rss_start'] / MB,
+                'rss_peak_mb': record['rss_peak'] / MB,
+                'rss_growth_mb': (record['rss_peak'] - record['rss_start']) / MB,
+                'rss_end_mb': rss / MB
+            })
+
+    def record_frame(self, name, df):
+        """
+        Record the deep memory usage of every column of a DataFrame
+
+        Parameters:
+        - name: frame name (a later record of the same name replaces it)
+        - df: DataFrame
+        """
+        usage = df.memory_usage(index=True, deep=True)
+        self.frames[name] = pd.DataFrame({
+            'frame': name,
+            'column': usage.index.astype(str),
+            'dtype': ['index' if col == 'Index' else str(df[col].dtype) for col in usage.index],
+            'rows': len(df),
+            'mb': usage.to_numpy() / MB
+        })
+        return usage.sum() / MB
+
+    def stage_report(self):
+        """Stages ranked by peak memory (repeated stages aggregated)"""
+        columns = ['stage', 'calls', 'seconds', 'peak_mb', 'retained_mb', 'rss_peak_mb', 'rss_growth_mb']
+        if not self.stages:
+            return pd.DataFrame(columns=columns)
+        stages = pd.DataFrame(self.stages)
+        report = stages.groupby('stage', sort=False).agg(
+            calls=('stage', 'size'),
+            seconds=('seconds', 'sum'),
+            peak_mb=('peak_mb', 'max'),
+            retained_mb=('retained_mb', 'sum'),
+            rss_peak_mb=('rss_peak_mb', 'max'),
+            rss_growth_mb=('rss_growth_mb', 'max')
+        ).reset_index()
+        # Native allocations (e.g. inside XGBoost) are invisible to tracemalloc
+        # but show up as RSS growth, so rank by whichever is larger
+        rank = report[['peak_mb', 'rss_growth_mb']].max(axis=1)
+        return report.loc[rank.sort_values(ascending=False).index, columns].reset_index(drop=True)
+
+    def column_report(self):
+        """Recorded DataFrame columns ranked by deep memory usage"""
+        if not self.frames:
+            return pd.DataFrame(columns=['frame', 'column', 'dtype', 'rows', 'mb'])
+        columns = pd.concat(self.frames.values(), ignore_index=True)
+        return columns.sort_values('mb', ascending=False, kind='stable').reset_index(drop=True)
+
+    def frame_report(self):
+        """Total deep memory usage per recorded DataFrame"""
+        columns = self.column_report()
+        return columns.groupby('frame', sort=False).agg(rows=('rows', 'first'), columns=('column', 'size'),
+                                                        mb=('mb', 'sum')).reset_index() \
+            .sort_values('mb', ascending=False).reset_index(drop=True)
+
+    def print_report(self, top=10):
+        """Print the ranked stage and column reports"""
+        stages = self.stage_report()
+        print(f"\nMemory by stage (tracemalloc peak/retained, sampled RSS; {len(self.stages)} measurements)")
+        print(stages.head(top).round(1).to_string(index=False) if len(stages) else "  no stages recorded")
+
+        columns = self.column_report()
+        if len(columns):
+            print("\nMemory by DataFrame")
+            print(self.frame_report().round(1).to_string(index=False))
+            print(f"\nLargest columns (top {top})")
+            print(columns.head(top).round(2).to_string(index=False))
+
+    def save_report(self, out_dir):
+        """Write stages.csv and columns.csv to out_dir"""
+        os.makedirs(out_dir, exist_ok=True)
+        self.stage_report().to_csv(os.path.join(out_dir, 'stages.csv'), index=False)
+        self.column_report().to_csv(os.path.join(out_dir, 'columns.csv'), index=False)
+
+_PROFILER = None
+
+def enable_memory_profiling(**kwargs):
+    """Turn on the process-wide profiler used by the pipeline hooks and return it"""
+    global _PROFILER
+    if _PROFILER is None:
+        _PROFILER = MemoryProfiler(**kwargs).start()
+    return _PROFILER
+
+def get_memory_profiler():
+    """The process-wide profiler, or None when profiling is off"""
+    return _PROFILER
+
+def profile_stage(name):
+    """Hook: measure a stage when profiling is on (a no-op context otherwise)"""
+    return _PROFILER.stage(name) if _PROFILER is not None else nullcontext()
+
+def profile_frame(name, df):
+    """Hook: record a DataFrame's per-column memory when profiling is on"""
+    if _PROFILER is not None:
+        _PROFILER.record_frame(name, df)
+
+if os.environ.get(MEMORY_PROFILE_ENV, '').lower() not in ('', '0', 'false', 'no'):
+    enable_memory_profiling()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile memory of generate -> train -> score -> recommend")
+    parser.add_argument('--samples', type=int, default=100000, help="portfolio size")
+    parser.add_argument('--top', type=int, default=10, help="rows per ranking")
+    parser.add_argument('--output', default=None, help="directory for stages.csv and columns.csv")
+    args = parser.parse_args()
+
+    # Use the imported module, whose profiler the hooks in other modules see
+    from memory_report import enable_memory_profiling, profile_stage, profile_frame
+    profiler = enable_memory_profiling()
+
+    from data_generator import generate_credit_dataset
+    from model_training import CreditRiskModel
+    from credit_limit_engine import CreditLimitEngine
+
+    # The hooks inside these calls record their own stages and frames
+    with profile_stage('generate_credit_dataset'):
+        df = generate_credit_dataset(n_samples=args.samples)
+    profile_frame('credit_data', df)
+
+    model = CreditRiskModel()
+    with profile_stage('train_models'):
+        model.train_models(df)
+
+    with profile_stage('predict_default_probability'):
+        df['predicted_default_prob'] = model.predict_default_probability(df)
+
+    CreditLimitEngine().process_customers(df)
+
+    profile_frame('scored_portfolio', df)
+    profiler.print_report(top=args.top)
+    if args.output:
+        profiler.save_report(args.output)
+        print(f"\nReports saved to {args.output}")
@@ -0,0 +1,459 @@
+"""
+Shared Model Hosting
+Packs the Random Forest, XGBoost and student trees (plus the quantizer's bin
+edges) into one flat buffer that is published as a read-only memory-mapped
+file or a multiprocessing.shared_memory block; other processes attach to it
+zero-copy and score with vectorized numpy tree traversal, without loading
+scikit-learn or XGBoost
+Run: python model_host.py publish | python model_host.py bench --processes 4
+"""
+
+import os
+import json
+import time
+import pandas as pd
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+from feature_quantizer import FeatureQuantizer
+from feature_matrix import FeatureMatrixBuilder
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then reported as None
+    resource = None
+
+HOST_FILE = 'model_host.bin'
+ALIGNMENT = 64
+HEADER_PREFIX = 8
+
+# Shared memory blocks created by this process (attaching to them here must keep tracking)
+_OWNED_BLOCKS = set()
+
+def _pack_forest(forest):
+    """Flatten a fitted RandomForestClassifier (leaf values pre-divided by the tree count)"""
+    n_trees = len(forest.estimators_)
+    parts = {name: [] for name in ('left', 'right', 'feature', 'threshold', 'default_left', 'value')}
+    roots, depth, offset = [], 0, 0
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+        value = tree.value[:, 0, :]
+
+        # Leaves point to themselves so traversal runs a fixed number of steps
+        parts['left'].append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        parts['right'].append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        parts['feature'].append(np.where(is_leaf, 0, tree.feature))
+        # x <= t is evaluated as x < nextafter(t), the comparison used for every model
+        parts['threshold'].append(np.nextafter(tree.threshold, np.inf))
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count))
+        parts['default_left'].append(np.asarray(missing_left, dtype=bool))
+        parts['value'].append(value[:, 1] / value.sum(axis=1) / n_trees)
+
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += tree.node_count
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    # Children interleaved: node i goes to children[2i] (left) or children[2i + 1] (right)
+    arrays['children'] = np.stack([arrays.pop('left'), arrays.pop('right')], axis=1).ravel()
+    arrays['roots'] = np.asarray(roots)
+    return arrays, {'depth': int(depth), 'base_margin': 0.0, 'link': 'identity'}
+
+def _pack_booster(booster_model):
+    """Flatten a fitted XGBoost model from its JSON dump (exact float32 splits and leaves)"""
+    learner = json.loads(booster_model.get_booster().save_raw('json'))['learner']
+    trees = learner['gradient_booster']['model']['trees']
+    parts = {name: [] for name in ('left', 'right', 'feature', 'threshold', 'default_left', 'value')}
+    roots, depth, offset = [], 0, 0
+
+    for tree in trees:
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        nodes = np.arange(len(left))
+        is_leaf = left < 0
+
+        parts['left'].append(np.where(is_leaf, nodes, left) + offset)
+        parts['right'].append(np.where(is_leaf, nodes, right) + offset)
+        parts['feature'].append(np.where(is_leaf, 0, tree['split_indices']))
+        parts['threshold'].append(np.where(is_leaf, np.inf, conditions))
+        parts['default_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        # Leaf values are stored in split_conditions
+        parts['value'].append(np.where(is_leaf, conditions, 0.0))
+
+        # Depth of the tree from its parent links
+        parents = np.asarray(tree['parents'])
+        node_depth = np.zeros(len(left), dtype=np.int64)
+        for node in range(1, len(left)):
+            node_depth[node] = node_depth[parents[node]] + 1
+        depth = max(depth, int(node_depth.max()))
+
+        roots.append(offset)
+        offset += len(left)
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    objective = learner['objective']['name']
+    link = 'sigmoid' if objective in ('binary:logistic', 'reg:logistic') else 'identity'
+    base_margin = float(np.log(base_score / (1 - base_score))) if link == 'sigmoid' else base_score
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    # Children interleaved: node i goes to children[2i] (left) or children[2i + 1] (right)
+    arrays['children'] = np.stack([arrays.pop('left'), arrays.pop('right')], axis=1).ravel()
+    arrays['roots'] = np.asarray(roots)
+    return arrays, {'depth': depth, 'base_margin': base_margin, 'link': link}
+
+def pack_model(model):
+    """
+    Flatten a trained CreditRiskModel into named arrays plus metadata
+
+    Returns (arrays dict, metadata dict).
+    """
+    if not model.models_trained:
+        raise ValueError("Models not trained yet. Call train_models() first.")
+
+    packed = {'rf': _pack_forest(model.rf_model), 'xgb': _pack_booster(model.xgb_model)}
+    if model.student_model is not None:
+        packed['student'] = _pack_booster(model.student_model)
+
+    dtypes = {'children': np.int32, 'feature': np.int32, 'threshold': np.float64,
+              'default_left': np.bool_, 'value': np.float64, 'roots': np.int32}
+    arrays = {}
+    metadata = {'feature_columns': list(model.feature_columns), 'models': {}, 'quantized': False}
+    for name, (model_arrays, model_meta) in packed.items():
+        for key, values in model_arrays.items():
+            arrays[f'{name}/{key}'] = np.ascontiguousarray(values, dtype=dtypes[key])
+        metadata['models'][name] = model_meta
+
+    if model.quantizer is not None:
+        metadata['quantized'] = True
+        for j, edges in enumerate(model.quantizer.bin_edges):
+            arrays[f'edges/{j}'] = np.asarray(edges, dtype=np.float64)
+
+    return arrays, metadata
+
+def _data_start(header_size):
+    """Arrays start at the first aligned offset after the header"""
+    return -(-(HEADER_PREFIX + header_size) // ALIGNMENT) * ALIGNMENT
+
+def _layout(arrays, metadata):
+    """Header (array offsets relative to the data start, dtypes, shapes and metadata) and buffer size"""
+    entries, offset = {}, 0
+    for name, values in arrays.items():
+        entries[name] = {'offset': offset, 'dtype': values.dtype.str, 'shape': list(values.shape)}
+        offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({'arrays': entries, 'metadata': metadata}).encode()
+    return header, _data_start(len(header)) + offset
+
+def _write_buffer(buffer, arrays, header):
+    buffer[:HEADER_PREFIX] = len(header).to_bytes(HEADER_PREFIX, 'little')
+    buffer[HEADER_PREFIX:HEADER_PREFIX + len(header)] = header
+    data_start = _data_start(len(header))
+    layout = json.loads(header)['arrays']
+    for name, values in arrays.items():
+        start = data_start + layout[name]['offset']
+        buffer[start:start + values.nbytes] = values.tobytes()
+
+def publish_model(model, path):
+    """
+    Write a packed model as a read-only file for memory-mapped attachment
+
+    Parameters:
+    - model: trained CreditRiskModel
+    - path: output file (written atomically)
+    """
+    arrays, metadata = pack_model(model)
+    header, size = _layout(arrays, metadata)
+    buffer = bytearray(size)
+    _write_buffer(memoryview(buffer), arrays, header)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(tmp_path, path)
+    print(f"Model host file written to {path} ({size / 1e6:.1f} MB)")
+    return size
+
+def is_published(model_dir='models/', path=None):
+    """
+    True if the model host file exists and is not older than any saved model
+
+    Parameters:
+    - model_dir: directory of the saved models
+    - path: host file (default: <model_dir>/model_host.bin)
+    """
+    path = path or os.path.join(model_dir, HOST_FILE)
+    if not os.path.exists(path):
+        return False
+    sources = [os.path.join(model_dir, name) for name in os.listdir(model_dir) if name.endswith('.pkl')]
+    return not any(os.path.getmtime(src) > os.path.getmtime(path) for src in sources)
+
+def ensure_published(model_dir='models/', path=None):
+    """
+    Path of the model host file for model_dir, republished if any saved model is newer
+
+    Parameters:
+    - model_dir: directory of the saved models
+    - path: host file (default: <model_dir>/model_host.bin)
+    """
+    path = path or os.path.join(model_dir, HOST_FILE)
+    if not is_published(model_dir, path):
+        from model_training import CreditRiskModel
+        model = CreditRiskModel()
+        model.load_models(model_dir)
+        publish_model(model, path)
+    return path
+
+def share_model(path, name=None):
+    """
+    Copy a published model file into a shared memory block
+
+    The returned SharedMemory must be kept open (and finally unlinked) by
+    the owning process while others attach to it by name.
+
+    Parameters:
+    - path: file written by publish_model()
+    - name: shared memory name (generated if None)
+    """
+    size = os.path.getsize(path)
+    block = shared_memory.SharedMemory(name=name, create=True, size=size)
+    with open(path, 'rb') as f:
+        f.readinto(block.buf)
+    _OWNED_BLOCKS.add(block.name)
+    return block
+
+def process_memory():
+    """
+    Memory of the current process in MB
+
+    rss counts every resident page; pss divides shared pages among the
+    processes mapping them (Linux only, else None), so it shows the real
+    per-process cost of shared models.
+    """
+    stats = {'rss_mb': None, 'pss_mb': None,
+             'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+             if resource is not None else None}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                if key in ('Rss', 'Pss'):
+                    stats[f'{key.lower()}_mb'] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return stats
+
+class HostedModel:
+    """Zero-copy view of a packed model that scores like CreditRiskModel"""
+
+    def __init__(self, buffer, scoring_model='ensemble', owner=None):
+        """
+        Use HostedModel.attach() rather than calling this directly
+
+        Parameters:
+        - buffer: memoryview/mmap of a packed model
+        - scoring_model: 'ensemble' or 'student'
+        - owner: object keeping the buffer alive (mmap or SharedMemory)
+        """
+        start = time.perf_counter()
+        header_size = int.from_bytes(bytes(buffer[:HEADER_PREFIX]), 'little')
+        header = json.loads(bytes(buffer[HEADER_PREFIX:HEADER_PREFIX + header_size]))
+        self.metadata = header['metadata']
+        data_start = _data_start(header_size)
+        self.arrays = {
+            name: np.frombuffer(buffer, dtype=entry['dtype'],
+                                count=int(np.prod(entry['shape'])),
+                                offset=data_start + entry['offset']).reshape(entry['shape'])
+            for name, entry in header['arrays'].items()
+        }
+        self._owner = owner
+        self.feature_columns = self.metadata['feature_columns']
+        self.matrix_builder = FeatureMatrixBuilder(self.feature_columns)
+        self.quantizer = None
+        if self.metadata['quantized']:
+            self.quantizer = FeatureQuantizer()
+            self.quantizer.feature_columns = list(self.feature_columns)
+            self.quantizer.bin_edges = [self.arrays[f'edges/{j}'] for j in range(len(self.feature_columns))]
+        self.drift_monitor = None
+        self.set_scoring_model(scoring_model)
+        self.attach_seconds = time.perf_counter() - start
+
+    @classmethod
+    def attach(cls, path=None, shm_name=None, scoring_model='ensemble'):
+        """
+        Attach to a published model file (memory-mapped) or shared memory block
+
+        Parameters:
+        - path: file written by publish_model()
+        - shm_name: name of a block created by share_model()
+        - scoring_model: 'ensemble' or 'student'
+        """
+        start = time.perf_counter()
+        if shm_name is not None:
+            block = shared_memory.SharedMemory(name=shm_name)
+            # Attaching processes must not unlink the owner's block on exit
+            if shm_name not in _OWNED_BLOCKS:
+                resource_tracker.unregister(block._name, 'shared_memory')
+            hosted = cls(block.buf, scoring_model, owner=block)
+        elif path is not None:
+            mapped = np.memmap(path, dtype=np.uint8, mode='r')
+            hosted = cls(mapped, scoring_model, owner=mapped)
+        else:
+            raise ValueError("Give either path or shm_name")
+        hosted.attach_seconds = time.perf_counter() - start
+        return hosted
+
+    def set_scoring_model(self, scoring_model):
+        if scoring_model not in ('ensemble', 'student'):
+            raise ValueError(f"Unknown scoring model '{scoring_model}'")
+        if scoring_model == 'student' and 'student' not in self.metadata['models']:
+            raise ValueError("Student model not included in the hosted model")
+        self.scoring_model = scoring_model
+
+    def _predict_trees(self, name, X, chunk_size=2000):
+        """
+        Vectorized traversal of every tree of one packed model
+
+        All trees of a chunk of rows advance one level per step with flat
+        np.take gathers; leaves point to themselves, so after `depth` steps
+        every row sits on a leaf of every tree.
+        """
+        children, feature, threshold, default_left, value, roots = (
+            self.arrays[f'{name}/{key}']
+            for key in ('children', 'feature', 'threshold', 'default_left', 'value', 'roots'))
+        meta = self.metadata['models'][name]
+        n_features = X.shape[1]
+        has_missing = bool(np.isnan(X).any())
+        margin = np.empty(len(X))
+
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start:start + chunk_size]
+            flat = chunk.ravel()
+            row_offsets = (np.arange(len(chunk)) * n_features)[:, None]
+            node = np.broadcast_to(roots, (len(chunk), len(roots))).copy()
+            for _ in range(meta['depth']):
+                values = np.take(flat, row_offsets + np.take(feature, node))
+                go_right = values >= np.take(threshold, node)
+                if has_missing:
+                    go_right |= np.isnan(values) & ~np.take(default_left, node)
+                node = np.take(children, 2 * node + go_right)
+            margin[start:start + chunk_size] = np.take(value, node).sum(axis=1)
+
+        margin += meta['base_margin']
+        return 1 / (1 + np.exp(-margin)) if meta['link'] == 'sigmoid' else margin
+
+    def predict_default_probability(self, df):
+        """Predict default probability for given customers"""
+        X = self.matrix_builder.build(df)
+        if self.quantizer is not None:
+            X = self.quantizer.transform(X)
+        X = np.asarray(X, dtype=np.float64)
+
+        if self.scoring_model == 'student':
+            return self._predict_trees('student', X)
+        return (self._predict_trees('rf', X) + self._predict_trees('xgb', X)) / 2
+
+    def close(self):
+        """Release this process's view of the buffer"""
+        # Views into the buffer must be gone before a shared block can close
+        self.arrays = {}
+        self.quantizer = None
+        if isinstance(self._owner, shared_memory.SharedMemory):
+            self._owner.close()
+        self._owner = None
+
+def _bench_worker(mode, target, n_samples, queue, barrier):
+    """Child process: load or attach, score a batch and report memory and latency"""
+    from data_generator import generate_credit_dataset
+    df = generate_credit_dataset(n_samples=n_samples, random_seed=11)
+    before = process_memory()
+
+    start = time.perf_counter()
+    if mode == 'pickle':
+        from model_training import CreditRiskModel
+        model = CreditRiskModel()
+        model.load_models(target)
+    elif mode == 'mmap':
+        model = HostedModel.attach(path=target)
+    else:
+        model = HostedModel.attach(shm_name=target)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.predict_default_probability(df)
+    predict_seconds = time.perf_counter() - start
+
+    # Measure once every worker holds its model, so PSS reflects the sharing
+    barrier.wait()
+    after = process_memory()
+    queue.put({
+        'mode': mode,
+        'load_ms': load_seconds * 1000,
+        'predict_ms': predict_seconds * 1000,
+        'rss_mb': after['rss_mb'],
+        'pss_mb': after['pss_mb'],
+        'model_rss_mb': (after['rss_mb'] - before['rss_mb']) if after['rss_mb'] else None
+    })
+    barrier.wait()
+
+def benchmark_hosting(model_dir='models/', processes=4, n_samples=20000):
+    """
+    Per-process memory and load/attach latency: pickled copies vs shared hosting
+
+    Starts `processes` workers per mode that each load (pickle) or attach
+    (mmap, shared memory) the models and score n_samples customers.
+
+    Returns a DataFrame with the mean per-process figures of each mode.
+    """
+    import multiprocessing as mp
+    from model_training import CreditRiskModel
+
+    model = CreditRiskModel()
+    model.load_models(model_dir)
+    path = os.path.join(model_dir, HOST_FILE)
+    publish_model(model, path)
+    block = share_model(path)
+
+    ctx = mp.get_context('spawn')
+    rows = []
+    try:
+        for mode, target in (('pickle', model_dir), ('mmap', path), ('shared_memory', block.name)):
+            queue, barrier = ctx.Queue(), ctx.Barrier(processes)
+            workers = [ctx.Process(target=_bench_worker, args=(mode, target, n_samples, queue, barrier))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            results = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            rows.extend(results)
+    finally:
+        block.close()
+        block.unlink()
+
+    summary = pd.DataFrame(rows).groupby('mode', sort=False).mean().reset_index()
+    return summary
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish models for shared hosting or benchmark hosting modes")
+    parser.add_argument('command', choices=['publish', 'bench'])
+    parser.add_argument('--model-dir', default='models/')
+    parser.add_argument('--output', default=None, help=f"host file (default: <model-dir>/{HOST_FILE})")
+    parser.add_argument('--processes', type=int, default=4, help="worker processes per mode (bench)")
+    parser.add_argument('--samples', type=int, default=20000, help="customers scored per worker (bench)")
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        from model_training import CreditRiskModel
+        model = CreditRiskModel()
+        model.load_models(args.model_dir)
+        publish_model(model, args.output or os.path.join(args.model_dir, HOST_FILE))
+    else:
+        summary = benchmark_hosting(args.model_dir, args.processes, args.samples)
+        print(f"\nPer-process averages over {args.processes} processes per mode:")
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
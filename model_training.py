@@ -3,63 +3,214 @@ Credit Risk Model Training
 Implements Random Forest and XGBoost for default probability prediction
 """
 
+import os
+import copy
+import time
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, roc_auc_score, accuracy_score
-import xgboost as xgb
+from feature_quantizer import FeatureQuantizer
+from feature_matrix import FeatureMatrixBuilder
+from drift_monitor import DriftMonitor
+from memory_report import profile_stage, profile_frame
+from thread_budget import process_threads, plan_workers, apply_thread_limit, configure_model_threads
+
+# Columns that are never model features (identifiers and targets)
+NON_FEATURE_COLUMNS = ['customer_id', 'default_probability', 'defaulted']
+
+# Scoring models selectable for the prediction paths
+SCORING_MODELS = ('ensemble', 'student')
+
+# Monotone direction of each feature for the distilled student
+# (+1: risk rises with the feature, -1: risk falls with the feature)
+STUDENT_MONOTONE_CONSTRAINTS = {
+    'credit_score': -1,
+    'debt_to_income_ratio': 1,
+    'credit_utilization': 1,
+    'payment_history_score': -1,
+    'late_payments_12m': 1,
+    'on_time_payment_rate': -1,
+    'behavior_score': -1,
+    'has_bankruptcy': 1,
+    'has_delinquency': 1,
+    'high_utilization': 1
+}
+
+# Cross-validation worker state, set up once per process by _init_cv_worker
+_cv_X = None
+_cv_y = None
+
+def _init_cv_worker(X, y, n_threads):
+    """Receive the encoded matrix and labels once per worker process"""
+    global _cv_X, _cv_y
+    _cv_X, _cv_y = X, y
+    apply_thread_limit(n_threads)
+
+def _run_fold(fold, train_idx, test_idx):
+    """
+    Worker task: fit fresh estimators on one fold and score its held-out rows
+
+    Returns a list of per-model metric rows for the fold.
+    """
+    from sklearn.metrics import roc_auc_score, accuracy_score
+    
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    model = CreditRiskModel()
+    model.build_estimators()
+    
+    X_train, y_train = _cv_X[train_idx], _cv_y[train_idx]
+    X_test, y_test = _cv_X[test_idx], _cv_y[test_idx]
+    model.rf_model.fit(X_train, y_train)
+    model.xgb_model.fit(X_train, y_train)
+    
+    rf_proba = model.rf_model.predict_proba(X_test)[:, 1]
+    xgb_proba = model.xgb_model.predict_proba(X_test)[:, 1]
+    probas = {'rf': rf_proba, 'xgb': xgb_proba, 'ensemble': (rf_proba + xgb_proba) / 2}
+    
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_seconds = time.process_time() - cpu_start
+    return [{
+        'fold': fold,
+        'model': name,
+        'roc_auc': roc_auc_score(y_test, proba),
+        'accuracy': accuracy_score(y_test, proba >= 0.5),
+        'train_rows': len(train_idx),
+        'test_rows': len(test_idx),
+        'wall_seconds': wall_seconds,
+        'cpu_seconds': cpu_seconds
+    } for name, proba in probas.items()]
 
 class CreditRiskModel:
     """Credit risk prediction model using Random Forest and XGBoost"""
     
-    def __init__(self):
+    def __init__(self, scoring_model='ensemble', quantize=True, matrix_cache_size=0):
+        # Estimators are created by train_models() or unpickled by load_models(),
+        # so scoring-only processes never import the training stack up front
+        self.rf_model = None
+        self.xgb_model = None
+        self.student_model = None
+        # Bin codes shared by training and inference (None: raw features)
+        self.quantizer = FeatureQuantizer() if quantize else None
+        # Reference feature/score histograms captured at training time
+        self.drift_monitor = None
+        self.encoding_cache_dir = None
+        self.matrix_cache_size = matrix_cache_size
+        self.matrix_builder = None
+        self.feature_columns = None
+        self.models_trained = False
+        self.set_scoring_model(scoring_model)
+    
+    def set_scoring_model(self, scoring_model):
+        """Choose which model the scoring paths use ('ensemble' or 'student')"""
+        if scoring_model not in SCORING_MODELS:
+            raise ValueError(f"Unknown scoring model '{scoring_model}'. "
+                             f"Choose one of {SCORING_MODELS}.")
+        self.scoring_model = scoring_model
+        
+    def prepare_features(self, df):
+        """
+        Prepare features for model training and scoring
+        
+        Columns are validated and ordered against feature_columns (fixed at
+        first training) and copied into one C-contiguous float32 matrix that
+        every model consumes without further conversion.
+        
+        Returns the feature matrix and the 'defaulted' target (None if absent).
+        """
+        if self.feature_columns is None:
+            # Select features (exclude identifiers and targets)
+            self.feature_columns = [col for col in df.columns if col not in NON_FEATURE_COLUMNS]
+        
+        if self.matrix_builder is None or self.matrix_builder.feature_columns != self.feature_columns:
+            self.matrix_builder = FeatureMatrixBuilder(self.feature_columns,
+                                                       cache_size=self.matrix_cache_size)
+        
+        X = self.matrix_builder.build(df)
+        y = df['defaulted'].to_numpy() if 'defaulted' in df.columns else None
+        
+        return X, y
+    
+    def encode_features(self, X):
+        """
+        Encode prepared features into the matrix the models consume
+        
+        Quantized codes are cached as uint8 and widened to float32 once per
+        batch, so the Random Forest and XGBoost share the same array. Only the
+        cached codes are 8x smaller than float64 features: every fit and
+        prediction runs on the float32 matrix, so model memory is halved, not
+        cut 8x.
+        """
+        if self.quantizer is None:
+            return X
+        codes = self.quantizer.encode(X, cache_dir=self.encoding_cache_dir)
+        return codes.astype(np.float32, order='C')
+    
+    def build_estimators(self):
+        """Create untrained Random Forest and XGBoost estimators (threads from the thread budget)"""
+        from sklearn.ensemble import RandomForestClassifier
+        import xgboost as xgb
+        
         self.rf_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
             random_state=42,
-            n_jobs=-1
+            n_jobs=process_threads()
         )
         self.xgb_model = xgb.XGBClassifier(
             n_estimators=100,
             max_depth=6,
             learning_rate=0.1,
             random_state=42,
-            eval_metric='logloss'
+            eval_metric='logloss',
+            tree_method='hist',
+            max_bin=256,
+            n_jobs=process_threads()
         )
-        self.feature_columns = None
-        self.models_trained = False
-        
-    def prepare_features(self, df):
-        """Prepare features for model training"""
-        # Select features (exclude identifiers and targets)
-        exclude_cols = ['customer_id', 'default_probability', 'defaulted']
-        feature_cols = [col for col in df.columns if col not in exclude_cols]
-        
-        X = df[feature_cols]
-        y = df['defaulted']
-        
-        if self.feature_columns is None:
-            self.feature_columns = feature_cols
-        
-        return X, y
     
     def train_models(self, df):
         """Train both Random Forest and XGBoost models"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import classification_report, roc_auc_score, accuracy_score
+        
+        self.build_estimators()
+        # A student distilled from earlier models no longer matches these
+        self.student_model = None
         print("Preparing features...")
-        X, y = self.prepare_features(df)
+        profile_frame('training_data', df)
+        with profile_stage('prepare_features'):
+            X, y = self.prepare_features(df)
         
-        print(f"Training with {len(X)} samples and {len(X.columns)} features")
+        print(f"Training with {len(X)} samples and {X.shape[1]} features")
         
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        with profile_stage('train_test_split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+        
+        # Learn bin edges on the training split
+        with profile_stage('quantize_features'):
+            if self.quantizer is not None:
+                print("Quantizing features...")
+                self.quantizer.fit(X_train, self.feature_columns)
+            
+            # Reference histograms for drift checks (reusing the quantizer's edges)
+            self.drift_monitor = DriftMonitor().fit(
+                X_train, self.feature_columns,
+                bin_edges=self.quantizer.bin_edges if self.quantizer is not None else None
+            )
+            
+            # Encode both splits once
+            if self.quantizer is not None:
+                X_train = self.encode_features(X_train)
+                X_test = self.encode_features(X_test)
         
         # Train Random Forest
         print("\nTraining Random Forest model...")
-        self.rf_model.fit(X_train, y_train)
+        with profile_stage('fit_random_forest'):
+            self.rf_model.fit(X_train, y_train)
         rf_proba = self.rf_model.predict_proba(X_test)[:, 1]
         rf_pred = self.rf_model.predict(X_test)
         
@@ -68,32 +219,220 @@ class CreditRiskModel:
         
         # Train XGBoost
         print("\nTraining XGBoost model...")
-        self.xgb_model.fit(X_train, y_train)
+        with profile_stage('fit_xgboost'):
+            self.xgb_model.fit(X_train, y_train)
         xgb_proba = self.xgb_model.predict_proba(X_test)[:, 1]
         xgb_pred = self.xgb_model.predict(X_test)
         
         print(f"XGBoost - Accuracy: {accuracy_score(y_test, xgb_pred):.4f}")
         print(f"XGBoost - ROC-AUC: {roc_auc_score(y_test, xgb_proba):.4f}")
         
+        # Held-out ensemble probabilities are the ensemble's score reference
+        self.drift_monitor = self.drift_monitor.for_model(self.scoring_model)
+        self.drift_monitor.fit_scores((rf_proba + xgb_proba) / 2, scoring_model='ensemble')
+        
         self.models_trained = True
         
         return X_train, X_test, y_train, y_test
     
+    def cross_validate(self, df, n_folds=5, workers=None, threads_per_worker=None, random_state=42):
+        """
+        Stratified k-fold ROC-AUC and accuracy of RF, XGBoost and the ensemble
+        
+        The feature matrix is built and quantized once for all folds. The bin
+        edges use no labels, only the feature values of all rows, which moves
+        quantile cut points slightly compared with per-fold fitting. Each
+        worker receives the matrix once, and folds then send only row indices. XGBoost
+        bins the uint8 codes losslessly, so its own sketch is trivial.
+        Folds run in parallel processes, each capped at threads_per_worker
+        threads so workers do not oversubscribe the CPU. The trained models
+        of this instance are left untouched.
+        
+        Parameters:
+        - df: DataFrame with customer data and the 'defaulted' target
+        - n_folds: number of folds
+        - workers: parallel fold processes (default: min(n_folds, thread budget))
+        - threads_per_worker: threads per model fit (default: thread budget / workers)
+        - random_state: seed of the fold split
+        
+        Returns (per-fold DataFrame, aggregate DataFrame with mean/std per model).
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from sklearn.model_selection import StratifiedKFold
+        
+        X, y = self.prepare_features(df)
+        if y is None:
+            raise ValueError("Cross-validation needs the 'defaulted' target column")
+        
+        # Encode once; a private quantizer keeps this instance's fitted edges intact
+        if self.quantizer is not None:
+            quantizer = FeatureQuantizer(self.quantizer.max_bins).fit(X, self.feature_columns)
+            X = quantizer.encode(X).astype(np.float32, order='C')
+        
+        workers, budget_threads = plan_workers(workers, max_workers=n_folds)
+        threads_per_worker = threads_per_worker or budget_threads
+        splits = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(X, y)
+        
+        print(f"Cross-validating {n_folds} folds on {len(X)} samples "
+              f"({workers} workers x {threads_per_worker} threads)...")
+        wall_start = time.perf_counter()
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_cv_worker,
+                                 initargs=(X, y, threads_per_worker)) as pool:
+            futures = [pool.submit(_run_fold, fold, train_idx, test_idx)
+                       for fold, (train_idx, test_idx) in enumerate(splits)]
+            for future in futures:
+                fold_rows = future.result()
+                rows.extend(fold_rows)
+                ensemble = fold_rows[-1]
+                print(f"  Fold {ensemble['fold'] + 1}/{n_folds} - ensemble ROC-AUC: "
+                      f"{ensemble['roc_auc']:.4f}, accuracy: {ensemble['accuracy']:.4f} "
+                      f"({ensemble['wall_seconds']:.1f}s)")
+        wall_seconds = time.perf_counter() - wall_start
+        
+        folds = pd.DataFrame(rows)
+        aggregate = folds.groupby('model', sort=False).agg(
+            roc_auc_mean=('roc_auc', 'mean'),
+            roc_auc_std=('roc_auc', 'std'),
+            accuracy_mean=('accuracy', 'mean'),
+            accuracy_std=('accuracy', 'std')
+        ).reset_index()
+        
+        # Every model of a fold shares one fit, so count fold times once
+        fold_times = folds.drop_duplicates('fold')
+        cpu_seconds = fold_times['cpu_seconds'].sum()
+        print(aggregate.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        print(f"Wall-clock: {wall_seconds:.1f}s | CPU: {cpu_seconds:.1f}s across folds "
+              f"({cpu_seconds / wall_seconds:.1f} CPUs busy on average)")
+        aggregate.attrs['wall_seconds'] = wall_seconds
+        aggregate.attrs['cpu_seconds'] = cpu_seconds
+        
+        return folds, aggregate
+    
     def predict_default_probability(self, df):
         """Predict default probability for given customers"""
         if not self.models_trained:
             raise ValueError("Models not trained yet. Call train_models() first.")
         
-        X, _ = self.prepare_features(df)
+        with profile_stage('prepare_scoring_features'):
+            X, _ = self.prepare_features(df)
+            X = self.encode_features(X)
+        
+        if self.scoring_model == 'student':
+            if self.student_model is None:
+                raise ValueError("Student model not available. Call distill_student() first.")
+            return self.student_model.predict(X)
         
-        # Get predictions from both models
+        return self._ensemble_proba(X)
+    
+    def _ensemble_proba(self, X):
+        """Average default probability of the Random Forest and XGBoost models"""
         rf_proba = self.rf_model.predict_proba(X)[:, 1]
         xgb_proba = self.xgb_model.predict_proba(X)[:, 1]
         
-        # Ensemble prediction (average)
-        ensemble_proba = (rf_proba + xgb_proba) / 2
+        return (rf_proba + xgb_proba) / 2
+    
+    def distill_student(self, X_train, X_test, y_test, n_timing_runs=5):
+        """
+        Distill the ensemble into a compact student model
+        
+        The student is a shallow monotone-constrained gradient boosted model
+        fitted on the ensemble's soft probabilities, so it can score large
+        portfolios at a fraction of the ensemble's cost.
+        
+        Parameters:
+        - X_train: features the student is fitted on (labelled by the ensemble)
+        - X_test, y_test: held-out data used to compare student and ensemble
+        - n_timing_runs: repetitions used to time both models
+        """
+        from sklearn.metrics import roc_auc_score, accuracy_score
+        import xgboost as xgb
+        
+        if not self.models_trained:
+            raise ValueError("Models not trained yet. Call train_models() first.")
+        
+        print("\nDistilling student model from ensemble...")
+        soft_targets = self._ensemble_proba(X_train)
+        
+        constraints = tuple(STUDENT_MONOTONE_CONSTRAINTS.get(col, 0)
+                            for col in self.feature_columns)
+        self.student_model = xgb.XGBRegressor(
+            n_estimators=40,
+            max_depth=3,
+            learning_rate=0.2,
+            objective='reg:logistic',
+            monotone_constraints=constraints,
+            random_state=42,
+            n_jobs=process_threads()
+        )
+        self.student_model.fit(X_train, soft_targets)
+        
+        # Compare student and teacher on held-out data
+        ensemble_proba = self._ensemble_proba(X_test)
+        student_proba = self.student_model.predict(X_test)
+        
+        # The student's own held-out probabilities are its score reference
+        if self.drift_monitor is not None:
+            self.drift_monitor.fit_scores(student_proba, scoring_model='student')
+        
+        ensemble_time = self._time_scoring(self._ensemble_proba, X_test, n_timing_runs)
+        student_time = self._time_scoring(self.student_model.predict, X_test, n_timing_runs)
+        
+        report = {
+            'ensemble_accuracy': accuracy_score(y_test, ensemble_proba >= 0.5),
+            'student_accuracy': accuracy_score(y_test, student_proba >= 0.5),
+            'ensemble_auc': roc_auc_score(y_test, ensemble_proba),
+            'student_auc': roc_auc_score(y_test, student_proba),
+            'ensemble_seconds': ensemble_time,
+            'student_seconds': student_time,
+            'speedup': ensemble_time / student_time if student_time > 0 else float('inf')
+        }
+        report['accuracy_gap'] = report['ensemble_accuracy'] - report['student_accuracy']
+        report['auc_gap'] = report['ensemble_auc'] - report['student_auc']
+        
+        print(f"Student - Accuracy: {report['student_accuracy']:.4f} "
+              f"(gap {report['accuracy_gap']:+.4f} vs ensemble)")
+        print(f"Student - ROC-AUC: {report['student_auc']:.4f} "
+              f"(gap {report['auc_gap']:+.4f} vs ensemble)")
+        print(f"Student - Scoring speedup: {report['speedup']:.1f}x "
+              f"({student_time * 1000:.1f} ms vs {ensemble_time * 1000:.1f} ms "
+              f"for {len(X_test)} customers)")
+        
+        return report
+    
+    @staticmethod
+    def _time_scoring(predict_fn, X, n_runs):
+        """Best-of-n wall-clock time of a prediction function"""
+        best = float('inf')
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            predict_fn(X)
+            best = min(best, time.perf_counter() - start)
+        return best
+    
+    def check_drift(self, df, scores=None):
+        """
+        PSI/KS drift report of a batch against the training data
+        
+        Scores are compared with the held-out scores of the scoring model in
+        use. Customers the models were trained on score in-sample (sharper
+        than held-out), so score drift is only meaningful for new customers.
+        
+        Parameters:
+        - df: DataFrame with customer data
+        - scores: predicted probabilities of the batch (computed if None)
+        
+        For streamed batches use drift_monitor.update() per chunk and
+        drift_monitor.report() at the end instead.
+        """
+        if self.drift_monitor is None:
+            raise ValueError("No drift reference available. Retrain the models to capture one.")
+        if scores is None:
+            scores = self.predict_default_probability(df)
         
-        return ensemble_proba
+        # Score a copy so the stored reference window is left untouched
+        monitor = copy.copy(self.drift_monitor).reset()
+        return monitor.update(df, scores).report()
     
     def get_feature_importance(self):
         """Get feature importance from trained models"""
@@ -114,7 +453,6 @@ class CreditRiskModel:
     
     def save_models(self, filepath='models/'):
         """Save trained models"""
-        import os
         os.makedirs(filepath, exist_ok=True)
         
         with open(f'{filepath}rf_model.pkl', 'wb') as f:
@@ -126,6 +464,27 @@ class CreditRiskModel:
         with open(f'{filepath}feature_columns.pkl', 'wb') as f:
             pickle.dump(self.feature_columns, f)
         
+        # Without a quantizer the models take raw features; an old quantizer.pkl
+        # would make load_models() encode their inputs
+        quantizer_path = f'{filepath}quantizer.pkl'
+        if self.quantizer is not None:
+            with open(quantizer_path, 'wb') as f:
+                pickle.dump(self.quantizer, f)
+        elif os.path.exists(quantizer_path):
+            os.remove(quantizer_path)
+        
+        if self.drift_monitor is not None:
+            self.drift_monitor.save(f'{filepath}drift_monitor.pkl')
+        
+        # The student is shipped as its own artifact; one left over from an
+        # earlier run was distilled from other models (and bin codes), so it goes
+        student_path = f'{filepath}student_model.pkl'
+        if self.student_model is not None:
+            with open(student_path, 'wb') as f:
+                pickle.dump(self.student_model, f)
+        elif os.path.exists(student_path):
+            os.remove(student_path)
+        
         print(f"Models saved to {filepath}")
     
     def load_models(self, filepath='models/'):
@@ -139,18 +498,52 @@ class CreditRiskModel:
         with open(f'{filepath}feature_columns.pkl', 'rb') as f:
             self.feature_columns = pickle.load(f)
         
+        # Models saved before quantization was introduced use raw features
+        quantizer_path = f'{filepath}quantizer.pkl'
+        if os.path.exists(quantizer_path):
+            with open(quantizer_path, 'rb') as f:
+                self.quantizer = pickle.load(f)
+        else:
+            self.quantizer = None
+        
+        monitor_path = f'{filepath}drift_monitor.pkl'
+        self.drift_monitor = (DriftMonitor.load(monitor_path).for_model(self.scoring_model)
+                              if os.path.exists(monitor_path) else None)
+        
+        student_path = f'{filepath}student_model.pkl'
+        if os.path.exists(student_path):
+            with open(student_path, 'rb') as f:
+                self.student_model = pickle.load(f)
+        else:
+            # A student from an earlier load or distill does not match these models
+            self.student_model = None
+            if self.scoring_model == 'student':
+                raise FileNotFoundError(f"Student model not found at {student_path}. "
+                                        "Run 'python model_training.py --distill' first.")
+        
+        # Saved estimators carry the thread count of the training machine
+        configure_model_threads(self)
+        
         self.models_trained = True
         print(f"Models loaded from {filepath}")
 
-def train_and_save_model():
-    """Main function to train and save the model"""
+def train_and_save_model(distill=False):
+    """
+    Main function to train and save the model
+    
+    Parameters:
+    - distill: also train and save the compact student model
+    """
     # Load data
     print("Loading data...")
     df = pd.read_csv('data/credit_data.csv')
     
     # Train model
     model = CreditRiskModel()
-    model.train_models(df)
+    X_train, X_test, y_train, y_test = model.train_models(df)
+    
+    if distill:
+        model.distill_student(X_train, X_test, y_test)
     
     # Save model
     model.save_models()
@@ -164,6 +557,25 @@ def train_and_save_model():
     importance.to_csv('models/feature_importance.csv', index=False)
 
 if __name__ == '__main__':
-    train_and_save_model()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the credit risk models")
+    parser.add_argument('--distill', action='store_true',
+                        help="also distill a compact student model for high-volume scoring")
+    parser.add_argument('--cv', type=int, default=0, metavar='FOLDS',
+                        help="report k-fold cross-validation instead of training")
+    parser.add_argument('--cv-workers', type=int, default=None, help="parallel fold processes")
+    parser.add_argument('--cv-threads', type=int, default=None, help="threads per fold process")
+    args = parser.parse_args()
+    
+    if args.cv:
+        folds, _ = CreditRiskModel().cross_validate(pd.read_csv('data/credit_data.csv'), n_folds=args.cv,
+                                                    workers=args.cv_workers,
+                                                    threads_per_worker=args.cv_threads)
+        os.makedirs('models', exist_ok=True)
+        folds.to_csv('models/cv_results.csv', index=False)
+        print("Per-fold results saved to models/cv_results.csv")
+    else:
+        train_and_save_model(distill=args.distill)
 
 
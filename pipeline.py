@@ -0,0 +1,378 @@
+"""
+Build Pipeline
+Expresses setup as stages (generate -> train -> score -> store, plus an optional
+monthly panel) and records a content hash of each stage's config, code and
+inputs next to its artifacts so unchanged stages are skipped and independent
+stages run in parallel
+Run: python pipeline.py [--force STAGE ...] [--workers N]
+"""
+
+import os
+import ast
+import json
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from memory_report import enable_memory_profiling, profile_stage, profile_frame
+from thread_budget import thread_budget, plan_workers, apply_thread_limit
+
+DEFAULT_CONFIG = {
+    'generate': {'n_samples': 2000, 'random_seed': 42},
+    'train': {'distill': False},
+    'score': {'scoring_model': 'ensemble', 'policy': None},
+    'panel': {'n_customers': 0, 'n_months': 36, 'random_seed': 42},
+    'store': {'build': True}
+}
+
+MODEL_FILES = ['rf_model.pkl', 'xgb_model.pkl', 'feature_columns.pkl', 'quantizer.pkl',
+               'drift_monitor.pkl']
+# Optional model file, tracked even when absent so a stale or removed student is noticed
+STUDENT_FILE = 'student_model.pkl'
+# Train outputs besides the models: importance report and the shared model host file
+TRAIN_ARTIFACTS = ['feature_importance.csv', 'model_host.bin']
+
+def _is_main_block(node):
+    """True for a top-level `if __name__ == '__main__':` block"""
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__')
+
+def module_sources(entry_modules, source_dir=None):
+    """
+    Project source files a stage runs: its entry modules plus every local
+    module they import, directly or transitively (including imports inside
+    functions, excluding command-line `if __name__ == '__main__'` blocks)
+
+    Parameters:
+    - entry_modules: module names the stage's run function imports
+    - source_dir: directory holding the project's modules (default: this file's)
+    """
+    source_dir = source_dir or os.path.dirname(os.path.abspath(__file__))
+    found = set()
+    pending = list(entry_modules)
+    while pending:
+        module = pending.pop()
+        file_name = f'{module}.py'
+        path = os.path.join(source_dir, file_name)
+        if file_name in found or not os.path.exists(path):
+            continue
+        found.add(file_name)
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        tree.body = [node for node in tree.body if not _is_main_block(node)]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return sorted(found)
+
+def run_generate(config, paths):
+    """Stage: synthetic customer dataset and its summary sketch"""
+    from data_generator import save_dataset
+    with profile_stage('generate_credit_dataset'):
+        df = save_dataset(n_samples=config['n_samples'], random_seed=config['random_seed'],
+                          data_dir=paths['data'])
+    profile_frame('credit_data', df)
+
+def run_train(config, paths):
+    """Stage: ensemble (and optionally the distilled student) trained on the dataset"""
+    import pandas as pd
+    from model_training import CreditRiskModel
+    model = CreditRiskModel()
+    X_train, X_test, y_train, y_test = model.train_models(pd.read_csv(paths['credit_data']))
+    if config['distill']:
+        model.distill_student(X_train, X_test, y_test)
+    model.save_models(paths['models'])
+    # Flat tree file that dashboards and batch workers attach to (model_host.py)
+    from model_host import HOST_FILE, publish_model
+    publish_model(model, os.path.join(paths['models'], HOST_FILE))
+    model.get_feature_importance().to_csv(os.path.join(paths['models'], 'feature_importance.csv'),
+                                          index=False)
+
+def run_score(config, paths):
+    """Stage: scored portfolio, its aggregate cube and per-customer explanations"""
+    import pandas as pd
+    from model_training import CreditRiskModel
+    from credit_policy import CreditPolicy
+    from batch_scoring import score_chunk
+    from portfolio_cube import save_scored_portfolio
+    from explanations import explain_portfolio
+    model = CreditRiskModel(scoring_model=config['scoring_model'])
+    model.load_models(paths['models'])
+    policy = CreditPolicy(config['policy'])
+    df = pd.read_csv(paths['credit_data'])
+    scored = score_chunk(df, model, policy)
+    save_scored_portfolio(scored, data_dir=paths['data'], policy=policy)
+    explain_portfolio(model, df).save(os.path.join(paths['data'], 'explanations.npz'))
+
+def run_store(config, paths):
+    """Stage: SQLite store of the dataset and recommendations, stamped with its inputs"""
+    from storage import build_store
+    store = build_store(paths['credit_data'], paths['store'], config['scoring_models'],
+                        paths['models'], config['policy'])
+    store.close()
+
+def run_panel(config, paths):
+    """Stage: monthly behavioral panel for backtesting"""
+    from data_generator import generate_credit_panel, save_panel
+    save_panel(generate_credit_panel(n_customers=config['n_customers'], n_months=config['n_months'],
+                                     random_seed=config['random_seed']),
+               out_dir=paths['panel'])
+
+def build_stages(config, data_dir='data/', model_dir='models/'):
+    """
+    Stage graph for a config
+
+    Each stage lists the artifacts it reads (inputs), writes (outputs), the
+    source files its result depends on (code, derived from the imports of the
+    modules its run function uses) and the stages it waits for.
+    """
+    paths = {
+        'data': data_dir,
+        'models': model_dir,
+        'credit_data': os.path.join(data_dir, 'credit_data.csv'),
+        'credit_summary': os.path.join(data_dir, 'credit_data_summary.json'),
+        'panel': os.path.join(data_dir, 'panel'),
+        'store': os.path.join(data_dir, 'portfolio.db')
+    }
+    model_files = MODEL_FILES + [STUDENT_FILE]
+
+    stages = {
+        'generate': {
+            'run': run_generate,
+            'after': [],
+            'inputs': [],
+            'outputs': [paths['credit_data'], paths['credit_summary']],
+            'code': module_sources(['data_generator', 'memory_report'])
+        },
+        'train': {
+            'run': run_train,
+            'after': ['generate'],
+            'inputs': [paths['credit_data']],
+            'outputs': [os.path.join(model_dir, name) for name in model_files + TRAIN_ARTIFACTS],
+            'code': module_sources(['model_training', 'model_host'])
+        },
+        'score': {
+            'run': run_score,
+            'after': ['generate', 'train'],
+            'inputs': [paths['credit_data']] + [os.path.join(model_dir, name) for name in model_files],
+            'outputs': [os.path.join(data_dir, 'scored_portfolio.csv'),
+                        os.path.join(data_dir, 'portfolio_cube.npz'),
+                        os.path.join(data_dir, 'explanations.npz')],
+            'code': module_sources(['model_training', 'credit_policy', 'batch_scoring', 'portfolio_cube',
+                                    'explanations'])
+        }
+    }
+    if config['store']['build']:
+        stages['store'] = {
+            'run': run_store,
+            'after': ['generate', 'train'],
+            'inputs': [paths['credit_data']] + [os.path.join(model_dir, name) for name in model_files],
+            'outputs': [paths['store']],
+            'code': module_sources(['storage'])
+        }
+    if config['panel']['n_customers'] > 0:
+        stages['panel'] = {
+            'run': run_panel,
+            'after': [],
+            'inputs': [],
+            'outputs': [paths['panel']],
+            'code': module_sources(['data_generator'])
+        }
+
+    for name, stage in stages.items():
+        stage['config'] = config[name]
+        stage['paths'] = paths
+    return stages
+
+def hash_path(path):
+    """Content hash of a file, or of every file in a directory (None if missing)"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode())
+                digest.update(hash_path(full).encode())
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stamp_path(name, stage):
+    """Stamp file recorded next to the stage's first artifact"""
+    artifact_dir = os.path.dirname(os.path.normpath(stage['outputs'][0]))
+    return os.path.join(artifact_dir, f'.{name}.stamp.json')
+
+def stage_key(stage):
+    """Hash of everything a stage's outputs depend on: config, code and inputs"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    parts = {
+        'config': stage['config'],
+        'code': {name: hash_path(os.path.join(here, name)) for name in stage['code']},
+        'inputs': {path: hash_path(path) for path in stage['inputs']}
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest(), parts
+
+def is_up_to_date(name, stage):
+    """True if the stamp matches the current key and the outputs are unchanged"""
+    path = stamp_path(name, stage)
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        stamp = json.load(f)
+    if stamp.get('key') != stage_key(stage)[0]:
+        return False
+    return all(stamp['outputs'].get(output) == hash_path(output) for output in stage['outputs'])
+
+def write_stamp(name, stage, seconds):
+    key, parts = stage_key(stage)
+    stamp = {
+        'stage': name,
+        'key': key,
+        'config': parts['config'],
+        'code': parts['code'],
+        'inputs': parts['inputs'],
+        'outputs': {output: hash_path(output) for output in stage['outputs']},
+        'seconds': round(seconds, 2)
+    }
+    tmp_path = f'{stamp_path(name, stage)}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(stamp, f, indent=2)
+    os.replace(tmp_path, stamp_path(name, stage))
+
+def _execute(name, run, config, paths, n_threads, profile_memory=False):
+    """Worker task: run one stage on its share of the thread budget and time it"""
+    apply_thread_limit(n_threads)
+    profiler = enable_memory_profiling() if profile_memory else None
+    if profiler is not None:
+        profiler.reset()
+    start = time.perf_counter()
+    with profile_stage(name):
+        run(config, paths)
+    seconds = time.perf_counter() - start
+    if profiler is not None:
+        print(f"[{name}] memory report")
+        profiler.print_report()
+        profiler.save_report(os.path.join(paths['data'], 'memory_report', name))
+    return seconds
+
+def run_pipeline(config=None, force=(), workers=2, data_dir='data/', model_dir='models/',
+                 profile_memory=False):
+    """
+    Run every stage whose config, code or inputs changed since its last run
+
+    A stage is checked once all the stages it depends on have finished, so
+    a rebuilt upstream artifact with identical content does not force
+    downstream work. Independent stages run in parallel worker processes.
+    A stage keeps the threads it started with until it finishes, and stages
+    started alongside it share only the rest of the thread budget, so the
+    stages running at once never exceed it.
+
+    Parameters:
+    - config: per-stage settings merged over DEFAULT_CONFIG
+    - force: stage names to rerun regardless of their stamps
+    - workers: maximum stages running at once
+    - data_dir, model_dir: artifact directories
+    - profile_memory: record per-stage memory (memory_report.py) and write
+      each stage's report to data_dir/memory_report/<stage>/
+
+    Returns a dict of stage name -> 'ran' or 'skipped'.
+    """
+    merged = {name: {**defaults, **((config or {}).get(name) or {})}
+              for name, defaults in DEFAULT_CONFIG.items()}
+    if merged['score']['scoring_model'] == 'student' and not merged['train']['distill']:
+        raise ValueError("Scoring with the student model requires train.distill=True")
+    # The store holds every trained scoring model under the scoring policy
+    merged['store'] = {**merged['store'],
+                       'scoring_models': ['ensemble', 'student'] if merged['train']['distill'] else ['ensemble'],
+                       'policy': merged['score']['policy']}
+    stages = build_stages(merged, data_dir, model_dir)
+    unknown = set(force) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}. Choose from {sorted(stages)}.")
+
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(model_dir, exist_ok=True)
+
+    status = {}
+    running = {}
+    threads = {}
+    budget = thread_budget()
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while len(status) < len(stages):
+            ready = []
+            for name, stage in stages.items():
+                if name in status or name in running.values():
+                    continue
+                if not all(status.get(dep) for dep in stage['after']):
+                    continue
+                if name not in force and is_up_to_date(name, stage):
+                    status[name] = 'skipped'
+                    print(f"[{name}] up to date, skipped")
+                    continue
+                ready.append(name)
+
+            # Threads held by running stages stay theirs until they finish;
+            # stages started now split what is left of the budget
+            ready = ready[:workers - len(running)]
+            if ready:
+                free = budget - sum(threads.values())
+                _, n_threads = plan_workers(len(ready), budget=max(free, len(ready)))
+            for name in ready:
+                stage = stages[name]
+                threads[name] = n_threads
+                print(f"[{name}] running ({n_threads} threads)...")
+                running[pool.submit(_execute, name, stage['run'], stage['config'], stage['paths'],
+                                    n_threads, profile_memory)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                threads.pop(name)
+                seconds = future.result()
+                write_stamp(name, stages[name], seconds)
+                status[name] = 'ran'
+                print(f"[{name}] done in {seconds:.1f}s")
+
+    ran = [name for name, result in status.items() if result == 'ran']
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s "
+          f"(ran: {', '.join(ran) or 'none'})")
+    return status
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build data, models and scored portfolio, skipping unchanged stages")
+    parser.add_argument('--samples', type=int, default=DEFAULT_CONFIG['generate']['n_samples'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG['generate']['random_seed'])
+    parser.add_argument('--distill', action='store_true', help="also train the distilled student")
+    parser.add_argument('--scoring-model', choices=['ensemble', 'student'], default='ensemble')
+    parser.add_argument('--policy', default=None, help="policy version key")
+    parser.add_argument('--panel-customers', type=int, default=0,
+                        help="also build a monthly panel for this many customers")
+    parser.add_argument('--panel-months', type=int, default=DEFAULT_CONFIG['panel']['n_months'])
+    parser.add_argument('--force', nargs='+', default=[], help="stages to rerun regardless of stamps")
+    parser.add_argument('--workers', type=int, default=2, help="stages run in parallel")
+    parser.add_argument('--no-store', action='store_true',
+                        help="skip building the SQLite store (data/portfolio.db) for the dashboard")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="report per-stage peak/retained memory and DataFrame column sizes")
+    args = parser.parse_args()
+
+    run_pipeline({
+        'generate': {'n_samples': args.samples, 'random_seed': args.seed},
+        'train': {'distill': args.distill},
+        'score': {'scoring_model': args.scoring_model, 'policy': args.policy},
+        'panel': {'n_customers': args.panel_customers, 'n_months': args.panel_months},
+        'store': {'build': not args.no_store}
+    }, force=args.force, workers=args.workers, profile_memory=args.profile_memory)
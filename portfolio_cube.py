@@ -0,0 +1,228 @@
+"""
+Portfolio Aggregate Cube
+Pre-aggregated portfolio measures over risk, score, utilization, scenario,
+limit and probability bands, built in one pass and maintained incrementally
+so dashboard queries read a few thousand cells instead of scanning customers
+"""
+
+import json
+import pandas as pd
+import numpy as np
+from credit_policy import CreditPolicy
+
+# Default probability above which a customer counts as high risk
+HIGH_RISK_THRESHOLD = 0.35
+
+UTILIZATION_EDGES = [0.3, 0.5, 0.8]
+UTILIZATION_LABELS = ['<30%', '30-50%', '50-80%', '80%+']
+
+SCENARIO_LABELS = ['Normal (Moderate Growth)', 'Slowdown', 'High Growth']
+
+LIMIT_LABELS = ['Low', 'Med-Low', 'Medium', 'Med-High', 'High']
+PROB_EDGES = [0.2, 0.4, 0.6, 0.8]
+PROB_LABELS = ['0-20%', '20-40%', '40-60%', '60-80%', '80-100%']
+
+# Overview chart bands of the default probability (upper edges inclusive)
+DEFAULT_RISK_EDGES = [0.15, 0.3, 0.5]
+DEFAULT_RISK_LABELS = ['Low', 'Medium', 'High', 'Very High']
+
+class PortfolioCube:
+    """Dense aggregate cube of portfolio measures"""
+
+    MEASURES = ('count', 'exposure', 'current_exposure', 'expected_loss',
+                'sum_prob', 'high_risk_count', 'sum_credit_score', 'sum_utilization')
+
+    def __init__(self, policy=None):
+        """
+        Create an empty cube
+
+        Parameters:
+        - policy: CreditPolicy used for risk categories, score bands and limits
+        """
+        self.policy = policy if isinstance(policy, CreditPolicy) else CreditPolicy(policy)
+
+        score_bounds = [300] + [int(e) for e in self.policy.score_edges] + [901]
+        score_labels = [f'{lo}-{hi - 1}' for lo, hi in zip(score_bounds[:-1], score_bounds[1:])]
+        self.limit_edges = np.linspace(self.policy.min_limit, self.policy.max_limit,
+                                       len(LIMIT_LABELS) + 1)[1:-1]
+
+        self.dimensions = {
+            'risk_category': [str(label) for label in self.policy.risk_labels],
+            'score_band': score_labels,
+            'utilization_band': UTILIZATION_LABELS,
+            'economic_scenario': SCENARIO_LABELS,
+            'limit_band': LIMIT_LABELS,
+            'prob_band': PROB_LABELS,
+            'default_risk_band': DEFAULT_RISK_LABELS
+        }
+        self.shape = tuple(len(labels) for labels in self.dimensions.values())
+        self.data = np.zeros((len(self.MEASURES),) + self.shape)
+
+    @classmethod
+    def build(cls, df, policy=None):
+        """
+        Build a cube from a scored portfolio in one pass
+
+        Parameters:
+        - df: DataFrame with customer data and predicted_default_prob
+          (recommended_limit is computed from the policy if missing)
+        - policy: CreditPolicy, config or version key
+        """
+        cube = cls(policy)
+        cube.add(df)
+        return cube
+
+    def _coordinates(self, df):
+        """Band index of every row along each dimension"""
+        prob = df['predicted_default_prob'].to_numpy(dtype=np.float64)
+        limits = self._recommended_limits(df)
+
+        return [
+            np.searchsorted(self.policy.risk_edges, prob, side='right'),
+            np.searchsorted(self.policy.score_edges, df['credit_score'].to_numpy(), side='right'),
+            np.searchsorted(UTILIZATION_EDGES, df['credit_utilization'].to_numpy(), side='right'),
+            np.clip(df['economic_scenario'].to_numpy(dtype=np.int64), 0, len(SCENARIO_LABELS) - 1),
+            np.searchsorted(self.limit_edges, limits, side='right'),
+            np.searchsorted(PROB_EDGES, prob, side='right'),
+            np.searchsorted(DEFAULT_RISK_EDGES, prob, side='left')
+        ]
+
+    def _recommended_limits(self, df):
+        if 'recommended_limit' in df.columns:
+            return df['recommended_limit'].to_numpy(dtype=np.float64)
+        return self.policy.evaluate(df)['recommended_limit'].to_numpy()
+
+    def add(self, df, sign=1):
+        """
+        Add (or with sign=-1 remove) rows' contributions to the cube
+
+        Parameters:
+        - df: rows in the same form as for build()
+        - sign: +1 to add rows, -1 to remove them
+        """
+        if len(df) == 0:
+            return self
+
+        cells = np.ravel_multi_index(self._coordinates(df), self.shape)
+        n_cells = int(np.prod(self.shape))
+
+        prob = df['predicted_default_prob'].to_numpy(dtype=np.float64)
+        limits = self._recommended_limits(df)
+        weights = {
+            'exposure': limits,
+            'current_exposure': df['current_credit_limit'].to_numpy(dtype=np.float64),
+            'expected_loss': prob * limits,
+            'sum_prob': prob,
+            'high_risk_count': (prob > HIGH_RISK_THRESHOLD).astype(np.float64),
+            'sum_credit_score': df['credit_score'].to_numpy(dtype=np.float64),
+            'sum_utilization': df['credit_utilization'].to_numpy(dtype=np.float64)
+        }
+
+        flat = self.data.reshape(len(self.MEASURES), n_cells)
+        for m, measure in enumerate(self.MEASURES):
+            flat[m] += sign * np.bincount(cells, weights=weights.get(measure), minlength=n_cells)
+
+        return self
+
+    def remove(self, df):
+        """Remove rows' contributions from the cube"""
+        return self.add(df, sign=-1)
+
+    def update(self, old_rows, new_rows):
+        """
+        Incrementally replace changed rows
+
+        Parameters:
+        - old_rows: the rows as they were when added to the cube
+        - new_rows: the same customers with their new values
+        """
+        self.remove(old_rows)
+        return self.add(new_rows)
+
+    def _selection(self, filters):
+        """Cube data restricted to the filtered labels of each dimension"""
+        data = self.data
+        for axis, (dim, labels) in enumerate(self.dimensions.items(), start=1):
+            if dim not in filters:
+                continue
+            wanted = filters[dim]
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            unknown = set(wanted) - set(labels)
+            if unknown:
+                raise ValueError(f"Unknown {dim} labels: {sorted(unknown)}")
+            data = np.take(data, [labels.index(label) for label in wanted], axis=axis)
+        return data
+
+    def totals(self, **filters):
+        """
+        Portfolio measures for a slice of the cube
+
+        Parameters:
+        - filters: dimension=label or dimension=[labels] restrictions
+        """
+        sums = self._selection(filters).reshape(len(self.MEASURES), -1).sum(axis=1)
+        return dict(zip(self.MEASURES, sums))
+
+    def group(self, dims, **filters):
+        """
+        Measures aggregated by one or more dimensions
+
+        Parameters:
+        - dims: dimension name or list of names to group by
+        - filters: dimension=label or dimension=[labels] restrictions
+
+        Returns a DataFrame with one row per label combination (in band order).
+        """
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        names = list(self.dimensions)
+        data = self._selection(filters)
+
+        other_axes = tuple(i + 1 for i, name in enumerate(names) if name not in dims)
+        data = data.sum(axis=other_axes)
+
+        # Order the kept axes as requested
+        kept = [name for name in names if name in dims]
+        data = np.moveaxis(data, [kept.index(d) + 1 for d in dims], range(1, len(dims) + 1))
+
+        labels = [filters.get(d, self.dimensions[d]) for d in dims]
+        labels = [[lab] if isinstance(lab, str) else list(lab) for lab in labels]
+        index = pd.MultiIndex.from_product(labels, names=dims)
+
+        result = pd.DataFrame(data.reshape(len(self.MEASURES), -1).T,
+                              index=index, columns=self.MEASURES)
+        return result.reset_index()
+
+    def save(self, path):
+        """Persist the cube (measures plus dimension labels and policy) as .npz"""
+        metadata = {
+            'measures': list(self.MEASURES),
+            'dimensions': self.dimensions,
+            'policy': self.policy.config
+        }
+        np.savez_compressed(path, data=self.data, metadata=json.dumps(metadata))
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube saved with save()"""
+        with np.load(path) as saved:
+            metadata = json.loads(str(saved['metadata']))
+            cube = cls(CreditPolicy(metadata['policy']))
+            if metadata['dimensions'] != cube.dimensions or \
+                    tuple(metadata['measures']) != cube.MEASURES:
+                raise ValueError(f"Cube at {path} was built with a different layout")
+            cube.data = saved['data']
+        return cube
+
+def save_scored_portfolio(df, data_dir='data/', policy=None):
+    """
+    Save a scored portfolio together with its aggregate cube
+
+    Parameters:
+    - df: DataFrame with customer data, predicted_default_prob and recommended limits
+    - data_dir: output directory (scored_portfolio.csv and portfolio_cube.npz)
+    - policy: CreditPolicy, config or version key used for the cube bands
+    """
+    df.to_csv(f'{data_dir}scored_portfolio.csv', index=False)
+    cube = PortfolioCube.build(df, policy)
+    cube.save(f'{data_dir}portfolio_cube.npz')
+    return cube
@@ -0,0 +1,186 @@
+"""
+Portfolio Indexes for the Dashboard
+Prebuilt lookup structures so interactive pages touch only the rows they show
+"""
+
+import numpy as np
+
+class CustomerIndex:
+    """Sorted customer_id index with exact and prefix lookup"""
+
+    def __init__(self, customer_ids):
+        """
+        Build the index once per dataset
+
+        Parameters:
+        - customer_ids: customer_id values in row order of the portfolio frame
+        """
+        ids = np.asarray(customer_ids).astype(str)
+        self.order = np.argsort(ids, kind='stable')       # row positions in id order
+        self.sorted_ids = ids[self.order]
+        self.positions = {cid: pos for pos, cid in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.sorted_ids)
+
+    def lookup(self, customer_id):
+        """Row position of a customer, or None if unknown"""
+        return self.positions.get(customer_id)
+
+    def prefix_search(self, prefix=''):
+        """
+        Row positions (in customer_id order) of customers whose id starts with prefix
+
+        Two binary searches on the sorted ids, so the cost does not grow
+        with the number of matches until the rows are actually read.
+        """
+        if not prefix:
+            return self.order
+        lo = np.searchsorted(self.sorted_ids, prefix, side='left')
+        hi = np.searchsorted(self.sorted_ids, prefix + '\uffff', side='left')
+        return self.order[lo:hi]
+
+def paginate(positions, page, page_size):
+    """
+    Slice one page out of a sequence of row positions
+
+    Returns the positions on the page and the total number of pages.
+    """
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = min(max(page, 1), n_pages)
+    start = (page - 1) * page_size
+    return positions[start:start + page_size], n_pages
+
+class RecommendationIndex:
+    """
+    Precomputed filter indexes and aggregates for the recommendations table
+
+    Rows are kept in credit score order so a minimum-score filter is a
+    searchsorted suffix. Risk categories and change directions are stored as
+    packed bitmaps over that order, and summary measures are pre-aggregated
+    per (risk category, change direction, credit score) cell with cumulative
+    sums along the score axis, so metrics for any filter combination are read
+    from a few cells instead of re-scanning the portfolio.
+    """
+
+    CHANGE_DIRECTIONS = ('increase', 'decrease', 'no_change')
+    MEASURES = ('count', 'current_credit_limit', 'recommended_limit', 'change_amount')
+
+    def __init__(self, frame):
+        """
+        Parameters:
+        - frame: DataFrame with credit_score, risk_category, current_credit_limit,
+          recommended_limit and change_amount columns
+        """
+        self.frame = frame.reset_index(drop=True)
+        self.n_rows = len(self.frame)
+
+        scores = self.frame['credit_score'].to_numpy()
+        self.score_order = np.argsort(scores, kind='stable')
+        self.sorted_scores = scores[self.score_order]
+
+        categories = self.frame['risk_category'].to_numpy()[self.score_order]
+        self.categories = [str(c) for c in dict.fromkeys(np.sort(categories.astype(str)))]
+        change = self.frame['change_amount'].to_numpy()[self.score_order]
+        directions = {
+            'increase': change > 0,
+            'decrease': change < 0,
+            'no_change': change == 0
+        }
+
+        self.category_bitmaps = {c: np.packbits(categories == c) for c in self.categories}
+        self.change_bitmaps = {d: np.packbits(mask) for d, mask in directions.items()}
+
+        # Aggregate cube: cell = category x direction, columns = distinct scores
+        self.score_values, score_idx = np.unique(self.sorted_scores, return_inverse=True)
+        category_idx = np.searchsorted(np.asarray(self.categories), categories.astype(str))
+        direction_idx = np.select([directions['increase'], directions['decrease']], [0, 1], default=2)
+        cell = (category_idx * len(self.CHANGE_DIRECTIONS) + direction_idx) * len(self.score_values) + score_idx
+        n_cells = len(self.categories) * len(self.CHANGE_DIRECTIONS) * len(self.score_values)
+
+        cube = np.empty((len(self.MEASURES), n_cells))
+        cube[0] = np.bincount(cell, minlength=n_cells)
+        for m, measure in enumerate(self.MEASURES[1:], start=1):
+            weights = self.frame[measure].to_numpy(dtype=np.float64)[self.score_order]
+            cube[m] = np.bincount(cell, weights=weights, minlength=n_cells)
+        cube = cube.reshape(len(self.MEASURES), len(self.categories),
+                            len(self.CHANGE_DIRECTIONS), len(self.score_values))
+
+        # Suffix sums along the score axis: suffix[..., k] = totals for scores >= score_values[k]
+        self._suffix = np.concatenate(
+            [np.cumsum(cube[..., ::-1], axis=-1)[..., ::-1], np.zeros(cube.shape[:-1] + (1,))],
+            axis=-1
+        )
+
+    def _direction_names(self, change):
+        if change in (None, 'all'):
+            return list(self.CHANGE_DIRECTIONS)
+        if change not in self.CHANGE_DIRECTIONS:
+            raise ValueError(f"Unknown change direction '{change}'")
+        return [change]
+
+    def filter(self, categories=None, change=None, min_score=None):
+        """
+        Row positions matching the filters, highest credit score first
+
+        Parameters:
+        - categories: risk categories to keep (None keeps all)
+        - change: 'increase', 'decrease', 'no_change' or None/'all'
+        - min_score: minimum credit score (None keeps all)
+        """
+        categories = self.categories if categories is None else categories
+        start = 0 if min_score is None else np.searchsorted(self.sorted_scores, min_score, side='left')
+
+        bits = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for category in categories:
+            if category in self.category_bitmaps:
+                bits |= self.category_bitmaps[category]
+        if change not in (None, 'all'):
+            bits &= self.change_bitmaps[self._direction_names(change)[0]]
+
+        mask = np.unpackbits(bits, count=self.n_rows)[start:].astype(bool)
+        return self.score_order[start:][mask][::-1]
+
+    def summary(self, categories=None, change=None, min_score=None):
+        """Count, averages and total change for a filter, read from the aggregate cube"""
+        categories = self.categories if categories is None else categories
+        cat_idx = [self.categories.index(c) for c in categories if c in self.categories]
+        dir_idx = [self.CHANGE_DIRECTIONS.index(d) for d in self._direction_names(change)]
+        k = 0 if min_score is None else np.searchsorted(self.score_values, min_score, side='left')
+
+        totals = self._suffix[:, cat_idx][:, :, dir_idx][..., k].sum(axis=(1, 2))
+        count = int(totals[0])
+
+        return {
+            'count': count,
+            'avg_current_limit': totals[1] / count if count else float('nan'),
+            'avg_recommended_limit': totals[2] / count if count else float('nan'),
+            'total_change': totals[3]
+        }
+
+    def score_range(self):
+        """Lowest and highest credit score"""
+        return int(self.sorted_scores[0]), int(self.sorted_scores[-1])
+
+    def page(self, categories=None, change=None, min_score=None, page=1, page_size=50):
+        """
+        One page of matching rows, highest credit score first
+
+        Returns (DataFrame of the page, number of pages).
+        """
+        page_rows, n_pages = paginate(self.filter(categories, change, min_score), page, page_size)
+        return self.frame.iloc[page_rows], n_pages
+
+    def values(self, column, categories=None, change=None, min_score=None):
+        """One column of every matching row (e.g. for a histogram)"""
+        return self.frame[column].iloc[self.filter(categories, change, min_score)]
+
+    def largest(self, n, column, categories=None, change=None, min_score=None):
+        """The n matching rows with the largest value of column"""
+        return self.frame.iloc[self.filter(categories, change, min_score)].nlargest(n, column)
+
+    def chunks(self, categories=None, change=None, min_score=None, chunk_size=50000, columns=None):
+        """Matching rows in chunks, highest credit score first (e.g. for exports)"""
+        from export import frame_chunks
+        return frame_chunks(self.frame, chunk_size, positions=self.filter(categories, change, min_score),
+                            columns=columns)
@@ -20,13 +20,9 @@ REM Install requirements
 echo Installing requirements...
 pip install -r requirements.txt
 
-REM Run setup if data doesn't exist
-if not exist "data\credit_data.csv" (
-    echo Running setup...
-    python setup.py
-) else (
-    echo Data already exists, skipping setup...
-)
+REM Build data and models (stages with unchanged inputs are skipped)
+echo Running build pipeline...
+python pipeline.py
 
 REM Run Streamlit app
 echo.
@@ -21,13 +21,9 @@ source venv/bin/activate
 echo "Installing requirements..."
 pip install -r requirements.txt
 
-# Run setup if data doesn't exist
-if [ ! -f "data/credit_data.csv" ]; then
-    echo "Running setup..."
-    python setup.py
-else
-    echo "Data already exists, skipping setup..."
-fi
+# Build data and models (stages with unchanged inputs are skipped)
+echo "Running build pipeline..."
+python pipeline.py
 
 # Run Streamlit app
 echo ""
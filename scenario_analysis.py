@@ -5,6 +5,7 @@ Analyzes different Indian economic conditions and their impact on credit decisio
 
 import pandas as pd
 import numpy as np
+from portfolio_cube import PortfolioCube, HIGH_RISK_THRESHOLD
 
 class ScenarioAnalyzer:
     """Analyze credit limits under different economic scenarios"""
@@ -30,6 +31,26 @@ class ScenarioAnalyzer:
         Parameters:
         - df: DataFrame with customer data and recommended limits
         """
+        totals = {
+            'count': len(df),
+            'exposure': df['recommended_limit'].sum(),
+            'current_exposure': df['current_credit_limit'].sum(),
+            'expected_loss': (df['default_probability'] * df['recommended_limit']).sum(),
+            'high_risk_count': (df['default_probability'] > HIGH_RISK_THRESHOLD).sum()
+        }
+        return self._scenario_table(totals)
+    
+    def analyze_cube(self, cube):
+        """
+        Scenario analysis read from a PortfolioCube instead of customer rows
+        
+        Parameters:
+        - cube: PortfolioCube of the scored portfolio (predicted default probabilities)
+        """
+        return self._scenario_table(cube.totals())
+    
+    def _scenario_table(self, totals):
+        """Scenario statistics from portfolio totals (scenario multipliers scale limits linearly)"""
         scenarios = ['normal', 'slowdown', 'high_growth']
         analysis_results = []
         
@@ -37,17 +58,15 @@ class ScenarioAnalyzer:
             scenario_name = scenario.title()
             
             # Apply scenario multiplier
-            adjusted_limits = df['recommended_limit'].apply(
-                lambda x: self.apply_scenario_adjustment(x, scenario)
-            )
+            total_credit_exposure = self.apply_scenario_adjustment(totals['exposure'], scenario)
             
             # Calculate aggregate statistics
-            avg_limit = adjusted_limits.mean()
-            total_credit_exposure = adjusted_limits.sum()
-            high_risk_customers = len(df[df['default_probability'] > 0.35])
+            avg_limit = total_credit_exposure / totals['count']
+            high_risk_customers = int(totals['high_risk_count'])
             
             # Calculate weighted average risk
-            weighted_risk = (df['default_probability'] * adjusted_limits).sum() / adjusted_limits.sum()
+            weighted_risk = (self.apply_scenario_adjustment(totals['expected_loss'], scenario) /
+                             total_credit_exposure)
             
             analysis_results.append({
                 'scenario': scenario_name,
@@ -55,18 +74,26 @@ class ScenarioAnalyzer:
                 'total_exposure': round(total_credit_exposure, 2),
                 'high_risk_customers': high_risk_customers,
                 'weighted_avg_risk': round(weighted_risk, 3),
-                'total_customers': len(df),
+                'total_customers': int(totals['count']),
                 'avg_limit_change_pct': round(
-                    ((adjusted_limits - df['current_credit_limit']).mean() / 
-                     df['current_credit_limit'].mean()) * 100, 2
+                    ((total_credit_exposure - totals['current_exposure']) / 
+                     totals['current_exposure']) * 100, 2
                 )
             })
         
         return pd.DataFrame(analysis_results)
     
     def get_scenario_recommendation(self, df):
-        """Generate recommendation based on scenario analysis"""
-        scenario_df = self.analyze_scenarios(df)
+        """
+        Generate recommendation based on scenario analysis
+        
+        Parameters:
+        - df: DataFrame with customer data and recommended limits, or a PortfolioCube
+        """
+        if isinstance(df, PortfolioCube):
+            scenario_df = self.analyze_cube(df)
+        else:
+            scenario_df = self.analyze_scenarios(df)
         
         recommendations = []
         
@@ -124,7 +151,7 @@ class ScenarioAnalyzer:
                                        df['recommended_limit']).sum()
             
             # Calculate risk concentration
-            high_risk_exposure = df[stressed_default_probs > 0.35]['recommended_limit'].sum()
+            high_risk_exposure = df[stressed_default_probs > HIGH_RISK_THRESHOLD]['recommended_limit'].sum()
             total_exposure = df['recommended_limit'].sum()
             
             stress_results.append({
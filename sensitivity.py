@@ -0,0 +1,212 @@
+"""
+Portfolio Sensitivity Analysis
+Per-customer partial effects and portfolio elasticities of recommended limits
+with respect to small changes in credit_utilization, on_time_payment_rate and
+credit_score: every perturbed copy of a chunk is stacked into one batch, scored
+in a single model call and run through the vectorized policy
+Run: python sensitivity.py [--input data/credit_data.csv] [--output data/sensitivity.csv]
+"""
+
+import numpy as np
+import pandas as pd
+
+# Default finite-difference step per feature (in the feature's own units)
+DEFAULT_STEPS = {
+    'credit_utilization': 0.05,
+    'on_time_payment_rate': 0.05,
+    'credit_score': 10
+}
+
+# Valid range of each perturbable feature; perturbed values are clipped to it
+FEATURE_BOUNDS = {
+    'credit_utilization': (0.0, 1.0),
+    'on_time_payment_rate': (0.0, 1.0),
+    'credit_score': (300, 900)
+}
+
+# Features derived from a perturbed feature, recomputed on every copy
+DERIVED_FEATURES = {
+    'credit_utilization': {'high_utilization': lambda utilization: (utilization > 0.8).astype(np.float64)}
+}
+
+# Customer columns the policy reads besides the default probability
+POLICY_COLUMNS = ['monthly_income', 'credit_score', 'credit_utilization',
+                  'on_time_payment_rate', 'behavior_score']
+
+# Stacked rows per model call; chunks shrink as perturbed features are added
+DEFAULT_MAX_BATCH_ROWS = 300000
+
+def _stacked_batch(chunk, columns, steps):
+    """
+    Base chunk followed by a +step and a -step copy per perturbed feature
+
+    Returns (stacked DataFrame, {feature: (up values, down values)}).
+    """
+    n_rows = len(chunk)
+    n_copies = 1 + 2 * len(steps)
+    stacked = {col: np.tile(chunk[col].to_numpy(dtype=np.float64), n_copies) for col in columns}
+
+    perturbed = {}
+    for k, (feature, step) in enumerate(steps.items()):
+        base = chunk[feature].to_numpy(dtype=np.float64)
+        low, high = FEATURE_BOUNDS.get(feature, (-np.inf, np.inf))
+        up = np.clip(base + step, low, high)
+        down = np.clip(base - step, low, high)
+        perturbed[feature] = (up, down)
+
+        for values, copy in ((up, 1 + 2 * k), (down, 2 + 2 * k)):
+            rows = slice(copy * n_rows, (copy + 1) * n_rows)
+            stacked[feature][rows] = values
+            for derived, derive in DERIVED_FEATURES.get(feature, {}).items():
+                if derived in stacked:
+                    stacked[derived][rows] = derive(values)
+
+    return pd.DataFrame(stacked), perturbed
+
+def _chunk_sensitivity(model, policy, chunk, steps):
+    """Partial effects of one chunk (one model call, one policy evaluation)"""
+    columns = list(dict.fromkeys(list(model.feature_columns) + POLICY_COLUMNS))
+    stacked, perturbed = _stacked_batch(chunk, columns, steps)
+
+    probs = np.asarray(model.predict_default_probability(stacked), dtype=np.float64)
+    limits = policy.recommended_limit(
+        stacked['monthly_income'].to_numpy(),
+        stacked['credit_score'].to_numpy(),
+        probs,
+        stacked['credit_utilization'].to_numpy(),
+        stacked['on_time_payment_rate'].to_numpy(),
+        stacked['behavior_score'].to_numpy()
+    )
+
+    n_rows = len(chunk)
+    copies = lambda values: values.reshape(-1, n_rows)
+    probs, limits = copies(probs), copies(limits)
+
+    result = {
+        'customer_id': chunk['customer_id'].to_numpy() if 'customer_id' in chunk.columns
+        else np.array([f'CUST_{idx}' for idx in chunk.index], dtype=object),
+        'predicted_default_prob': probs[0],
+        'recommended_limit': limits[0]
+    }
+    for k, feature in enumerate(steps):
+        up, down = perturbed[feature]
+        base = chunk[feature].to_numpy(dtype=np.float64)
+        width = up - down
+        # Central difference; one-sided where the step is clipped at a bound
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limit_partial = np.where(width > 0, (limits[1 + 2 * k] - limits[2 + 2 * k]) / width, np.nan)
+            prob_partial = np.where(width > 0, (probs[1 + 2 * k] - probs[2 + 2 * k]) / width, np.nan)
+        result[f'{feature}_limit_up'] = limits[1 + 2 * k] - limits[0]
+        result[f'{feature}_limit_down'] = limits[2 + 2 * k] - limits[0]
+        result[f'{feature}_limit_effect'] = limit_partial
+        result[f'{feature}_prob_effect'] = prob_partial
+        result[f'{feature}_elasticity'] = limit_partial * base / limits[0]
+    return pd.DataFrame(result)
+
+def portfolio_sensitivity(model, df, engine=None, steps=None, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+    """
+    Sensitivity of every customer's recommended limit to small feature changes
+
+    Each chunk of customers is copied once per +step / -step perturbation,
+    the copies are stacked into one batch and scored with a single model call
+    (so the model re-evaluates its own default probability), then the policy
+    computes every copy's limit in one vectorized pass. Derived flags such as
+    high_utilization follow the perturbed feature. Chunks hold at most
+    max_batch_rows stacked rows, so memory does not grow with the portfolio.
+
+    Parameters:
+    - model: trained CreditRiskModel (or HostedModel)
+    - df: DataFrame with customer data
+    - engine: CreditLimitEngine whose policy sets the limits (default policy if None)
+    - steps: dict of feature -> step size (default DEFAULT_STEPS)
+    - max_batch_rows: stacked rows scored per model call
+
+    Returns (per-customer DataFrame, portfolio summary DataFrame). Per customer
+    and feature: limit change for +step and -step (INR), partial effect on the
+    limit (INR per unit) and on the default probability, and elasticity of the
+    limit. The summary has one row per feature with average moves and the
+    portfolio elasticity (% change in total exposure for a 1% change of the
+    feature for every customer).
+    """
+    from credit_limit_engine import CreditLimitEngine
+
+    steps = dict(DEFAULT_STEPS if steps is None else steps)
+    if not steps:
+        raise ValueError("At least one feature step is required")
+    unknown = [feature for feature in steps if feature not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown sensitivity features: {unknown}")
+    if any(step <= 0 for step in steps.values()):
+        raise ValueError("Sensitivity steps must be positive")
+
+    policy = (engine or CreditLimitEngine()).policy
+    chunk_size = max(1, max_batch_rows // (1 + 2 * len(steps)))
+
+    chunks = [_chunk_sensitivity(model, policy, df.iloc[start:start + chunk_size], steps)
+              for start in range(0, len(df), chunk_size)]
+    customers = pd.concat(chunks, ignore_index=True)
+
+    total_exposure = customers['recommended_limit'].sum()
+    total_prob = customers['predicted_default_prob'].sum()
+    summary = []
+    for feature, step in steps.items():
+        values = df[feature].to_numpy(dtype=np.float64)
+        limit_effect = customers[f'{feature}_limit_effect'].to_numpy()
+        prob_effect = customers[f'{feature}_prob_effect'].to_numpy()
+        summary.append({
+            'feature': feature,
+            'step': step,
+            'avg_limit_up': customers[f'{feature}_limit_up'].mean(),
+            'avg_limit_down': customers[f'{feature}_limit_down'].mean(),
+            'exposure_change_up': customers[f'{feature}_limit_up'].sum(),
+            'avg_limit_effect': np.nanmean(limit_effect),
+            'avg_prob_effect': np.nanmean(prob_effect),
+            'exposure_elasticity': np.nansum(limit_effect * values) / total_exposure,
+            'default_prob_elasticity': np.nansum(prob_effect * values) / total_prob
+        })
+
+    return customers, pd.DataFrame(summary)
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import time
+    from model_training import CreditRiskModel
+    from credit_limit_engine import CreditLimitEngine
+
+    parser = argparse.ArgumentParser(description="Sensitivity of recommended limits to small feature changes")
+    parser.add_argument('--input', default='data/credit_data.csv')
+    parser.add_argument('--output', default='data/sensitivity.csv', help="per-customer partial effects")
+    parser.add_argument('--model-dir', default='models/')
+    parser.add_argument('--scoring-model', default='ensemble', choices=['ensemble', 'student'])
+    parser.add_argument('--policy', default=None, help="policy version key")
+    parser.add_argument('--step', nargs=2, action='append', metavar=('FEATURE', 'SIZE'),
+                        help="override a step, e.g. --step credit_score 20 (repeatable)")
+    parser.add_argument('--max-batch-rows', type=int, default=DEFAULT_MAX_BATCH_ROWS)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: {args.input} not found. Run 'python data_generator.py' first.")
+        raise SystemExit(1)
+
+    steps = dict(DEFAULT_STEPS)
+    for feature, size in args.step or []:
+        steps[feature] = float(size)
+
+    model = CreditRiskModel(scoring_model=args.scoring_model)
+    model.load_models(args.model_dir)
+    df = pd.read_csv(args.input)
+
+    start = time.perf_counter()
+    try:
+        customers, summary = portfolio_sensitivity(model, df, CreditLimitEngine(args.policy), steps,
+                                                   args.max_batch_rows)
+    except ValueError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"Sensitivity of {len(customers):,} customers x {len(steps)} features in {elapsed:.1f}s")
+    print(summary.round(4).to_string(index=False))
+    customers.to_csv(args.output, index=False)
+    print(f"Per-customer effects saved to {args.output}")
@@ -25,26 +25,15 @@ def install_requirements():
         return False
     return True
 
-def generate_data():
-    """Generate synthetic credit data"""
-    print("\nGenerating synthetic credit dataset...")
+def build_artifacts():
+    """Generate data, train models and score the portfolio (unchanged stages are skipped)"""
+    print("\nBuilding dataset, models and scored portfolio...")
     try:
-        from data_generator import save_dataset
-        save_dataset()
-        print("✓ Successfully generated credit data")
+        from pipeline import run_pipeline
+        run_pipeline()
+        print("✓ Data and models are up to date")
     except Exception as e:
-        print(f"✗ Error generating data: {e}")
-        return False
-    return True
-
-def train_models():
-    """Train ML models"""
-    print("\nTraining machine learning models...")
-    try:
-        subprocess.check_call([sys.executable, 'model_training.py'])
-        print("✓ Successfully trained models")
-    except subprocess.CalledProcessError as e:
-        print(f"✗ Error training models: {e}")
+        print(f"✗ Error building artifacts: {e}")
         return False
     return True
 
@@ -55,25 +44,19 @@ def main():
     print("=" * 60)
     
     # Create directories
-    print("\n[1/4] Creating directories...")
+    print("\n[1/3] Creating directories...")
     create_directories()
     
     # Install requirements
-    print("\n[2/4] Installing requirements...")
+    print("\n[2/3] Installing requirements...")
     if not install_requirements():
         print("\n✗ Setup failed at requirements installation")
         return
     
-    # Generate data
-    print("\n[3/4] Generating dataset...")
-    if not generate_data():
-        print("\n✗ Setup failed at data generation")
-        return
-    
-    # Train models
-    print("\n[4/4] Training models...")
-    if not train_models():
-        print("\n✗ Setup failed at model training")
+    # Generate data, train models and score (skips stages whose inputs are unchanged)
+    print("\n[3/3] Running build pipeline...")
+    if not build_artifacts():
+        print("\n✗ Setup failed in the build pipeline")
         return
     
     print("\n" + "=" * 60)
@@ -0,0 +1,160 @@
+"""
+Startup Helpers
+Background model loading with a warm-up prediction, and an import-time
+report (in the style of python -X importtime) for the dashboard and CLIs
+Run: python startup.py [--modules app model_training ...]
+"""
+
+import os
+import sys
+import time
+import threading
+import subprocess
+import pandas as pd
+
+# Modules imported when the dashboard starts
+DASHBOARD_MODULES = ['app']
+
+class ModelWarmup:
+    """Loads a CreditRiskModel and runs a warm-up prediction on a background thread"""
+
+    def __init__(self, scoring_model='ensemble', model_dir='models/', sample=None, host_path=None):
+        """
+        Parameters:
+        - scoring_model: 'ensemble' or 'student'
+        - model_dir: directory of the saved models
+        - sample: small DataFrame of customers for the warm-up prediction
+          (a few synthetic customers if None)
+        - host_path: published model host file (model_host.py) to attach to
+          instead of unpickling the models; the pickled models are loaded if
+          it does not hold the scoring model
+        """
+        self.scoring_model = scoring_model
+        self.model_dir = model_dir
+        self.sample = sample
+        self.host_path = host_path
+        self.timings = {}
+        self._model = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name=f'warmup-{scoring_model}', daemon=True)
+
+    def start(self):
+        """Start loading in the background; returns self"""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            start = time.perf_counter()
+            model = None
+            if self.host_path is not None:
+                from model_host import HostedModel
+                try:
+                    # Processes attached to the same file share its pages
+                    model = HostedModel.attach(path=self.host_path, scoring_model=self.scoring_model)
+                except ValueError:
+                    model = None
+            if model is None:
+                # sklearn and xgboost are imported here, off the rendering thread
+                from model_training import CreditRiskModel
+                model = CreditRiskModel(scoring_model=self.scoring_model)
+                model.load_models(self.model_dir)
+            self.timings['load_seconds'] = time.perf_counter() - start
+
+            sample = self.sample
+            if sample is None:
+                from data_generator import generate_credit_dataset
+                sample = generate_credit_dataset(n_samples=64)
+            start = time.perf_counter()
+            model.predict_default_probability(sample)
+            self.timings['warmup_seconds'] = time.perf_counter() - start
+
+            self._model = model
+        except Exception as e:
+            self._error = e
+
+    @property
+    def ready(self):
+        """True once the model is loaded and warmed up (or loading failed)"""
+        return not self._thread.is_alive()
+
+    def result(self, timeout=None):
+        """
+        Wait for the loaded model
+
+        Re-raises any error from loading (e.g. FileNotFoundError for missing
+        models). Raises TimeoutError if the model is not ready within timeout.
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError(f"Model warm-up not finished after {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+def import_time_report(modules, python=None):
+    """
+    Import cost of modules in a fresh interpreter, grouped by top-level package
+
+    Runs python -X importtime. self_ms sums the time spent in each package's
+    own modules; cumulative_ms is the cost of importing the package where it
+    is first pulled in by another package, including its own dependencies.
+
+    Parameters:
+    - modules: module names to import, in order
+    - python: interpreter to use (defaults to the current one)
+
+    Returns a DataFrame (package, self_ms, cumulative_ms, modules), slowest first.
+    """
+    code = '; '.join(f'import {name}' for name in modules)
+    completed = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', code],
+                               capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise ValueError(f"Importing {modules} failed:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip().split('.')[0], int(self_us), int(cumulative_us)))
+
+    # importtime prints children before their parent; walk in reverse so
+    # every entry sees its parent first
+    rows = {}
+    stack = []
+    for depth, package, self_us, cumulative_us in reversed(entries):
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        stack.append((depth, package))
+
+        row = rows.setdefault(package, {'package': package, 'self_ms': 0.0,
+                                        'cumulative_ms': 0.0, 'modules': 0})
+        row['self_ms'] += self_us / 1000
+        row['modules'] += 1
+        if parent != package:
+            row['cumulative_ms'] += cumulative_us / 1000
+
+    report = pd.DataFrame(list(rows.values()), columns=['package', 'self_ms', 'cumulative_ms', 'modules'])
+    return report.sort_values('self_ms', ascending=False).reset_index(drop=True)
+
+def print_import_report(report, top=15):
+    """Print the slowest packages of an import_time_report()"""
+    print(f"{'package':<24}{'self':>10}{'cumulative':>12}{'modules':>9}")
+    for row in report.head(top).itertuples():
+        print(f"{row.package:<24}{row.self_ms:>8.1f}ms{row.cumulative_ms:>10.1f}ms{row.modules:>9}")
+    print(f"{'total':<24}{report['self_ms'].sum():>8.1f}ms")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report import time of the dashboard or CLI modules")
+    parser.add_argument('--modules', nargs='+', default=DASHBOARD_MODULES, help="modules to import")
+    parser.add_argument('--top', type=int, default=15, help="packages to show")
+    args = parser.parse_args()
+
+    print(f"Import time of {', '.join(args.modules)}:\n")
+    print_import_report(import_time_report(args.modules), top=args.top)
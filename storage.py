@@ -0,0 +1,404 @@
+"""
+SQLite Portfolio Storage
+Optional local database of customers and scored recommendations, bulk-loaded
+with batched executemany in one transaction (WAL mode) and indexed on
+customer_id, risk category and credit score, so dashboard lookups and
+filtered views query only the rows they show; each database is stamped with
+the content hashes of the data, models and policy it was built from
+Run: python storage.py [--scoring-models ensemble student]
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import numpy as np
+
+DEFAULT_DB_PATH = 'data/portfolio.db'
+
+# Recommendation columns kept per scoring model
+RECOMMENDATION_COLUMNS = ['customer_id', 'current_credit_limit', 'recommended_limit', 'change_amount',
+                          'change_percentage', 'risk_category', 'credit_score', 'predicted_default_prob']
+
+CHANGE_CONDITIONS = {
+    'increase': 'change_amount > 0',
+    'decrease': 'change_amount < 0',
+    'no_change': 'change_amount = 0'
+}
+
+def file_hash(path):
+    """Short content hash of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+def store_stamp(data_path='data/credit_data.csv', model_dir='models/', policy=None):
+    """
+    What a store's contents depend on: the dataset, the saved models and the policy
+
+    Parameters:
+    - data_path: customer dataset CSV
+    - model_dir: directory of the saved models
+    - policy: CreditPolicy, config or version key (default policy if None)
+    """
+    from audit_log import model_version
+    from credit_policy import CreditPolicy
+
+    policy = policy if isinstance(policy, CreditPolicy) else CreditPolicy(policy)
+    return {
+        'data': file_hash(data_path),
+        'models': model_version(model_dir),
+        'policy': hashlib.sha256(json.dumps(policy.config, sort_keys=True, default=str).encode())
+                         .hexdigest()[:12]
+    }
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def _records(df):
+    """Rows as tuples of plain Python values (NaN becomes NULL)"""
+    values = df.astype(object).where(df.notna(), None)
+    return [tuple(v.item() if isinstance(v, np.generic) else v for v in row)
+            for row in values.itertuples(index=False, name=None)]
+
+class PortfolioStore:
+    """Customers and recommendations in an indexed SQLite database"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        """
+        Parameters:
+        - path: database file (created on first load)
+        """
+        self.path = path
+        # One connection per thread (the dashboard serves sessions from several threads)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Fold the write-ahead log into the database file and close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.close()
+            self._local.conn = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def write_stamp(self, stamp):
+        """Record the stamp (see store_stamp()) of the loaded contents"""
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)')
+            self.connection.executemany('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+                                        [(f'stamp.{key}', value) for key, value in stamp.items()])
+
+    def read_stamp(self):
+        """Stamp of the loaded contents (None for stores built without one)"""
+        try:
+            rows = self.connection.execute(
+                "SELECT key, value FROM metadata WHERE key LIKE 'stamp.%'").fetchall()
+        except sqlite3.OperationalError:
+            return None
+        return {key[len('stamp.'):]: value for key, value in rows} or None
+
+    def is_current(self, data_path='data/credit_data.csv', model_dir='models/', policy=None):
+        """
+        True if the store was built from the current dataset, models and policy
+
+        Parameters:
+        - data_path, model_dir, policy: as for store_stamp()
+        """
+        if not self.exists() or not os.path.exists(data_path):
+            return False
+        return self.read_stamp() == store_stamp(data_path, model_dir, policy)
+
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def _bulk_insert(self, table, df, batch_size):
+        placeholders = ', '.join('?' * len(df.columns))
+        sql = f'INSERT INTO {table} ({", ".join(df.columns)}) VALUES ({placeholders})'
+        for start in range(0, len(df), batch_size):
+            self.connection.executemany(sql, _records(df.iloc[start:start + batch_size]))
+
+    def load_customers(self, df, batch_size=10000):
+        """
+        Replace the customers table with a dataset
+
+        Rows keep their dataset position, so per-row artifacts (e.g.
+        explanations) can still be looked up by position.
+
+        Parameters:
+        - df: customer dataset with a customer_id column
+        - batch_size: rows per executemany call
+        """
+        if 'customer_id' not in df.columns:
+            raise ValueError("Customer data needs a customer_id column")
+        df = df.reset_index(drop=True)
+        columns = ', '.join(f'{col} {_sql_type(df[col].dtype)}' for col in df.columns
+                            if col != 'customer_id')
+        start = time.perf_counter()
+        with self.connection:
+            self.connection.execute('DROP TABLE IF EXISTS customers')
+            self.connection.execute(f'CREATE TABLE customers (customer_id TEXT PRIMARY KEY, '
+                                    f'position INTEGER NOT NULL, {columns})')
+            self._bulk_insert('customers', df.assign(position=np.arange(len(df))), batch_size)
+            self.connection.execute('CREATE INDEX idx_customers_position ON customers (position)')
+        print(f"Loaded {len(df):,} customers in {time.perf_counter() - start:.2f}s")
+
+    def load_recommendations(self, df, scoring_model='ensemble', batch_size=10000):
+        """
+        Replace one scoring model's recommendations
+
+        Parameters:
+        - df: scored portfolio with RECOMMENDATION_COLUMNS (e.g. policy.evaluate output)
+        - scoring_model: scoring model the rows belong to
+        - batch_size: rows per executemany call
+        """
+        missing = [col for col in RECOMMENDATION_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"Recommendations are missing columns: {missing}")
+        rows = df[RECOMMENDATION_COLUMNS].reset_index(drop=True)
+        rows = rows.assign(scoring_model=scoring_model, position=np.arange(len(rows)))
+
+        start = time.perf_counter()
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    scoring_model TEXT NOT NULL,
+                    customer_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    current_credit_limit REAL,
+                    recommended_limit REAL,
+                    change_amount REAL,
+                    change_percentage REAL,
+                    risk_category TEXT,
+                    credit_score INTEGER,
+                    predicted_default_prob REAL,
+                    PRIMARY KEY (scoring_model, customer_id)
+                )''')
+            self.connection.execute('DELETE FROM recommendations WHERE scoring_model = ?', (scoring_model,))
+            self._bulk_insert('recommendations', rows, batch_size)
+            self.connection.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_score '
+                                    'ON recommendations (scoring_model, credit_score, position)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS idx_recommendations_risk '
+                                    'ON recommendations (scoring_model, risk_category, credit_score)')
+        self.connection.execute('ANALYZE')
+        print(f"Loaded {len(rows):,} '{scoring_model}' recommendations "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    def scoring_models(self):
+        """Scoring models with stored recommendations"""
+        try:
+            return self._query('SELECT DISTINCT scoring_model FROM recommendations')['scoring_model'].tolist()
+        except (sqlite3.OperationalError, pd.errors.DatabaseError):
+            return []
+
+    def count_customers(self, prefix=''):
+        """Number of customers whose id starts with prefix"""
+        condition, params = self._prefix_condition(prefix)
+        return int(self.connection.execute(f'SELECT COUNT(*) FROM customers WHERE {condition}',
+                                           params).fetchone()[0])
+
+    @staticmethod
+    def _prefix_condition(prefix, column='customer_id'):
+        # A range on the primary key, so prefix search is an index seek
+        if not prefix:
+            return '1 = 1', ()
+        return f'{column} >= ? AND {column} < ?', (prefix, prefix + '\uffff')
+
+    def search_customers(self, prefix='', limit=None, offset=0, scoring_model=None):
+        """
+        Customers whose id starts with prefix, in customer_id order
+
+        Parameters:
+        - prefix: customer_id prefix ('' matches everyone)
+        - limit, offset: page of the matches
+        - scoring_model: also attach that model's predicted_default_prob
+        """
+        condition, params = self._prefix_condition(prefix, 'c.customer_id')
+        select, join = 'c.*', ''
+        if scoring_model is not None:
+            select = 'c.*, r.predicted_default_prob'
+            join = 'LEFT JOIN recommendations r ON r.customer_id = c.customer_id AND r.scoring_model = ?'
+            params = (scoring_model,) + params
+        sql = (f'SELECT {select} FROM customers c {join} WHERE {condition} '
+               f'ORDER BY c.customer_id LIMIT ? OFFSET ?')
+        return self._query(sql, params + (-1 if limit is None else limit, offset))
+
+    def get_customer(self, customer_id, scoring_model=None):
+        """One customer's row as a Series, or None if unknown"""
+        rows = self.search_customers(customer_id, scoring_model=scoring_model)
+        rows = rows[rows['customer_id'] == customer_id]
+        return rows.iloc[0] if len(rows) else None
+
+    def predictions(self, scoring_model='ensemble'):
+        """Stored default probabilities in dataset order"""
+        return self._query('SELECT predicted_default_prob FROM recommendations WHERE scoring_model = ? '
+                           'ORDER BY position', (scoring_model,))['predicted_default_prob'].to_numpy()
+
+    def recommendations(self, scoring_model='ensemble'):
+        """Filtered, paged views of one scoring model's recommendations"""
+        return StoredRecommendations(self, scoring_model)
+
+class StoredRecommendations:
+    """
+    Recommendation queries for the dashboard, answered by SQLite
+
+    Mirrors the query methods of portfolio_index.RecommendationIndex, so
+    the recommendations page works with either backend.
+    """
+
+    def __init__(self, store, scoring_model='ensemble'):
+        self.store = store
+        self.scoring_model = scoring_model
+        self.categories = store._query(
+            'SELECT DISTINCT risk_category FROM recommendations WHERE scoring_model = ? ORDER BY risk_category',
+            (scoring_model,))['risk_category'].tolist()
+
+    def _where(self, categories=None, change=None, min_score=None):
+        conditions, params = ['scoring_model = ?'], [self.scoring_model]
+        if categories is not None:
+            conditions.append(f'risk_category IN ({", ".join("?" * len(categories))})')
+            params.extend(categories)
+        if change not in (None, 'all'):
+            if change not in CHANGE_CONDITIONS:
+                raise ValueError(f"Unknown change direction '{change}'")
+            conditions.append(CHANGE_CONDITIONS[change])
+        if min_score is not None:
+            conditions.append('credit_score >= ?')
+            params.append(int(min_score))
+        return ' AND '.join(conditions), params
+
+    def score_range(self):
+        """Lowest and highest credit score"""
+        low, high = self.store.connection.execute(
+            'SELECT MIN(credit_score), MAX(credit_score) FROM recommendations WHERE scoring_model = ?',
+            (self.scoring_model,)).fetchone()
+        return int(low), int(high)
+
+    def summary(self, categories=None, change=None, min_score=None):
+        """Count, averages and total change for a filter"""
+        where, params = self._where(categories, change, min_score)
+        count, current, recommended, change_total = self.store.connection.execute(
+            f'SELECT COUNT(*), AVG(current_credit_limit), AVG(recommended_limit), '
+            f'COALESCE(SUM(change_amount), 0) FROM recommendations WHERE {where}', params).fetchone()
+        return {
+            'count': int(count),
+            'avg_current_limit': current if count else float('nan'),
+            'avg_recommended_limit': recommended if count else float('nan'),
+            'total_change': change_total
+        }
+
+    def page(self, categories=None, change=None, min_score=None, page=1, page_size=50):
+        """
+        One page of matching rows, highest credit score first
+
+        Returns (DataFrame of the page, number of pages).
+        """
+        where, params = self._where(categories, change, min_score)
+        count = self.summary(categories, change, min_score)['count']
+        n_pages = max(1, -(-count // page_size))
+        page = min(max(page, 1), n_pages)
+        rows = self.store._query(
+            f'SELECT {", ".join(RECOMMENDATION_COLUMNS)} FROM recommendations WHERE {where} '
+            f'ORDER BY credit_score DESC, position DESC LIMIT ? OFFSET ?',
+            params + [page_size, (page - 1) * page_size])
+        return rows, n_pages
+
+    def values(self, column, categories=None, change=None, min_score=None):
+        """One column of every matching row (e.g. for a histogram)"""
+        if column not in RECOMMENDATION_COLUMNS:
+            raise ValueError(f"Unknown column '{column}'")
+        where, params = self._where(categories, change, min_score)
+        values = self.store._query(f'SELECT {column} FROM recommendations WHERE {where}', params)[column]
+        # An empty result has no type information
+        return values if len(values) or column in ('customer_id', 'risk_category') else values.astype(float)
+
+    def largest(self, n, column, categories=None, change=None, min_score=None):
+        """The n matching rows with the largest value of column"""
+        if column not in RECOMMENDATION_COLUMNS:
+            raise ValueError(f"Unknown column '{column}'")
+        where, params = self._where(categories, change, min_score)
+        return self.store._query(
+            f'SELECT {", ".join(RECOMMENDATION_COLUMNS)} FROM recommendations WHERE {where} '
+            f'ORDER BY {column} DESC LIMIT ?', params + [n])
+
+    def chunks(self, categories=None, change=None, min_score=None, chunk_size=50000, columns=None):
+        """Matching rows in chunks, highest credit score first (e.g. for exports)"""
+        columns = columns or RECOMMENDATION_COLUMNS
+        unknown = [col for col in columns if col not in RECOMMENDATION_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}")
+        where, params = self._where(categories, change, min_score)
+        yield from pd.read_sql_query(
+            f'SELECT {", ".join(columns)} FROM recommendations WHERE {where} '
+            f'ORDER BY credit_score DESC, position DESC', self.store.connection,
+            params=params, chunksize=chunk_size)
+
+def build_store(data_path='data/credit_data.csv', db_path=DEFAULT_DB_PATH, scoring_models=('ensemble',),
+                model_dir='models/', policy=None):
+    """
+    Load the dataset and each scoring model's recommendations into SQLite
+
+    Parameters:
+    - data_path: customer dataset CSV
+    - db_path: database file
+    - scoring_models: scoring models to score and store
+    - model_dir: directory of the saved models
+    - policy: CreditPolicy, config or version key for the recommendations
+    """
+    from model_training import CreditRiskModel
+    from credit_policy import CreditPolicy
+
+    policy = policy if isinstance(policy, CreditPolicy) else CreditPolicy(policy)
+    stamp = store_stamp(data_path, model_dir, policy)
+    df = pd.read_csv(data_path)
+    store = PortfolioStore(db_path)
+    # Recommendations of models that are not rebuilt would be stale
+    with store.connection:
+        store.connection.execute('DROP TABLE IF EXISTS recommendations')
+        store.connection.execute('DROP TABLE IF EXISTS metadata')
+    store.load_customers(df)
+
+    for scoring_model in scoring_models:
+        model = CreditRiskModel(scoring_model=scoring_model)
+        model.load_models(model_dir)
+        scored = df.assign(predicted_default_prob=model.predict_default_probability(df))
+        store.load_recommendations(scored.assign(**policy.evaluate(scored)), scoring_model)
+    store.write_stamp(stamp)
+    return store
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the SQLite portfolio store used by the dashboard")
+    parser.add_argument('--data', default='data/credit_data.csv')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--scoring-models', nargs='+', default=['ensemble'], choices=['ensemble', 'student'])
+    parser.add_argument('--model-dir', default='models/')
+    parser.add_argument('--policy', default=None, help="policy version key")
+    args = parser.parse_args()
+
+    store = build_store(args.data, args.db, args.scoring_models, args.model_dir, args.policy)
+    store.close()
+    print(f"Portfolio store saved to {args.db}")
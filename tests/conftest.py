@@ -0,0 +1,47 @@
+"""
+Shared test fixtures: a generated portfolio with predicted default
+probabilities, including values sitting exactly on the policy's thresholds,
+and a directory of trained models
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generator import generate_credit_dataset
+
+@pytest.fixture(scope='session')
+def portfolio():
+    """5,000 generated customers scored with a random default probability"""
+    df = generate_credit_dataset(n_samples=5000, random_seed=7)
+    rng = np.random.default_rng(7)
+    df['predicted_default_prob'] = rng.beta(1.5, 4.0, size=len(df))
+
+    # Put customers exactly on every rule boundary (bands are lower bounds)
+    boundaries = {
+        'predicted_default_prob': [0.1, 0.15, 0.25, 0.35, 0.4],
+        'credit_utilization': [0.3, 0.8],
+        'on_time_payment_rate': [0.7, 0.95],
+        'behavior_score': [0.8],
+        'credit_score': [450, 550, 650, 700, 750]
+    }
+    for col, values in boundaries.items():
+        rows = rng.choice(len(df), size=50 * len(values), replace=False)
+        df.loc[rows, col] = np.repeat(values, 50)
+    return df
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory):
+    """Ensemble and distilled student trained on 1,500 generated customers, saved like models/"""
+    from model_training import CreditRiskModel
+    path = f"{tmp_path_factory.mktemp('models')}/"
+    model = CreditRiskModel()
+    X_train, X_test, y_train, y_test = model.train_models(generate_credit_dataset(n_samples=1500, random_seed=11))
+    model.distill_student(X_train, X_test, y_test)
+    model.save_models(path)
+    return path
@@ -0,0 +1,69 @@
+"""
+Audit log: decisions written across days and runs come back by customer,
+time range and run, and existing files are never overwritten
+"""
+
+import pandas as pd
+import pytest
+
+from audit_log import AuditLogWriter, query_audit_log
+from credit_limit_engine import CreditLimitEngine
+
+DAYS = ['2026-03-01 09:30', '2026-03-02 23:59:59', '2026-03-05 00:00']
+
+@pytest.fixture
+def audit_dir(portfolio, tmp_path):
+    """Two runs: the first scores 300 customers on three days, the second 100 of them once"""
+    root = str(tmp_path / 'audit')
+    sample = portfolio.iloc[:300]
+    with AuditLogWriter(root, run_id='run-a', model_version='m1', buffer_rows=250,
+                        row_group_rows=64) as writer:
+        for day in DAYS:
+            writer.record(sample[['customer_id', 'predicted_default_prob']], policy_version='1.0',
+                          decided_at=day)
+    with AuditLogWriter(root, run_id='run-b', model_version='m2') as writer:
+        writer.record(sample.iloc[:100][['customer_id', 'predicted_default_prob']], policy_version='1.1',
+                      decided_at='2026-03-05 12:00')
+    return root
+
+def test_customer_history_is_complete_and_ordered(audit_dir, portfolio):
+    customer = portfolio['customer_id'].iloc[42]
+    history = query_audit_log(audit_dir, customer_ids=customer)
+    assert (history['customer_id'] == customer).all()
+    assert list(history['run_id']) == ['run-a'] * 3 + ['run-b']
+    assert history['decided_at'].is_monotonic_increasing
+    assert list(history['model_version']) == ['m1'] * 3 + ['m2']
+
+    several = query_audit_log(audit_dir, customer_ids=list(portfolio['customer_id'].iloc[98:102]))
+    assert len(several) == 2 * 4 + 2 * 3
+
+def test_time_range_bounds_are_inclusive(audit_dir):
+    assert len(query_audit_log(audit_dir, start='2026-03-02', end='2026-03-02')) == 300
+    assert len(query_audit_log(audit_dir, start='2026-03-02 23:59:59')) == 300 + 300 + 100
+    assert len(query_audit_log(audit_dir, end='2026-03-05 06:00')) == 900
+    # A date-only end covers that whole day
+    assert len(query_audit_log(audit_dir, end='2026-03-05')) == 1000
+    assert len(query_audit_log(audit_dir, start='2026-03-03', end='2026-03-04')) == 0
+    # Timezone-aware bounds are compared in UTC
+    assert len(query_audit_log(audit_dir, start='2026-03-05 13:00+02:00')) == 100
+
+def test_run_filter_and_missing_log(audit_dir, tmp_path):
+    assert len(query_audit_log(audit_dir, run_id='run-b')) == 100
+    with pytest.raises(ValueError):
+        query_audit_log(str(tmp_path / 'missing'))
+
+def test_reopened_run_appends_new_files(audit_dir):
+    with AuditLogWriter(audit_dir, run_id='run-b', model_version='m2') as writer:
+        writer.record(pd.DataFrame({'customer_id': ['CUST_X'], 'predicted_default_prob': [0.5]}),
+                      decided_at='2026-03-05 12:00')
+    assert len(query_audit_log(audit_dir, run_id='run-b')) == 101
+
+def test_engine_records_every_decision(portfolio, tmp_path):
+    root = str(tmp_path / 'audit')
+    sample = portfolio.iloc[:500]
+    with AuditLogWriter(root, run_id='run-c', model_version='m1') as writer:
+        result = CreditLimitEngine('1.0').process_customers(sample, audit_log=writer)
+    logged = query_audit_log(root).set_index('customer_id').loc[result['customer_id']]
+    assert (logged['recommended_limit'].to_numpy() == result['recommended_limit'].to_numpy()).all()
+    assert (logged['adjustment_reason'].to_numpy() == result['adjustment_reason'].to_numpy()).all()
+    assert (logged['policy_version'] == '1.0').all()
@@ -0,0 +1,56 @@
+"""
+Policy backtesting: limits are decided on the previous month's snapshot, so
+a month's own defaults and behavior cannot change the limits granted in it
+"""
+
+import numpy as np
+import pytest
+
+from backtesting import PolicyBacktester
+from data_generator import generate_credit_panel
+
+@pytest.fixture(scope='module')
+def panel():
+    return list(generate_credit_panel(n_customers=500, n_months=6, random_seed=11))
+
+def _with_defaults(snapshot, rows):
+    """Copy of a month in which the given customers default, at maximum risk and utilization"""
+    changed = snapshot.copy()
+    for col, value in {'defaulted': 1, 'defaulted_this_month': 1, 'default_probability': 0.99,
+                       'credit_utilization': 1.0, 'on_time_payment_rate': 0.0,
+                       'behavior_score': 0.0}.items():
+        changed.loc[rows, col] = value
+    return changed
+
+def test_month_outcomes_do_not_change_its_limits(panel):
+    rows = np.flatnonzero(panel[3]['defaulted'].to_numpy() == 0)[:100]
+    altered = panel[:3] + [_with_defaults(panel[3], rows)] + panel[4:]
+
+    backtester = PolicyBacktester(['1.0'], oracle=True)
+    original = backtester.run(panel).set_index('month')
+    shocked = backtester.run(altered).set_index('month')
+    month = int(panel[3]['month'].iloc[0])
+
+    # Same limits granted in the shocked month, but more defaults realized against them
+    assert np.isclose(shocked.loc[month, 'exposure'], original.loc[month, 'exposure'])
+    assert shocked.loc[month, 'defaults'] == original.loc[month, 'defaults'] + len(rows)
+    assert shocked.loc[month, 'realized_loss'] > original.loc[month, 'realized_loss']
+    # The next review sees the shock and cuts the defaulted customers' limits to zero exposure
+    assert shocked.loc[month + 1, 'exposure'] < original.loc[month + 1, 'exposure']
+
+def test_first_month_only_sets_opening_limits(panel):
+    results = PolicyBacktester(['1.0'], oracle=True).run(panel)
+    assert sorted(results['month']) == [int(s['month'].iloc[0]) for s in panel[1:]]
+
+def test_model_is_required_unless_oracle():
+    with pytest.raises(ValueError):
+        PolicyBacktester(['1.0'])
+
+def test_snapshots_must_cover_the_same_customers(panel):
+    backtester = PolicyBacktester(['1.0'], oracle=True)
+    with pytest.raises(ValueError):
+        backtester.run([panel[0], panel[1].iloc[1:].sample(frac=1, random_state=0)])
+    duplicated = panel[1].copy()
+    duplicated.loc[0, 'customer_id'] = duplicated.loc[1, 'customer_id']
+    with pytest.raises(ValueError):
+        backtester.run([panel[0], duplicated.iloc[::-1]])
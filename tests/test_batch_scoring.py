@@ -0,0 +1,73 @@
+"""
+Batch scoring: an interrupted run resumes from its manifest without
+re-scoring completed shards, and a manifest from different settings or
+models is refused
+"""
+
+import os
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_generator import generate_credit_dataset
+from model_training import CreditRiskModel
+from batch_scoring import BatchScoringJob
+
+@pytest.fixture
+def customers_csv(tmp_path):
+    path = tmp_path / 'customers.csv'
+    generate_credit_dataset(n_samples=1200, random_seed=5).to_csv(path, index=False)
+    return str(path)
+
+def _scored(job):
+    return pd.concat([pd.read_parquet(path) for path in job.shard_paths()], ignore_index=True)
+
+def test_resume_scores_only_missing_shards(customers_csv, model_dir, tmp_path):
+    out_dir = str(tmp_path / 'scored')
+    job = BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=300, workers=1, model_dir=model_dir)
+    job.run()
+    complete = _scored(job)
+    assert len(complete) == 1200 and len(job.shard_paths()) == 4
+    model = CreditRiskModel()
+    model.load_models(model_dir)
+    np.testing.assert_allclose(complete['predicted_default_prob'],
+                               model.predict_default_probability(pd.read_csv(customers_csv)))
+
+    # Simulate a run killed after two shards
+    with open(job.manifest_path) as f:
+        manifest = json.load(f)
+    for shard in ('2', '3'):
+        os.remove(os.path.join(out_dir, manifest['completed'].pop(shard)['file']))
+    manifest['finished'] = False
+    job.save_manifest(manifest)
+    kept = {path: os.stat(path).st_mtime_ns for path in job.shard_paths()}
+
+    resumed = job.run()
+    assert resumed['finished'] and sorted(resumed['completed'], key=int) == ['0', '1', '2', '3']
+    assert all(os.stat(path).st_mtime_ns == mtime for path, mtime in kept.items())
+    pd.testing.assert_frame_equal(_scored(job), complete)
+
+def test_resume_refuses_changed_settings(customers_csv, model_dir, tmp_path):
+    out_dir = str(tmp_path / 'scored')
+    BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=600, workers=1, model_dir=model_dir).run()
+    with pytest.raises(ValueError):
+        BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=300, workers=1, model_dir=model_dir).run()
+    # --restart discards the old manifest
+    manifest = BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=300, workers=1,
+                               model_dir=model_dir).run(restart=True)
+    assert len(manifest['completed']) == 4
+
+def test_resume_refuses_retrained_models(customers_csv, model_dir, tmp_path):
+    models = f"{tmp_path / 'models'}/"
+    shutil.copytree(model_dir, models)
+    out_dir = str(tmp_path / 'scored')
+    BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=600, workers=1, model_dir=models).run()
+
+    # Stand-in for a retrain: the saved model files change
+    with open(os.path.join(models, 'feature_columns.pkl'), 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError):
+        BatchScoringJob(customers_csv, out_dir=out_dir, chunk_size=600, workers=1, model_dir=models).load_manifest()
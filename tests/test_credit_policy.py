@@ -0,0 +1,131 @@
+"""
+Regression tests: policy '1.0' and the vectorized engine must reproduce the
+original scalar, row-by-row credit limit rules exactly
+"""
+
+import numpy as np
+import pandas as pd
+
+from credit_policy import CreditPolicy
+from credit_limit_engine import CreditLimitEngine
+
+# The original engine's rules, kept verbatim as the reference
+
+def original_base_limit(monthly_income, credit_score):
+    if credit_score >= 750:
+        score_multiplier = 1.5
+    elif credit_score >= 700:
+        score_multiplier = 1.3
+    elif credit_score >= 650:
+        score_multiplier = 1.1
+    elif credit_score >= 550:
+        score_multiplier = 1.0
+    elif credit_score >= 450:
+        score_multiplier = 0.8
+    else:
+        score_multiplier = 0.5
+    return monthly_income * 1000 * 2.5 * score_multiplier
+
+def original_risk_adjustment(base_limit, default_prob, utilization, on_time_payment_rate, behavior_score):
+    risk_multiplier = 1 - (default_prob * 0.6)
+    if utilization > 0.8:
+        risk_multiplier *= 0.9
+    elif utilization < 0.3:
+        risk_multiplier *= 1.1
+    risk_multiplier += on_time_payment_rate * 0.1
+    risk_multiplier += behavior_score * 0.1
+    risk_multiplier = np.clip(risk_multiplier, 0.2, 2.0)
+    return base_limit * risk_multiplier
+
+def original_recommended_limit(row):
+    base_limit = original_base_limit(row['monthly_income'], row['credit_score'])
+    limit = original_risk_adjustment(base_limit, row['predicted_default_prob'], row['credit_utilization'],
+                                     row['on_time_payment_rate'], row['behavior_score'])
+    return max(10000, min(limit, 500000))
+
+def original_risk_category(default_prob):
+    if default_prob < 0.1:
+        return "Low Risk"
+    elif default_prob < 0.25:
+        return "Medium Risk"
+    elif default_prob < 0.4:
+        return "High Risk"
+    else:
+        return "Very High Risk"
+
+def original_adjustment_reason(row):
+    reasons = []
+    if row['predicted_default_prob'] < 0.15:
+        reasons.append("Excellent risk profile")
+    elif row['predicted_default_prob'] > 0.35:
+        reasons.append("Elevated default risk")
+    if row['on_time_payment_rate'] > 0.95:
+        reasons.append("Strong payment history")
+    elif row['on_time_payment_rate'] < 0.7:
+        reasons.append("Poor payment history")
+    if row['credit_utilization'] > 0.8:
+        reasons.append("High current utilization")
+    elif row['credit_utilization'] < 0.3:
+        reasons.append("Low utilization pattern")
+    if row['behavior_score'] > 0.8:
+        reasons.append("Good customer behavior")
+    return " | ".join(reasons) if reasons else "Balanced profile"
+
+def original_process_customers(df):
+    results = []
+    for idx, row in df.iterrows():
+        recommended_limit = original_recommended_limit(row)
+        change_amount = recommended_limit - row['current_credit_limit']
+        change_pct = change_amount / row['current_credit_limit'] * 100
+        results.append({
+            'customer_id': row.get('customer_id', f'CUST_{idx}'),
+            'current_limit': row['current_credit_limit'],
+            'recommended_limit': round(recommended_limit, 2),
+            'change_amount': round(change_amount, 2),
+            'change_percentage': round(change_pct, 2),
+            'risk_category': original_risk_category(row['predicted_default_prob']),
+            'default_probability': row['predicted_default_prob'],
+            'adjustment_reason': original_adjustment_reason(row),
+            'credit_score': row['credit_score'],
+            'utilization': row['credit_utilization'],
+            'on_time_payment_rate': row['on_time_payment_rate']
+        })
+    return pd.DataFrame(results)
+
+def test_policy_matches_original_limits(portfolio):
+    evaluated = CreditPolicy('1.0').evaluate(portfolio)
+    expected = portfolio.apply(original_recommended_limit, axis=1).to_numpy()
+    np.testing.assert_allclose(evaluated['recommended_limit'].to_numpy(), expected, rtol=1e-12)
+
+def test_policy_matches_original_risk_categories(portfolio):
+    evaluated = CreditPolicy('1.0').evaluate(portfolio)
+    expected = portfolio['predicted_default_prob'].map(original_risk_category)
+    assert (evaluated['risk_category'].to_numpy() == expected.to_numpy()).all()
+
+def test_engine_scalar_path_matches_original(portfolio):
+    engine = CreditLimitEngine('1.0')
+    sample = portfolio.iloc[:500]
+    for _, row in sample.iterrows():
+        assert np.isclose(engine.calculate_recommended_limit(row), original_recommended_limit(row), rtol=1e-12)
+        assert engine.assign_risk_category(row['predicted_default_prob']) == \
+            original_risk_category(row['predicted_default_prob'])
+
+def test_vectorized_reasons_match_row_rules(portfolio):
+    engine = CreditLimitEngine('1.0')
+    vectorized = engine.calculate_adjustment_reasons(portfolio)
+    per_row = portfolio.apply(engine.calculate_adjustment_reason, axis=1).to_numpy()
+    original = portfolio.apply(original_adjustment_reason, axis=1).to_numpy()
+    assert (np.asarray(vectorized) == per_row).all()
+    assert (np.asarray(vectorized) == original).all()
+
+def test_process_customers_matches_original(portfolio):
+    sample = portfolio.iloc[:1000]
+    result = CreditLimitEngine('1.0').process_customers(sample)
+    expected = original_process_customers(sample)
+    assert list(result.columns) == list(expected.columns)
+    for col in expected.columns:
+        if not pd.api.types.is_numeric_dtype(expected[col]):
+            assert (result[col].to_numpy() == expected[col].to_numpy()).all(), col
+        else:
+            np.testing.assert_allclose(result[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                       rtol=1e-12, atol=0.01, err_msg=col)
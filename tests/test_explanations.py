@@ -0,0 +1,57 @@
+"""
+Local explanations: each model's contributions plus its base value add up
+to the probability it predicts, and the stored top-k values are the
+largest contributions
+"""
+
+import numpy as np
+import pytest
+
+from data_generator import generate_credit_dataset
+from model_training import CreditRiskModel
+from explanations import explain_portfolio, forest_contributions, boosted_contributions
+
+@pytest.fixture(scope='module')
+def customers():
+    return generate_credit_dataset(n_samples=1000, random_seed=9)
+
+def _load(model_dir, scoring_model='ensemble'):
+    model = CreditRiskModel(scoring_model=scoring_model)
+    model.load_models(model_dir)
+    return model
+
+def _features(model, customers):
+    X, _ = model.prepare_features(customers)
+    return model.encode_features(X)
+
+def test_forest_contributions_sum_to_probability(model_dir, customers):
+    model = _load(model_dir)
+    X = _features(model, customers)
+    contribs, base = forest_contributions(model.rf_model, X, chunk_size=300)
+    np.testing.assert_allclose(base + contribs.sum(axis=1), model.rf_model.predict_proba(X)[:, 1], atol=1e-9)
+
+@pytest.mark.parametrize('exact', [False, True])
+def test_boosted_contributions_sum_to_probability(model_dir, customers, exact):
+    model = _load(model_dir)
+    X = _features(model, customers)
+    contribs, base = boosted_contributions(model.xgb_model, X, exact)
+    np.testing.assert_allclose(base + contribs.sum(axis=1), model.xgb_model.predict_proba(X)[:, 1], atol=1e-5)
+
+@pytest.mark.parametrize('scoring_model', ['ensemble', 'student'])
+def test_explained_predictions_match_model(model_dir, customers, scoring_model):
+    model = _load(model_dir, scoring_model)
+    n_features = len(model.feature_columns)
+    explanations = explain_portfolio(model, customers, top_k=n_features)
+
+    predicted = model.predict_default_probability(customers)
+    np.testing.assert_allclose(explanations.predictions, predicted, atol=1e-5)
+    # With every feature kept, the stored contributions account for the whole prediction
+    np.testing.assert_allclose(explanations.base_value + explanations.values.sum(axis=1), predicted, atol=1e-4)
+
+def test_top_k_keeps_the_largest_contributions(model_dir, customers):
+    model = _load(model_dir)
+    full = explain_portfolio(model, customers, top_k=len(model.feature_columns))
+    top = explain_portfolio(model, customers, top_k=3)
+    assert top.top_k == 3
+    np.testing.assert_array_equal(top.values, full.values[:, :3])
+    assert (np.abs(top.values[:, :-1]) >= np.abs(top.values[:, 1:])).all()
@@ -0,0 +1,72 @@
+"""
+Limit allocation: budgets are respected, limits stay between the policy
+minimum and the recommendation, and the greedy solution matches a linear
+programming solve of the same problem
+"""
+
+import numpy as np
+import pytest
+
+from credit_policy import CreditPolicy
+from limit_allocation import LimitAllocator
+
+def _recommended(portfolio):
+    return CreditPolicy('1.0').evaluate(portfolio)['recommended_limit'].to_numpy()
+
+def _expected_loss(allocator, portfolio, limits):
+    return (allocator.lgd * portfolio['predicted_default_prob'].to_numpy() * limits).sum()
+
+def test_no_caps_grants_every_profitable_recommendation(portfolio):
+    allocator = LimitAllocator()
+    allocated, report = allocator.allocate(portfolio)
+    recommended = _recommended(portfolio)
+    prob = portfolio['predicted_default_prob'].to_numpy()
+    value = portfolio['credit_utilization'].to_numpy() * (allocator.margin * (1 - prob) - allocator.lgd * prob)
+    floor = np.minimum(allocator.policy.min_limit, recommended)
+    # Limit above the minimum is only granted where it earns a positive risk-adjusted value
+    np.testing.assert_allclose(allocated, np.where(value > 0, recommended, floor))
+    assert not report['exposure_binding'] and not report['expected_loss_binding']
+
+@pytest.mark.parametrize('exposure_share, loss_share', [(0.7, None), (None, 0.6), (0.8, 0.5)])
+def test_caps_are_respected(portfolio, exposure_share, loss_share):
+    recommended = _recommended(portfolio)
+    probe = LimitAllocator()
+    exposure_cap = None if exposure_share is None else exposure_share * recommended.sum()
+    loss_cap = None if loss_share is None else loss_share * _expected_loss(probe, portfolio, recommended)
+
+    allocator = LimitAllocator(exposure_cap=exposure_cap, expected_loss_cap=loss_cap)
+    allocated, report = allocator.allocate(portfolio)
+
+    floor = np.minimum(allocator.policy.min_limit, recommended)
+    assert (allocated >= floor - 1e-6).all()
+    assert (allocated <= recommended + 1e-6).all()
+    if exposure_cap is not None:
+        assert allocated.sum() <= exposure_cap * (1 + 1e-9)
+    if loss_cap is not None:
+        assert _expected_loss(allocator, portfolio, allocated) <= loss_cap * (1 + 1e-9)
+    assert np.isclose(report['total_exposure'], allocated.sum())
+
+def test_caps_below_minimum_limits_are_rejected(portfolio):
+    with pytest.raises(ValueError):
+        LimitAllocator(exposure_cap=1000.0).allocate(portfolio)
+
+def test_matches_linear_program(portfolio):
+    linprog = pytest.importorskip('scipy.optimize').linprog
+    sample = portfolio.iloc[:300]
+    recommended = _recommended(sample)
+    allocator = LimitAllocator(exposure_cap=0.75 * recommended.sum(),
+                               expected_loss_cap=0.6 * _expected_loss(LimitAllocator(), sample, recommended))
+    allocated, report = allocator.allocate(sample)
+
+    prob = sample['predicted_default_prob'].to_numpy()
+    utilization = sample['credit_utilization'].to_numpy()
+    value = utilization * (allocator.margin * (1 - prob) - allocator.lgd * prob)
+    cost = allocator.lgd * prob
+    floor = np.minimum(allocator.policy.min_limit, recommended)
+    solution = linprog(-value, A_ub=np.vstack([np.ones(len(sample)), cost]),
+                       b_ub=[allocator.exposure_cap - floor.sum(), allocator.expected_loss_cap - (cost * floor).sum()],
+                       bounds=list(zip(np.zeros(len(sample)), recommended - floor)), method='highs')
+    assert solution.success
+
+    optimum = (value * (floor + solution.x)).sum()
+    assert report['risk_adjusted_value'] >= optimum - 1e-6 * abs(optimum)
@@ -0,0 +1,64 @@
+"""
+Model hosting: scores from the packed, memory-mapped or shared-memory trees
+match the pickled models they were published from
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from data_generator import generate_credit_dataset
+from model_training import CreditRiskModel
+from model_host import HostedModel, publish_model, share_model, ensure_published, is_published, HOST_FILE
+
+@pytest.fixture(scope='module')
+def customers():
+    df = generate_credit_dataset(n_samples=2000, random_seed=13)
+    # Missing values take each tree's default branch
+    df.loc[df.index[::17], 'credit_utilization'] = np.nan
+    return df
+
+@pytest.fixture(scope='module')
+def host_file(model_dir, tmp_path_factory):
+    model = CreditRiskModel()
+    model.load_models(model_dir)
+    path = str(tmp_path_factory.mktemp('host') / HOST_FILE)
+    publish_model(model, path)
+    return path
+
+@pytest.mark.parametrize('scoring_model', ['ensemble', 'student'])
+def test_memory_mapped_scores_match_pickles(model_dir, host_file, customers, scoring_model):
+    model = CreditRiskModel(scoring_model=scoring_model)
+    model.load_models(model_dir)
+    hosted = HostedModel.attach(path=host_file, scoring_model=scoring_model)
+    np.testing.assert_allclose(hosted.predict_default_probability(customers),
+                               model.predict_default_probability(customers), atol=1e-6)
+    hosted.close()
+
+def test_shared_memory_scores_match_file(host_file, customers):
+    block = share_model(host_file)
+    try:
+        shared = HostedModel.attach(shm_name=block.name)
+        mapped = HostedModel.attach(path=host_file)
+        np.testing.assert_array_equal(shared.predict_default_probability(customers),
+                                      mapped.predict_default_probability(customers))
+        shared.close()
+        mapped.close()
+    finally:
+        block.close()
+        block.unlink()
+
+def test_ensure_published_republishes_after_retrain(model_dir, tmp_path):
+    models = f"{tmp_path / 'models'}/"
+    shutil.copytree(model_dir, models)
+    path = ensure_published(models)
+    assert is_published(models)
+
+    # A host file older than a saved model is stale
+    earlier = os.path.getmtime(os.path.join(models, 'xgb_model.pkl')) - 10
+    os.utime(path, (earlier, earlier))
+    assert not is_published(models)
+    ensure_published(models)
+    assert is_published(models)
@@ -0,0 +1,57 @@
+"""
+Build pipeline: unchanged stages are skipped, changed config or missing
+outputs rerun a stage, and a rebuilt artifact with identical content does
+not force the stages downstream of it
+"""
+
+import os
+
+import pytest
+
+from pipeline import run_pipeline, module_sources
+
+CONFIG = {'generate': {'n_samples': 800, 'random_seed': 3}, 'store': {'build': False}}
+
+@pytest.fixture
+def dirs(tmp_path):
+    return f"{tmp_path / 'data'}/", f"{tmp_path / 'models'}/"
+
+def _run(dirs, config=CONFIG, force=()):
+    data_dir, model_dir = dirs
+    status = run_pipeline(config, force=force, workers=2, data_dir=data_dir, model_dir=model_dir)
+    return {name for name, result in status.items() if result == 'ran'}
+
+def test_second_run_skips_everything(dirs):
+    assert {'generate', 'train', 'score'} <= _run(dirs)
+    assert _run(dirs) == set()
+
+def test_config_change_reruns_downstream(dirs):
+    _run(dirs)
+    changed = {**CONFIG, 'generate': {'n_samples': 800, 'random_seed': 4}}
+    assert {'generate', 'train', 'score'} <= _run(dirs, changed)
+    assert _run(dirs, changed) == set()
+
+def test_identical_rebuild_does_not_rerun_downstream(dirs):
+    _run(dirs)
+    assert _run(dirs, force=['generate']) == {'generate'}
+
+@pytest.mark.parametrize('output, stage', [('scored_portfolio.csv', 'score'),
+                                           ('credit_data_summary.json', 'generate')])
+def test_missing_output_reruns_its_stage(dirs, output, stage):
+    data_dir, _ = dirs
+    _run(dirs)
+    os.remove(os.path.join(data_dir, output))
+    assert _run(dirs) == {stage}
+    assert os.path.exists(os.path.join(data_dir, output))
+
+def test_unknown_stage_is_rejected(dirs):
+    with pytest.raises(ValueError):
+        _run(dirs, force=['deploy'])
+
+def test_module_sources_follow_local_imports(tmp_path):
+    (tmp_path / 'entry.py').write_text("import os\n\ndef run():\n    from helper import value\n"
+                                       "\nif __name__ == '__main__':\n    import cli_only\n")
+    (tmp_path / 'helper.py').write_text("from nested import value\n")
+    (tmp_path / 'nested.py').write_text("value = 1\n")
+    (tmp_path / 'cli_only.py').write_text("")
+    assert module_sources(['entry'], source_dir=str(tmp_path)) == ['entry.py', 'helper.py', 'nested.py']
@@ -0,0 +1,68 @@
+"""
+Portfolio cube: incremental updates match a rebuild, and slices match
+aggregates computed directly from the customers
+"""
+
+import numpy as np
+import pandas as pd
+
+from credit_policy import CreditPolicy
+from portfolio_cube import PortfolioCube
+
+def _rescored(portfolio, rows, seed):
+    """Copy of some customers with new probabilities and utilization"""
+    rng = np.random.default_rng(seed)
+    changed = portfolio.iloc[rows].copy()
+    changed['predicted_default_prob'] = rng.uniform(0, 1, size=len(changed))
+    changed['credit_utilization'] = rng.uniform(0, 1, size=len(changed))
+    return changed
+
+def test_incremental_updates_match_rebuild(portfolio):
+    cube = PortfolioCube.build(portfolio)
+    current = portfolio.copy()
+    for seed in range(5):
+        rows = np.random.default_rng(seed).choice(len(current), size=400, replace=False)
+        changed = _rescored(current, rows, seed)
+        cube.update(current.iloc[rows], changed)
+        current.iloc[rows] = changed
+
+    rebuilt = PortfolioCube.build(current)
+    np.testing.assert_allclose(cube.data, rebuilt.data, rtol=1e-9, atol=1e-6)
+
+def test_removing_every_customer_empties_the_cube(portfolio):
+    cube = PortfolioCube.build(portfolio)
+    cube.remove(portfolio.iloc[:2500]).remove(portfolio.iloc[2500:])
+    np.testing.assert_allclose(cube.data, 0, atol=1e-6)
+
+def test_slices_match_direct_aggregates(portfolio):
+    cube = PortfolioCube.build(portfolio)
+    evaluated = CreditPolicy().evaluate(portfolio)
+    prob = portfolio['predicted_default_prob']
+
+    totals = cube.totals()
+    assert totals['count'] == len(portfolio)
+    assert np.isclose(totals['exposure'], evaluated['recommended_limit'].sum())
+    assert np.isclose(totals['expected_loss'], (prob * evaluated['recommended_limit']).sum())
+
+    by_risk = cube.group('risk_category').set_index('risk_category')
+    counts = evaluated['risk_category'].value_counts()
+    for label, row in by_risk.iterrows():
+        assert row['count'] == counts.get(label, 0)
+
+    high = cube.totals(risk_category='High Risk')
+    mask = (evaluated['risk_category'] == 'High Risk').to_numpy()
+    assert np.isclose(high['sum_credit_score'], portfolio.loc[mask, 'credit_score'].sum())
+
+def test_default_risk_bands_match_overview_buckets(portfolio):
+    # The overview chart's original buckets: pd.cut at 0.15 / 0.3 / 0.5 (right-closed)
+    expected = pd.cut(portfolio['predicted_default_prob'], bins=[0, 0.15, 0.3, 0.5, 1.0],
+                      labels=['Low', 'Medium', 'High', 'Very High']).value_counts()
+    bands = PortfolioCube.build(portfolio).group('default_risk_band').set_index('default_risk_band')
+    for label, row in bands.iterrows():
+        assert row['count'] == expected[label]
+
+def test_save_and_load_round_trip(portfolio, tmp_path):
+    cube = PortfolioCube.build(portfolio)
+    path = tmp_path / 'portfolio_cube.npz'
+    cube.save(path)
+    np.testing.assert_array_equal(PortfolioCube.load(path).data, cube.data)
@@ -0,0 +1,63 @@
+"""
+Summary sketches: merged per-chunk sketches give exact moments and
+category counts, and quantiles within the documented rank error
+"""
+
+import numpy as np
+import pytest
+
+from summary_sketches import NumericSketch, FrameSketch, merge_sketches
+
+def _rank_error(values, estimates, quantiles):
+    """Largest gap between the estimates' rank ranges (ties span several ranks) and the quantiles"""
+    ordered = np.sort(values)
+    low = np.searchsorted(ordered, estimates, side='left') / len(ordered)
+    high = np.searchsorted(ordered, estimates, side='right') / len(ordered)
+    return np.max(np.maximum(0, np.maximum(low - quantiles, quantiles - high)))
+
+@pytest.mark.parametrize('n_chunks', [1, 10, 50])
+def test_merged_quantiles_within_rank_error(n_chunks):
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(mean=3.0, sigma=0.8, size=200000)
+    merged = NumericSketch()
+    for chunk in np.array_split(values, n_chunks):
+        merged.merge(NumericSketch().update(chunk))
+
+    quantiles = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+    assert _rank_error(values, merged.quantile(quantiles), quantiles) < 0.0015
+    assert merged.count == len(values)
+    assert np.isclose(merged.mean, values.mean(), rtol=1e-12)
+    assert np.isclose(merged.variance, values.var(ddof=1), rtol=1e-9)
+    assert merged.min == values.min() and merged.max == values.max()
+
+def test_merge_order_does_not_matter():
+    rng = np.random.default_rng(4)
+    chunks = [rng.normal(size=5000) for _ in range(20)]
+    forward, backward = NumericSketch(), NumericSketch()
+    for chunk in chunks:
+        forward.merge(NumericSketch().update(chunk))
+    for chunk in reversed(chunks):
+        backward.merge(NumericSketch().update(chunk))
+
+    quantiles = np.linspace(0.01, 0.99, 25)
+    assert _rank_error(np.concatenate(chunks), backward.quantile(quantiles), quantiles) < 0.0015
+    np.testing.assert_allclose(forward.quantile(quantiles), backward.quantile(quantiles), atol=0.01)
+
+def test_frame_sketches_merge_like_the_whole_frame(portfolio):
+    shards = [FrameSketch.from_frame(portfolio.iloc[start:start + 625])
+              for start in range(0, len(portfolio), 625)]
+    # Shards are persisted as JSON by batch scoring
+    merged = merge_sketches(FrameSketch.from_dict(shard.to_dict()) for shard in shards)
+    whole = portfolio.drop(columns='customer_id')
+
+    described = merged.describe()
+    numeric = whole.select_dtypes('number')
+    np.testing.assert_allclose(described.loc['count'], numeric.count())
+    np.testing.assert_allclose(described.loc['mean'], numeric.mean(), rtol=1e-9)
+    np.testing.assert_allclose(described.loc['std'], numeric.std(), rtol=1e-6)
+    np.testing.assert_allclose(described.loc['min'], numeric.min())
+    np.testing.assert_allclose(described.loc['max'], numeric.max())
+
+    income = portfolio['monthly_income'].to_numpy()
+    estimate = merged.numeric['monthly_income'].quantile(np.array([0.1, 0.5, 0.9]))
+    assert _rank_error(income, estimate, np.array([0.1, 0.5, 0.9])) < 0.005
@@ -0,0 +1,130 @@
+"""
+Thread Budget
+One process-wide setting for how many CPU threads training, inference and
+process pools may use: the budget is divided among worker processes and the
+same per-process thread count is applied to scikit-learn, XGBoost and the
+BLAS/OpenMP pools, so parallel workers never oversubscribe the machine
+Run: python thread_budget.py [--workers N]
+"""
+
+import os
+import math
+
+# Total threads this process tree may use (default: CPUs available to it)
+THREAD_BUDGET_ENV = 'CREDIT_THREAD_BUDGET'
+
+# Read by OpenMP/BLAS runtimes when they initialize (i.e. in new processes)
+BLAS_THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                        'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+# Threads granted to this process by apply_thread_limit() (None: the full budget)
+_process_threads = None
+
+def available_cpus():
+    """CPUs this process may run on: affinity mask and cgroup CPU quota, if any"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def thread_budget():
+    """Total thread budget: CREDIT_THREAD_BUDGET if set, else the available CPUs"""
+    value = os.environ.get(THREAD_BUDGET_ENV)
+    if value:
+        try:
+            budget = int(value)
+        except ValueError:
+            raise ValueError(f"{THREAD_BUDGET_ENV} must be a positive integer, got {value!r}")
+        if budget <= 0:
+            raise ValueError(f"{THREAD_BUDGET_ENV} must be a positive integer, got {value!r}")
+        return budget
+    return available_cpus()
+
+def plan_workers(workers=None, max_workers=None, budget=None):
+    """
+    Split the budget among worker processes
+
+    Parameters:
+    - workers: requested worker processes (default: one per budgeted thread)
+    - max_workers: upper bound on workers (e.g. the number of tasks)
+    - budget: total threads (default: thread_budget())
+
+    Returns (workers, threads per worker); workers x threads never exceeds
+    the budget unless more workers than threads were explicitly requested.
+    """
+    budget = budget or thread_budget()
+    workers = workers or budget
+    if max_workers is not None:
+        workers = min(workers, max_workers)
+    workers = max(1, workers)
+    return workers, max(1, budget // workers)
+
+def process_threads():
+    """Threads model fits and predictions in this process should use"""
+    return _process_threads or thread_budget()
+
+def apply_thread_limit(n_threads):
+    """
+    Cap this process (and processes it starts) at n_threads
+
+    Sets the OpenMP/BLAS environment variables for child processes and
+    libraries not yet loaded, limits already-loaded BLAS/OpenMP pools through
+    threadpoolctl when installed, and makes process_threads() return
+    n_threads so model estimators pick it up.
+
+    Parameters:
+    - n_threads: threads for this process
+    """
+    global _process_threads
+    if n_threads <= 0:
+        raise ValueError("n_threads must be positive")
+    _process_threads = n_threads
+    for name in BLAS_THREAD_ENV_VARS:
+        os.environ[name] = str(n_threads)
+    # Worker processes started from here divide this allowance further
+    os.environ[THREAD_BUDGET_ENV] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return n_threads
+    threadpool_limits(limits=n_threads)
+    return n_threads
+
+def configure_model_threads(model, n_threads=None):
+    """
+    Set the thread count of every estimator of a CreditRiskModel
+
+    Parameters:
+    - model: CreditRiskModel (trained or loaded)
+    - n_threads: threads per fit/prediction (default: process_threads())
+    """
+    n_threads = n_threads or process_threads()
+    if model.rf_model is not None:
+        model.rf_model.set_params(n_jobs=n_threads)
+    for estimator in (model.xgb_model, model.student_model):
+        if estimator is not None:
+            estimator.set_params(n_jobs=n_threads)
+    return model
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show how the thread budget is divided")
+    parser.add_argument('--workers', type=int, nargs='*', default=None,
+                        help="worker counts to plan (default: 1, 2, 4 and one per CPU)")
+    args = parser.parse_args()
+
+    budget = thread_budget()
+    source = THREAD_BUDGET_ENV if os.environ.get(THREAD_BUDGET_ENV) else "available CPUs"
+    print(f"Thread budget: {budget} ({source}; {available_cpus()} CPUs available)")
+    for requested in args.workers or sorted({1, 2, 4, budget}):
+        workers, threads = plan_workers(requested, budget=budget)
+        print(f"  {workers:>3} workers x {threads:>3} threads = {workers * threads} threads")